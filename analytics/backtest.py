@@ -0,0 +1,109 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy.orm import Session
+
+from analytics.prokofiev import prokofiev_weights
+from controllers.data_loader import load_frame, MCK_COLUMNS
+from libs.database import session_scope
+
+
+def rolling_prokofiev(values, window: int = 5, chunk_size: int = 4096, workers: int = None) -> np.ndarray:
+    """Прогнозы Прокофьева на каждый год по предыдущим window годам (годы x показатели).
+
+    Окна всех точек старта - одно скользящее представление исходного массива (без копий),
+    прогноз для всех точек сразу - одно умножение на веса. Для длинных рядов точки старта
+    делятся на блоки и считаются параллельно. Для первых window лет - NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    n, k = values.shape
+    forecasts = np.full((n, k), np.nan)
+    if n <= window:
+        return forecasts
+
+    weights = prokofiev_weights(window, 1)[0]
+    windows = sliding_window_view(values[:-1], window, axis=0)  # (n - window) x k x window
+
+    def run(start):
+        stop = min(start + chunk_size, len(windows))
+        forecasts[window + start:window + stop] = windows[start:stop] @ weights
+
+    starts = range(0, len(windows), chunk_size)
+    if len(starts) > 1:
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            list(pool.map(run, starts))
+    else:
+        run(0)
+    return forecasts
+
+
+def error_metrics(actual, predicted) -> dict:
+    """MAE и MAPE (%) по точкам, где есть и факт, и прогноз"""
+    actual = np.asarray(actual, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)
+    mask = ~(np.isnan(actual) | np.isnan(predicted))
+    errors = np.abs(actual[mask] - predicted[mask])
+    nonzero = actual[mask] != 0
+    return {
+        'mae': float(errors.mean()) if errors.size else np.nan,
+        'mape': float((errors[nonzero] / np.abs(actual[mask][nonzero])).mean() * 100) if nonzero.any() else np.nan,
+        'points': int(mask.sum()),
+    }
+
+
+def backtest_frame(frame: pd.DataFrame, equation: dict, target: str, window: int = 5) -> dict:
+    """Скользящая проверка прогноза на истории.
+
+    Для каждого года начиная с window+1: Прокофьев по предыдущим годам для каждого фактора
+    уравнения и итоговый прогноз target по сохраненному уравнению.
+    """
+    factors = [name for name in equation if name != 'const']
+    columns = list(dict.fromkeys(factors + [column for column in MCK_COLUMNS if column in frame.columns]))
+
+    forecasts = pd.DataFrame(rolling_prokofiev(frame[columns].to_numpy(), window),
+                             index=frame.index, columns=columns)
+    coefficients = np.array([equation[name] for name in factors])
+    final = equation['const'] + forecasts[factors].to_numpy() @ coefficients
+    # Прогноз есть только у лет с полным окном истории (как у факторов); без факторов
+    # (уравнение из одной константы) NaN сам не появится
+    final[:window] = np.nan
+
+    return {
+        'forecasts': forecasts,
+        'final': pd.Series(final, index=frame.index, name=target),
+        'indicators': {column: error_metrics(frame[column], forecasts[column]) for column in columns},
+        'final_metrics': error_metrics(frame[target], final),
+    }
+
+
+def backtest(db: Session, equation: dict, target: str, window: int = 5) -> dict:
+    """Проверка прогноза по всем годам базы (target - interval или integrated_index)"""
+    frame = load_frame(db, with_integral=target == 'integrated_index')
+    return backtest_frame(frame, equation, target, window)
+
+
+def format_backtest(result: dict, target: str) -> str:
+    lines = [f"=== Проверка на истории: {target} ==="]
+    final = result['final_metrics']
+    lines.append(f"Итоговый прогноз: MAE = {final['mae']:.6f}, MAPE = {final['mape']:.2f}% "
+                 f"(точек: {final['points']})")
+    lines.append("")
+    lines.append("Прогноз показателей методом Прокофьева:")
+    for column, metrics in result['indicators'].items():
+        lines.append(f"  {column}: MAE = {metrics['mae']:.6f}, MAPE = {metrics['mape']:.2f}%")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from controllers.model_crud import get_latest_model
+
+    with session_scope() as db:
+        for name, target in (("integral", "integrated_index"), ("interval", "interval")):
+            record = get_latest_model(db, name)
+            if record is not None:
+                print(format_backtest(backtest(db, record.equation, target), target))
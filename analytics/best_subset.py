@@ -0,0 +1,109 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from analytics.critical_values import f_critical
+from analytics.ols import ols_fit
+
+SORT_KEYS = {
+    'adj_r2': lambda model: -model['adj_r2'],
+    'aic': lambda model: model['aic'],
+    'bic': lambda model: model['bic'],
+}
+
+# Пул процессов окупает запуск только на больших переборах (от 11 факторов);
+# на меньших последовательный расчет быстрее
+PARALLEL_MIN_SUBSETS = 2048
+
+
+def all_subsets(n_factors: int):
+    """Все непустые наборы индексов факторов (2^n - 1 моделей)"""
+    for size in range(1, n_factors + 1):
+        yield from combinations(range(n_factors), size)
+
+
+def fit_batch(X: np.ndarray, y: np.ndarray, subsets: list) -> list:
+    """Оценка пачки моделей; X - факторы без константы. Выполняется в процессе пула.
+
+    Вырожденные наборы (нулевой или линейно зависимый фактор) пропускаются: та же
+    модель без зависимого фактора есть в переборе.
+    """
+    n = len(y)
+    ones = np.ones((n, 1))
+    fitted = []
+    for subset in subsets:
+        k = len(subset)
+        if n - k - 1 <= 0:
+            continue
+        try:
+            fit = ols_fit(np.hstack([ones, X[:, subset]]), y)
+        except (np.linalg.LinAlgError, ValueError):
+            continue
+        if fit['deficient'].any() or not np.isfinite(fit['r2']):
+            continue
+
+        sse = fit['sse']
+        llf = -n / 2 * (np.log(2 * np.pi) + np.log(sse / n) + 1)
+        fitted.append({
+            'subset': subset,
+            'coef': fit['coef'],
+            't_values': fit['t_values'],
+            'r2': fit['r2'],
+            'adj_r2': 1 - (1 - fit['r2']) * (n - 1) / (n - k - 1),
+            'aic': -2 * llf + 2 * (k + 1),
+            'bic': -2 * llf + np.log(n) * (k + 1),
+            'f_fact': fit['f_value'],
+        })
+    return fitted
+
+
+def best_subset_search(df: pd.DataFrame, y_col: str, factors: list, top_k: int = 10,
+                       sort_by: str = 'adj_r2', workers: int = None, batch_size: int = 64,
+                       min_parallel: int = PARALLEL_MIN_SUBSETS) -> list:
+    """Полный перебор наборов факторов с ранжированием моделей.
+
+    Сначала идут модели, значимые по F-критерию (Fфакт > Fкр), внутри - по sort_by
+    (adj_r2, aic или bic). Пачки моделей считаются в пуле процессов, если наборов
+    не меньше min_parallel, иначе - последовательно. Вырожденные наборы не оцениваются.
+    """
+    factors = list(factors)
+    X = df[factors].to_numpy(dtype=float)
+    y = df[y_col].to_numpy(dtype=float)
+    n = len(y)
+
+    subsets = list(all_subsets(len(factors)))
+    batches = [subsets[i:i + batch_size] for i in range(0, len(subsets), batch_size)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers > 1 and len(batches) > 1 and len(subsets) >= min_parallel:
+        with ProcessPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+            fitted = [model for batch in pool.map(fit_batch, [X] * len(batches), [y] * len(batches), batches)
+                      for model in batch]
+    else:
+        fitted = [model for batch in batches for model in fit_batch(X, y, batch)]
+
+    models = []
+    for model in fitted:
+        names = [factors[i] for i in model['subset']]
+        k1 = len(names)
+        k2 = n - k1 - 1
+        f_crit = f_critical(k1, k2)
+        models.append({
+            'factors': names,
+            'equation': dict(zip(['const'] + names, model['coef'].tolist())),
+            't_values': dict(zip(['const'] + names, model['t_values'].tolist())),
+            'r2': model['r2'],
+            'adj_r2': model['adj_r2'],
+            'aic': model['aic'],
+            'bic': model['bic'],
+            'f_fact': model['f_fact'],
+            'f_crit': f_crit,
+            'significant': f_crit is not None and model['f_fact'] > f_crit,
+        })
+
+    sort_key = SORT_KEYS[sort_by]
+    models.sort(key=lambda model: (not model['significant'], sort_key(model)))
+    return models[:top_k]
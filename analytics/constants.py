@@ -1,60 +0,0 @@
-t_criteria_list = [12.7062047, 4.3026527, 3.1824463, 2.7764451, 2.5705818, 2.4469119, 2.3646243, 2.3060041,
-                   2.2621572, 2.2281389, 2.2009852, 2.1788128, 2.1603687, 2.1447867, 2.1314495, 2.1199053,
-                   2.1098156, 2.1009220, 2.0930241, 2.0859634, 2.0796138, 2.0738731, 2.0686576, 2.0638986,
-                   2.0595386, 2.0555294, 2.0518305, 2.0484071, 2.0452296, 2.0422725, 2.0395134, 2.0369333,
-                   2.0345153, 2.0322445, 2.0301079, 2.0280940, 2.0261925, 2.0243042, 2.0226909, 2.0210754,
-                   2.0195410, 2.0180817, 2.0166922, 2.0153676, 2.0141034, 2.0128956, 2.0117405, 2.0106348,
-                   2.0095752, 2.0085591, 2.0075838, 2.0066468, 2.0057460, 2.0048793, 2.0040448, 2.0032407,
-                   2.0024655, 2.0017175, 2.0009954, 2.0002978, 1.9996236, 1.9989715, 1.9983405, 1.9977297,
-                   1.9971379, 1.9965644, 1.9960084, 1.9954689, 1.9949454, 1.9944371, 1.9939434, 1.9934636,
-                   1.9929971, 1.9925435, 1.9921022, 1.9916726, 1.9912544, 1.9908471, 1.9904502, 1.9900634,
-                   1.9896863, 1.9893186, 1.9889598, 1.9886097, 1.9882679, 1.9879342, 1.9876083, 1.9872899,
-                   1.9869787, 1.9866745, 1.9863772, 1.9860863, 1.9858018, 1.9855234, 1.9852510, 1.9849843,
-                   1.9847232, 1.9844675, 1.9842170, 1.9839715]
-
-
-F_CRITICAL_VALUES = {
-    # k2 (степени свободы знаменателя)
-    # k1 (степени свободы числителя)
-    1: {
-        1: 161.45, 2: 199.50, 3: 215.72, 4: 224.57, 5: 230.17,
-        6: 233.97, 7: 238.89, 8: 243.91, 9: 249.04, 10: 254.32
-    },
-    2: {
-        1: 18.51, 2: 19.00, 3: 19.16, 4: 19.25, 5: 19.30,
-        6: 19.33, 7: 19.37, 8: 19.41, 9: 19.45, 10: 19.50
-    },
-    3: {
-        1: 10.13, 2: 9.55, 3: 9.28, 4: 9.12, 5: 9.01,
-        6: 8.94, 7: 8.84, 8: 8.74, 9: 8.64, 10: 8.53
-    },
-    4: {
-        1: 7.71, 2: 6.94, 3: 6.59, 4: 6.39, 5: 6.26,
-        6: 6.16, 7: 6.04, 8: 5.91, 9: 5.77, 10: 5.63
-    },
-    5: {
-        1: 6.61, 2: 5.79, 3: 5.41, 4: 5.19, 5: 5.05,
-        6: 4.95, 7: 4.82, 8: 4.68, 9: 4.53, 10: 4.36
-    },
-    6: {
-        1: 5.99, 2: 5.14, 3: 4.76, 4: 4.53, 5: 4.39,
-        6: 4.28, 7: 4.15, 8: 4.00, 9: 3.84, 10: 3.67
-    },
-    7: {
-        1: 5.59, 2: 4.74, 3: 4.35, 4: 4.12, 5: 3.97,
-        6: 3.87, 7: 3.73, 8: 3.57, 9: 3.41, 10: 3.23
-    },
-    8: {
-        1: 5.32, 2: 4.46, 3: 4.07, 4: 3.84, 5: 3.69,
-        6: 3.58, 7: 3.44, 8: 3.28, 9: 3.12, 10: 2.93
-    },
-    9: {
-        1: 5.12, 2: 4.26, 3: 3.86, 4: 3.63, 5: 3.48,
-        6: 3.37, 7: 3.23, 8: 3.07, 9: 2.90, 10: 2.71
-    },
-    10: {
-        1: 4.96, 2: 4.10, 3: 3.71, 4: 3.48, 5: 3.33,
-        6: 3.22, 7: 3.07, 8: 2.91, 9: 2.74, 10: 2.54
-    }
-}
-
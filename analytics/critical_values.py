@@ -0,0 +1,42 @@
+from functools import lru_cache
+
+import numpy as np
+from scipy import stats
+
+ALPHA = 0.05  # уровень значимости по умолчанию
+
+# Горячие таблицы для типичных размеров: df 1..HOT_DF, k1 1..HOT_K1
+HOT_DF = 500
+HOT_K1 = 20
+
+_df = np.arange(1, HOT_DF + 1)
+T_TABLE = stats.t.ppf(1 - ALPHA / 2, _df)
+F_TABLE = stats.f.ppf(1 - ALPHA, np.arange(1, HOT_K1 + 1)[:, None], _df[None, :])
+
+
+@lru_cache(maxsize=4096)
+def _t_quantile(alpha: float, df: int) -> float:
+    return float(stats.t.ppf(1 - alpha / 2, df))
+
+
+@lru_cache(maxsize=4096)
+def _f_quantile(alpha: float, df1: int, df2: int) -> float:
+    return float(stats.f.ppf(1 - alpha, df1, df2))
+
+
+def t_critical(df: int, alpha: float = ALPHA):
+    """Двустороннее критическое значение t-Стьюдента (None при df < 1)"""
+    if df < 1:
+        return None
+    if alpha == ALPHA and df <= HOT_DF:
+        return float(T_TABLE[df - 1])
+    return _t_quantile(alpha, int(df))
+
+
+def f_critical(df1: int, df2: int, alpha: float = ALPHA):
+    """Критическое значение F-Фишера: df1 - числитель (факторы), df2 - знаменатель (None при df < 1)"""
+    if df1 < 1 or df2 < 1:
+        return None
+    if alpha == ALPHA and df1 <= HOT_K1 and df2 <= HOT_DF:
+        return float(F_TABLE[df1 - 1, df2 - 1])
+    return _f_quantile(alpha, int(df1), int(df2))
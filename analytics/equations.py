@@ -1,12 +1,14 @@
 from typing import List
+import numpy as np
 import pandas as pd
-import statsmodels.api as sm
 from sqlalchemy.orm import Session
 
-from controllers.data_crud import get_all_data
-from libs.database import get_db
-from models.data_models import MCKData, AnalysisResult
-from analytics.constants import t_criteria_list, F_CRITICAL_VALUES
+from libs.database import session_scope
+from controllers.data_loader import load_frame, load_years
+from analytics.integral import integral_index
+from analytics.critical_values import t_critical, f_critical
+from analytics.ols import qr_factor, drop_column, ols_from_qr, ols_fit, statsmodels_results
+from analytics.best_subset import best_subset_search
 from analytics.corel_matrix import get_data_1, get_data_2, get_correl_matrix, get_second_correl_matrix
 
 
@@ -51,35 +53,35 @@ def print_regression_result(name: str, y_col: str, result: dict):
 
 
 def build_regression(df: pd.DataFrame, y_col: str, candidate_x: list):
-    """Построение модели регрессии"""
-    X = sm.add_constant(df[candidate_x])
-    y = df[y_col]
-    model = sm.OLS(y, X).fit()
-    return model
+    """Построение модели регрессии statsmodels (для диагностики; подбор модели - без нее)"""
+    return statsmodels_results(df, y_col, candidate_x)
 
 
 def iterative_regression(df: pd.DataFrame, y_col: str, candidate_x: list):
-    """Итеративное исключение факторов по t-критерию (как в Excel)"""
+    """Итеративное исключение факторов по t-критерию (как в Excel).
+
+    Каждый шаг - МНК по QR-разложению; исключение фактора обновляет разложение
+    (qr_delete), а не строит модель заново; statsmodels не используется.
+    """
     n = len(df)
+    candidate_x = list(candidate_x)
     removed = []
     iteration = 1
 
     print(f"\nНачальные кандидаты: {candidate_x}")
 
+    y = df[y_col].to_numpy(dtype=float)
+    X = np.column_stack([np.ones(n), df[candidate_x].to_numpy(dtype=float)])
+    Q, R = qr_factor(X)
+
     while candidate_x:
-        # Строим модель
-        X = sm.add_constant(df[candidate_x])
-        y = df[y_col]
-        model = sm.OLS(y, X).fit()
+        fit = ols_from_qr(Q, R, y)
 
         m = len(candidate_x)
         dfree = n - m - 1
 
-        # Получаем t-критическое значение
-        if 1 <= dfree <= len(t_criteria_list):
-            t_crit = t_criteria_list[dfree - 1]
-        else:
-            t_crit = t_criteria_list[-1]
+        # Получаем t-критическое значение (насыщенная модель - исключаем фактор всегда)
+        t_crit = t_critical(dfree) if dfree >= 1 else float('inf')
 
         print(f"\n--- Шаг {iteration} ---")
         print(f"Факторы: {candidate_x}")
@@ -87,24 +89,17 @@ def iterative_regression(df: pd.DataFrame, y_col: str, candidate_x: list):
         print(f"Степени свободы: {dfree}")
 
         # Проверяем коэффициенты (исключая константу)
-        t_values = model.tvalues.drop("const")
-        p_values = model.pvalues.drop("const")
+        t_values = fit['t_values'][1:]
+        p_values = fit['p_values'][1:]
 
         print("t-статистики факторов:")
-        for factor in candidate_x:
-            t_val = t_values[factor]
-            p_val = p_values[factor]
+        for factor, t_val, p_val in zip(candidate_x, t_values, p_values):
             print(f"  {factor}: t = {t_val:.6f}, p = {p_val:.6f}")
 
         # Находим фактор с наименьшей по модулю t-статистикой
-        min_abs_t = float('inf')
-        weakest_factor = None
-
-        for factor in candidate_x:
-            abs_t = abs(t_values[factor])
-            if abs_t < min_abs_t:
-                min_abs_t = abs_t
-                weakest_factor = factor
+        weakest = int(np.argmin(np.abs(t_values)))
+        weakest_factor = candidate_x[weakest]
+        min_abs_t = abs(t_values[weakest])
 
         print(f"Минимальная |t|: {min_abs_t:.6f} (фактор: {weakest_factor})")
 
@@ -113,6 +108,7 @@ def iterative_regression(df: pd.DataFrame, y_col: str, candidate_x: list):
             print(f"→ Исключаем {weakest_factor} (|t| < t_crit)")
             candidate_x.remove(weakest_factor)
             removed.append(weakest_factor)
+            Q, R = drop_column(Q, R, weakest + 1)
             iteration += 1
         else:
             print("→ Все факторы значимы, останавливаемся")
@@ -120,26 +116,7 @@ def iterative_regression(df: pd.DataFrame, y_col: str, candidate_x: list):
 
     # Финальная модель
     if candidate_x:
-        X = sm.add_constant(df[candidate_x])
-        y = df[y_col]
-        final_model = sm.OLS(y, X).fit()
-
-        # Проверка по F-критерию Фишера
-        f_fact = final_model.fvalue
-        k1 = len(candidate_x)
-        k2 = n - k1 - 1
-        f_crit = F_CRITICAL_VALUES.get(k1, {}).get(k2, None)
-
-        return {
-            "equation": final_model.params.to_dict(),
-            "t_values": final_model.tvalues.to_dict(),
-            "f_fact": f_fact,
-            "f_crit": f_crit,
-            "r2": final_model.rsquared,
-            "removed": removed,
-            "final_factors": candidate_x,
-            "model": final_model
-        }
+        return regression_result(df, y_col, candidate_x, fit, removed)
     else:
         return {
             "equation": {"const": y.mean()},
@@ -149,16 +126,40 @@ def iterative_regression(df: pd.DataFrame, y_col: str, candidate_x: list):
             "r2": 0,
             "removed": removed,
             "final_factors": [],
-            "model": None
+            "observed": np.asarray(y, dtype=float),
+            "fitted": np.full(len(y), float(y.mean())),
+            "resid": np.asarray(y, dtype=float) - y.mean(),
         }
 
 
+def regression_result(df: pd.DataFrame, y_col: str, factors: list, fit: dict, removed: list) -> dict:
+    """Результат регрессии из быстрого МНК (массивы для графиков - без statsmodels)"""
+    n = len(df)
+    names = ["const"] + list(factors)
+
+    # Проверка по F-критерию Фишера (линейно зависимые факторы степеней свободы не дают)
+    k1 = len(factors) - int(fit['deficient'].sum())
+    k2 = n - k1 - 1
+    f_crit = f_critical(k1, k2)
+
+    return {
+        "equation": dict(zip(names, fit['coef'].tolist())),
+        "t_values": dict(zip(names, fit['t_values'].tolist())),
+        "f_fact": fit['f_value'],
+        "f_crit": f_crit,
+        "r2": fit['r2'],
+        "removed": removed,
+        "final_factors": list(factors),
+        "observed": df[y_col].to_numpy(dtype=float),
+        "fitted": fit['fitted'],
+        "resid": fit['resid'],
+    }
+
+
 def build_integral_model(db: Session, years: List[int], selected_factors: List[str], iterative: bool = True):
     """Модель: интегральный показатель (y)"""
-    data = get_data_1(db, years)
-    df = pd.DataFrame(data)
-    y_data = get_y_data_from_db(db, years)
-    df["integrated_index"] = y_data.values
+    integral_index.ensure_run(db)  # переиспользует расчет, если данные не менялись
+    df = get_data_1(db, years)
 
     if iterative:
         return iterative_regression(df, "integrated_index", selected_factors)
@@ -168,10 +169,7 @@ def build_integral_model(db: Session, years: List[int], selected_factors: List[s
 
 def build_interval_model(db: Session, years: List[int], selected_factors: List[str], iterative: bool = True):
     """Модель: интервал (y)"""
-    data = get_data_2(db, years)
-    df = pd.DataFrame(data)
-    y_data = get_y_data_from_db_interval(db, years)
-    df["interval"] = y_data.values
+    df = get_data_2(db, years)
 
     if iterative:
         return iterative_regression(df, "interval", selected_factors)
@@ -179,60 +177,35 @@ def build_interval_model(db: Session, years: List[int], selected_factors: List[s
         return single_step_regression(df, "interval", selected_factors)
 
 
-def get_y_data_from_db(db, years):
-    """Получаем реальные значения integrated_index из базы данных"""
-    results = db.query(AnalysisResult).filter(AnalysisResult.year.in_(years)).order_by(AnalysisResult.year).all()
+def search_integral_models(db: Session, years: List[int], factors: List[str], top_k: int = 10):
+    """Перебор всех наборов факторов для интегрального показателя"""
+    integral_index.ensure_run(db)
+    df = get_data_1(db, years)
+    return best_subset_search(df, "integrated_index", factors, top_k=top_k)
 
-    y_data = pd.Series(
-        {result.year: result.integrated_index for result in results},
-        name='integrated_index'
-    )
 
-    return y_data
+def search_interval_models(db: Session, years: List[int], factors: List[str], top_k: int = 10):
+    """Перебор всех наборов факторов для интервала"""
+    df = get_data_2(db, years)
+    return best_subset_search(df, "interval", factors, top_k=top_k)
 
 
-def get_y_data_from_db_interval(db, years):
-    """Получаем значения interval из базы данных"""
-    results = db.query(MCKData).filter(MCKData.year.in_(years)).order_by(MCKData.year).all()
+def get_y_data_from_db(db, years):
+    """Получаем реальные значения integrated_index из базы данных"""
+    return load_frame(db, years, columns=[], with_integral=True)['integrated_index']
 
-    y_data = pd.Series(
-        {result.year: result.interval for result in results},
-        name='interval'
-    )
 
+def get_y_data_from_db_interval(db, years):
+    """Получаем значения interval из базы данных"""
+    y_data = load_frame(db, years, columns=['interval'])['interval']
     print(f"Y данные (interval) из БД: {y_data.values}")
     return y_data
 
 def single_step_regression(df: pd.DataFrame, y_col: str, candidate_x: list):
     """Обычная регрессия без исключения факторов"""
-    X = sm.add_constant(df[candidate_x])
-    y = df[y_col]
-    model = sm.OLS(y, X).fit()
-
-    n = len(df)
-    m = len(candidate_x)
-    dfree = n - m - 1
-
-    if 1 <= dfree <= len(t_criteria_list):
-        t_crit = t_criteria_list[dfree - 1]
-    else:
-        t_crit = t_criteria_list[-1]
-
-    f_fact = model.fvalue
-    k1 = len(candidate_x)
-    k2 = n - k1 - 1
-    f_crit = F_CRITICAL_VALUES.get(k1, {}).get(k2, None)
-
-    return {
-        "equation": model.params.to_dict(),
-        "t_values": model.tvalues.to_dict(),
-        "f_fact": f_fact,
-        "f_crit": f_crit,
-        "r2": model.rsquared,
-        "removed": [],
-        "final_factors": candidate_x,
-        "model": model
-    }
+    X = np.column_stack([np.ones(len(df)), df[candidate_x].to_numpy(dtype=float)])
+    fit = ols_fit(X, df[y_col].to_numpy(dtype=float))
+    return regression_result(df, y_col, candidate_x, fit, [])
 
 
 if __name__ == "__main__":
@@ -241,13 +214,12 @@ if __name__ == "__main__":
     pd.set_option('display.width', None)
     pd.set_option('display.max_colwidth', None)
     pd.set_option('display.float_format', '{:.6f}'.format)
-    db = next(get_db())
-    data_records = get_all_data(db)
-    years = [record.year for record in data_records]
+    with session_scope() as db:
+        years = load_years(db)
 
-    integral_model = build_integral_model(db, years, ["failures_1", "interval"])
-    print_regression_result("Модель интегрального показателя", "integrated_index", integral_model)
+        integral_model = build_integral_model(db, years, ["failures_1", "interval"])
+        print_regression_result("Модель интегрального показателя", "integrated_index", integral_model)
 
-    interval_model = build_interval_model(db, years, ["failures_3", "tech_failures"])
-    print_regression_result("Модель интервала", "interval", interval_model)
+        interval_model = build_interval_model(db, years, ["failures_3", "tech_failures"])
+        print_regression_result("Модель интервала", "interval", interval_model)
 
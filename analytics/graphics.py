@@ -1,60 +1,194 @@
-import pickle
-import matplotlib.pyplot as plt
+import numpy as np
 import scipy.stats as stats
-import mplcursors
-from pathlib import Path
-
-def plot_regression_diagnostics(pkl_name: str):
-    with open(Path(__file__).parent.parent.absolute() / str("data/" + pkl_name + ".pkl"), "rb") as f:
-        result_dict = pickle.load(f)
-
-    model = result_dict["model"]
-
-    y_true = model.model.endog
-    y_pred = model.fittedvalues
-    residuals = model.resid
-    fig, axes = plt.subplots(1, 2, figsize=(14, 6))
-
-    # === Predicted vs Observed ===
-    scatter = axes[0].scatter(y_pred, y_true, color="blue", label="Данные")
-    axes[0].plot(
-        [min(y_pred) - 0.15, max(y_pred) + 0.15],
-        [min(y_pred) - 0.15, max(y_pred) + 0.15],
-        "r-", label="y = ŷ"
-    )
+from matplotlib.figure import Figure
+from scipy.spatial import cKDTree
+
+from controllers.model_crud import get_latest_model, model_arrays
+from libs.database import session_scope
+
+DENSITY_THRESHOLD = 20000  # больше точек - плотность (hexbin) вместо диаграммы рассеяния
+MAX_MARKERS = 4000  # точек на упорядоченном графике остатков после прореживания
+HEXBIN_GRIDSIZE = 150
+
+
+def decimate(n: int, max_points: int = MAX_MARKERS) -> np.ndarray:
+    """Равномерно прореженные индексы 0..n-1 (первая и последняя точки сохраняются)"""
+    if n <= max_points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, max_points).astype(int))
+
+
+class PointHover:
+    """Подсказка у ближайшей точки под курсором.
+
+    Поиск - по KD-дереву в нормированных координатах (несколько кандидатов,
+    затем точное сравнение в пикселях), подсказка перерисовывается через blitting
+    поверх сохраненного фона без перерисовки всей фигуры.
+    """
+
+    def __init__(self, ax, formatter, tolerance: float = 8, candidates: int = 16):
+        self.ax = ax
+        self.formatter = formatter
+        self.tolerance = tolerance
+        self.candidates = candidates
+        self.points = np.empty((0, 2))
+        self.scale = np.ones(2)
+        self.tree = None
+        self.background = None
+        self.annotation = ax.annotate(
+            "", xy=(0, 0), xytext=(12, 12), textcoords="offset points",
+            bbox=dict(boxstyle="round", fc="lightyellow", alpha=0.9),
+            animated=True, visible=False,
+        )
+        ax.figure.canvas.mpl_connect("draw_event", self.on_draw)
+        ax.figure.canvas.mpl_connect("motion_notify_event", self.on_move)
+
+    def set_points(self, x, y):
+        self.points = np.column_stack([x, y]).astype(float)
+        self.annotation.set_visible(False)
+        if not len(self.points):
+            self.tree = None
+            return
+        span = np.ptp(self.points, axis=0)
+        self.scale = np.where(span > 0, span, 1.0)
+        self.tree = cKDTree(self.points / self.scale)
+
+    def nearest(self, event):
+        """Индекс ближайшей точки в пределах tolerance пикселей или None"""
+        k = min(self.candidates, len(self.points))
+        _, idx = self.tree.query(np.array([event.xdata, event.ydata]) / self.scale, k=k)
+        idx = np.atleast_1d(idx)
+        pixels = self.ax.transData.transform(self.points[idx])
+        distances = np.hypot(pixels[:, 0] - event.x, pixels[:, 1] - event.y)
+        best = distances.argmin()
+        return int(idx[best]) if distances[best] <= self.tolerance else None
+
+    def on_draw(self, event):
+        canvas = self.ax.figure.canvas
+        self.background = canvas.copy_from_bbox(self.ax.figure.bbox)
+        if self.annotation.get_visible():
+            self.ax.draw_artist(self.annotation)
+
+    def on_move(self, event):
+        if self.background is None:
+            return
+        idx = None
+        if event.inaxes is self.ax and self.tree is not None:
+            idx = self.nearest(event)
+        if idx is None:
+            if self.annotation.get_visible():
+                self.annotation.set_visible(False)
+                self.blit()
+            return
+        x, y = self.points[idx]
+        self.annotation.xy = (x, y)
+        self.annotation.set_text(self.formatter(x, y))
+        self.annotation.set_visible(True)
+        self.blit()
+
+    def blit(self):
+        canvas = self.ax.figure.canvas
+        canvas.restore_region(self.background)
+        self.ax.draw_artist(self.annotation)
+        canvas.blit(self.ax.figure.bbox)
+
+
+def diagnostics_data(arrays: dict) -> dict:
+    """Точки графиков диагностики по массивам модели"""
+    y_true = arrays["observed"]
+    y_pred = arrays["fitted"]
+    (osm, osr), (slope, intercept, r) = stats.probplot(arrays["resid"], dist="norm")
+    limits = np.array([y_pred.min() - 0.15, y_pred.max() + 0.15]) if y_pred.size else np.zeros(2)
+    return {
+        "y_true": y_true,
+        "y_pred": y_pred,
+        "osm": osm,
+        "osr": osr,
+        "diagonal": limits,
+        "normal_line": slope * osm + intercept,
+    }
+
+
+def draw_diagnostics(fig: Figure) -> dict:
+    """Оси и пустые элементы графиков (Predicted vs Observed и нормальный график остатков)"""
+    axes = fig.subplots(1, 2)
+
+    scatter = axes[0].scatter([], [], color="blue", label="Данные")
+    diagonal, = axes[0].plot([], [], "r-", label="y = ŷ")
     axes[0].set_xlabel("Predicted Values")
     axes[0].set_ylabel("Observed Values")
     axes[0].set_title("Predicted vs. Observed")
     axes[0].legend()
     axes[0].grid(True)
 
-    cursor1 = mplcursors.cursor(scatter, hover=True)
-    @cursor1.connect("add")
-    def on_add(sel):
-        idx = sel.index
-        sel.annotation.set_text(
-            f"Observed={y_true[idx]:.4f}\nPredicted={y_pred[idx]:.4f}"
-        )
-
-    (osm, osr), (slope, intercept, r) = stats.probplot(residuals, dist="norm")
-    scatter2 = axes[1].scatter(osm, osr, color="green", label="Residuals")
-    axes[1].plot(osm, slope * osm + intercept, "r-", label="Нормальное распределение")
+    scatter2 = axes[1].scatter([], [], color="green", label="Residuals")
+    normal_line, = axes[1].plot([], [], "r-", label="Нормальное распределение")
     axes[1].set_title("Normal Probability Plot of Residuals")
     axes[1].set_xlabel("Theoretical Quantiles")
     axes[1].set_ylabel("Ordered Residuals")
     axes[1].legend()
     axes[1].grid(True)
 
-    cursor2 = mplcursors.cursor(scatter2, hover=True)
+    return {
+        "axes": axes, "scatter": scatter, "diagonal": diagonal,
+        "scatter2": scatter2, "normal_line": normal_line, "density": None,
+        "hover": PointHover(axes[0], lambda x, y: f"Observed={y:.4f}\nPredicted={x:.4f}"),
+        "hover2": PointHover(axes[1], lambda x, y: f"Theor.Q={x:.4f}\nResid={y:.4f}"),
+    }
 
-    @cursor2.connect("add")
-    def on_add2(sel):
-        idx = sel.index
-        sel.annotation.set_text(
-            f"Theor.Q={osm[idx]:.4f}\nResid={osr[idx]:.4f}"
-        )
 
-    plt.tight_layout()
+def update_diagnostics(artists: dict, data: dict):
+    """Замена данных в готовых элементах графиков без пересоздания фигуры.
+
+    Выше DENSITY_THRESHOLD точек Predicted vs Observed рисуется плотностью (hexbin),
+    а упорядоченные остатки прореживаются до MAX_MARKERS; подсказки ищут по всем точкам.
+    """
+    ax = artists["axes"][0]
+    if artists["density"] is not None:
+        artists["density"].remove()
+        artists["density"] = None
+
+    n = len(data["y_pred"])
+    if n > DENSITY_THRESHOLD:
+        artists["scatter"].set_offsets(np.empty((0, 2)))
+        artists["density"] = ax.hexbin(data["y_pred"], data["y_true"], gridsize=HEXBIN_GRIDSIZE,
+                                       bins="log", mincnt=1, cmap="Blues")
+    else:
+        artists["scatter"].set_offsets(np.column_stack([data["y_pred"], data["y_true"]]))
+    artists["diagonal"].set_data(data["diagonal"], data["diagonal"])
+
+    shown = decimate(len(data["osm"]))
+    artists["scatter2"].set_offsets(np.column_stack([data["osm"][shown], data["osr"][shown]]))
+    # Теоретическая прямая - достаточно двух крайних точек
+    ends = [0, len(data["osm"]) - 1] if len(data["osm"]) else []
+    artists["normal_line"].set_data(data["osm"][ends], data["normal_line"][ends])
+
+    artists["hover"].set_points(data["y_pred"], data["y_true"])
+    artists["hover2"].set_points(data["osm"], data["osr"])
+
+    for ax, hover in zip(artists["axes"], (artists["hover"], artists["hover2"])):
+        # relim учитывает только линии - границы точек добавляем явно
+        ax.relim()
+        if len(hover.points):
+            ax.update_datalim([hover.points.min(axis=0), hover.points.max(axis=0)])
+        ax.autoscale_view()
+
+
+def plot_regression_diagnostics(name: str):
+    """Графики диагностики последней версии модели в отдельном окне matplotlib"""
+    import matplotlib.pyplot as plt
+
+    with session_scope() as db:
+        record = get_latest_model(db, name)
+        if record is None:
+            print(f"Модель {name} еще не построена")
+            return
+        arrays = model_arrays(record)
+
+    fig = plt.figure(figsize=(14, 6))
+    artists = draw_diagnostics(fig)
+    update_diagnostics(artists, diagnostics_data(arrays))
+    fig.tight_layout()
     plt.show()
 
 
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import threading
+import time
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from analytics.ryab import get_data, normalize_data, calculate, columns_in_norm, NORM_DIRECTIONS
+from controllers.analysis_crud import (create_analysis_run, update_analysis_run, find_analysis_run,
+                                       get_active_run, get_analysis_results)
+from controllers.data_loader import load_years
+from controllers.measurement_crud import has_measurements
+
+
+def data_fingerprint(raw: pd.DataFrame) -> str:
+    """Хеш исходных данных (годы, столбцы и значения)"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(raw.columns)).encode())
+    digest.update(np.ascontiguousarray(raw.index.to_numpy(dtype=np.int64)).tobytes())
+    digest.update(np.ascontiguousarray(raw.to_numpy(dtype=float)).tobytes())
+    return digest.hexdigest()
+
+
+def synchronized(method):
+    """Методы IntegralIndex вызываются и из фоновых задач - состояние меняет один поток"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class IntegralIndex:
+    """Интегральный показатель с инкрементальным пересчетом.
+
+    Хранит исходные и нормализованные данные, min/max по столбцам и последние веса.
+    Если новая/измененная строка не сдвигает min/max ни одного столбца, нормализуется
+    только она, итерации стартуют с прошлых весов, а в БД перезаписываются только
+    изменившиеся (больше чем на save_tol) годы. Иначе выполняется полный пересчет.
+
+    Каждый расчет сохраняется как AnalysisRun; если для тех же параметров и данных
+    расчет уже есть, он переиспользуется. Сохраненные расчеты не меняются: инкрементальное
+    изменение становится новым расчетом (неизмененные годы копируются из предыдущего).
+    """
+
+    def __init__(self, tol: float = 1e-10, max_iter: int = 100, save_tol: float = 1e-9):
+        self.tol = tol
+        self.max_iter = max_iter
+        self.save_tol = save_tol
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.raw = None
+        self.normalized = None
+        self.mins = None
+        self.maxs = None
+        self.weights = None
+        self.results = None
+        self.info = None
+        self.run_id = None
+        self.fingerprint = None
+
+    @property
+    def loaded(self):
+        return self.raw is not None
+
+    @property
+    def params_hash(self) -> str:
+        params = {'method': 'ryab', 'tol': self.tol, 'max_iter': self.max_iter, 'directions': NORM_DIRECTIONS}
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    @synchronized
+    def recompute(self, db: Session):
+        """Расчет по всем годам из базы; при неизменных входных данных переиспользует расчет"""
+        years = load_years(db)
+        if not years:
+            return None
+        raw = get_data(db, years)[columns_in_norm].astype(float)
+        fingerprint = data_fingerprint(raw)
+
+        active = get_active_run(db)
+        if self.loaded and active is not None and active.id == self.run_id and fingerprint == self.fingerprint:
+            return self.as_dicts()
+
+        run = find_analysis_run(db, self.params_hash, fingerprint)
+        if run is not None:
+            self._restore(db, run, raw)
+        else:
+            start = time.perf_counter()
+            self.results = None
+            self._fit(raw)
+            self._create_run(db, fingerprint, time.perf_counter() - start)
+        return self.as_dicts()
+
+    @synchronized
+    def ensure_run(self, db: Session):
+        """id расчета, соответствующего текущим данным (считает, только если такого нет)"""
+        self.recompute(db)
+        return self.run_id
+
+    @synchronized
+    def upsert_row(self, db: Session, year: int):
+        """Учет добавленного или измененного года. None - если расчет еще не выполнялся.
+
+        Строка берется из годового ряда, как ее видит аналитика. За год с измерениями
+        ряд строится не из mck_data - тогда полный пересчет (или переиспользование расчета).
+        """
+        if not self.loaded:
+            return None
+        if has_measurements(db, year):
+            return self.recompute(db)
+        frame = get_data(db, [year])
+        if year not in frame.index:
+            return self.recompute(db)
+
+        row = frame.loc[year].astype(float)
+        raw = self.raw.copy()
+        edits_extreme = year in raw.index and self._holds_extreme(raw.loc[year])
+        raw.loc[year] = row
+        raw = raw.sort_index()
+
+        moves_extreme = ((row < self.mins) | (row > self.maxs)).any()
+        start = time.perf_counter()
+        if edits_extreme or moves_extreme:
+            changed = self._fit(raw)
+        else:
+            normalized = self.normalized.copy()
+            normalized.loc[year] = self._normalize_row(row)
+            changed = self._warm_fit(raw, normalized.sort_index())
+
+        self._save(db, changed.union([year]), time.perf_counter() - start)
+        return self.as_dicts()
+
+    @synchronized
+    def remove_year(self, db: Session, year: int):
+        """Учет удаленного года. None - если расчет еще не выполнялся."""
+        if not self.loaded or year not in self.raw.index:
+            return None
+        if has_measurements(db, year):  # год остается в ряду по измерениям
+            return self.recompute(db)
+
+        raw = self.raw.drop(index=year)
+        if raw.empty:
+            self._reset()
+            return None
+
+        start = time.perf_counter()
+        if self._holds_extreme(self.raw.loc[year]):
+            changed = self._fit(raw)
+        else:
+            changed = self._warm_fit(raw, self.normalized.drop(index=year))
+
+        self._save(db, changed, time.perf_counter() - start, removed=[year])
+        return self.as_dicts()
+
+    def as_dicts(self):
+        return self.results.to_dict(), dict(zip(columns_in_norm, self.weights)), self.info
+
+    def _holds_extreme(self, row: pd.Series) -> bool:
+        return ((row == self.mins) | (row == self.maxs)).any()
+
+    def _normalize_row(self, row: pd.Series) -> pd.Series:
+        span = self.maxs - self.mins
+        reverse = pd.Series(NORM_DIRECTIONS)[columns_in_norm]
+        forward = (row - self.mins) / span
+        backward = (self.maxs - row) / span
+        normalized = forward.where(~reverse, backward).where(span != 0, 0.5)
+        return normalized.round(15)
+
+    def _fit(self, raw: pd.DataFrame) -> pd.Index:
+        self.mins = raw.min()
+        self.maxs = raw.max()
+        return self._store(raw, normalize_data(raw), None)
+
+    def _warm_fit(self, raw: pd.DataFrame, normalized: pd.DataFrame) -> pd.Index:
+        return self._store(raw, normalized, self.weights)
+
+    def _store(self, raw, normalized, initial_weights) -> pd.Index:
+        y_stage, weights, info = calculate(normalized, tol=self.tol, max_iter=self.max_iter,
+                                           initial_weights=initial_weights)
+        results = y_stage['weighted_sum']
+
+        if self.results is None:
+            changed = results.index
+        else:
+            previous = self.results.reindex(results.index)
+            changed = results.index[~np.isclose(results, previous, rtol=0, atol=self.save_tol)]
+
+        self.raw = raw
+        self.normalized = normalized
+        self.weights = weights['correlation'].to_numpy()
+        self.results = results
+        self.info = info
+        return changed
+
+    def _restore(self, db: Session, run, raw: pd.DataFrame):
+        """Состояние из сохраненного расчета без повторных итераций"""
+        results = {result.year: result.integrated_index for result in get_analysis_results(db, run.id)}
+        self.raw = raw
+        self.normalized = normalize_data(raw)
+        self.mins = raw.min()
+        self.maxs = raw.max()
+        self.weights = np.array([run.weights[column] for column in columns_in_norm])
+        self.results = pd.Series(results, name='weighted_sum').reindex(raw.index)
+        self.info = {
+            'iterations': run.iterations,
+            'residual': run.residual,
+            'converged': run.residual is not None and run.residual <= self.tol,
+            'history': [],
+            'reused': True,
+        }
+        self.run_id = run.id
+        self.fingerprint = run.data_fingerprint
+        update_analysis_run(db, run.id)  # делаем расчет текущим
+
+    def _run_fields(self, duration: float) -> dict:
+        return {
+            'weights': dict(zip(columns_in_norm, self.weights.tolist())),
+            'iterations': self.info['iterations'],
+            'residual': float(self.info['residual']),
+            'duration': duration,
+        }
+
+    def _create_run(self, db: Session, fingerprint: str, duration: float):
+        results = {year: self.results[year] for year in self.results.index}
+        run = create_analysis_run(db, self.params_hash, fingerprint, results=results,
+                                  **self._run_fields(duration))
+        self.run_id = run.id
+        self.fingerprint = fingerprint
+
+    def _save(self, db: Session, years, duration: float, removed=()):
+        """Результат инкрементального пересчета - новым расчетом на основе текущего"""
+        fingerprint = data_fingerprint(self.raw)
+        run = find_analysis_run(db, self.params_hash, fingerprint)
+        if run is not None:  # такие данные уже считались (например, правку откатили)
+            self._restore(db, run, self.raw)
+            return
+        run = create_analysis_run(db, self.params_hash, fingerprint,
+                                  results={year: self.results[year] for year in years},
+                                  base_run_id=self.run_id, exclude_years=removed,
+                                  **self._run_fields(duration))
+        self.run_id = run.id
+        self.fingerprint = fingerprint
+
+
+integral_index = IntegralIndex()
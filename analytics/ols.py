@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from scipy.linalg import qr, qr_delete, solve_triangular
+from scipy.stats import t as t_dist
+
+# Столбец R с |R[j, j]| <= RANK_RTOL * max|diag(R)| линейно зависит от предыдущих
+RANK_RTOL = 1e-10
+
+
+def qr_factor(X: np.ndarray):
+    """Экономичное QR-разложение матрицы регрессоров"""
+    return qr(np.asarray(X, dtype=float), mode='economic')
+
+
+def drop_column(Q: np.ndarray, R: np.ndarray, k: int):
+    """Удаление k-го столбца из готового QR-разложения (без повторного разложения)"""
+    return qr_delete(Q, R, k, 1, which='col', overwrite_qr=False)
+
+
+def ols_from_qr(Q: np.ndarray, R: np.ndarray, y: np.ndarray) -> dict:
+    """МНК по QR-разложению: коэффициенты, ст. ошибки, t- и p-значения, R², F.
+
+    Предполагается, что первый столбец X - константа. Если матрица регрессоров
+    вырождена (нулевой или линейно зависимый фактор), коэффициенты - решение
+    с минимальной нормой (как pinv в statsmodels), а у зависимых столбцов
+    (deficient) t = 0 и p = 1 - пошаговое исключение удаляет их первыми.
+    """
+    n, p = Q.shape
+    qty = Q.T @ y
+    diag = np.abs(np.diag(R))
+    deficient = diag <= RANK_RTOL * diag.max() if p else np.zeros(0, dtype=bool)
+    rank = p - int(deficient.sum())
+
+    if rank == p:
+        coef = solve_triangular(R, qty)
+        fitted = Q @ qty
+        r_inv = solve_triangular(R, np.eye(p))
+    else:
+        # Столбцы Q у зависимых факторов не лежат в пространстве X - проекция через R @ coef
+        r_inv = np.linalg.pinv(R, rcond=RANK_RTOL)
+        coef = r_inv @ qty
+        fitted = Q @ (R @ coef)
+    resid = y - fitted
+
+    df_resid = n - rank
+    sse = resid @ resid
+    centered = y - y.mean()
+    sst = centered @ centered
+
+    sigma2 = sse / df_resid if df_resid > 0 else np.nan
+    se = np.sqrt((r_inv * r_inv).sum(axis=1) * sigma2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_values = coef / se
+        t_values[deficient] = 0.0
+        p_values = 2 * t_dist.sf(np.abs(t_values), df_resid)
+        r2 = 1 - sse / sst
+        f_value = ((sst - sse) / (rank - 1)) / sigma2 if rank > 1 else np.nan
+
+    return {
+        'coef': coef,
+        'se': se,
+        't_values': t_values,
+        'p_values': p_values,
+        'r2': r2,
+        'f_value': f_value,
+        'sse': sse,
+        'df_resid': df_resid,
+        'fitted': fitted,
+        'resid': resid,
+        'deficient': deficient,
+    }
+
+
+def ols_fit(X: np.ndarray, y: np.ndarray) -> dict:
+    """МНК по матрице регрессоров X (с константой в первом столбце)"""
+    Q, R = qr_factor(X)
+    return ols_from_qr(Q, R, np.asarray(y, dtype=float))
+
+
+def statsmodels_results(df: pd.DataFrame, y_col: str, factors: list):
+    """Полный объект statsmodels - только когда нужна диагностика (графики, summary)"""
+    # Импорт здесь: процессы пула best_subset не должны загружать statsmodels
+    import statsmodels.api as sm
+
+    X = sm.add_constant(df[factors], has_constant='add')
+    return sm.OLS(df[y_col], X).fit()
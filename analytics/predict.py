@@ -1,52 +1,71 @@
+import numpy as np
 from sqlalchemy.orm import Session
 
-from analytics.equations import build_interval_model, build_integral_model
-from analytics.prokofiev import predict_prokofiev
-from libs.database import get_db
+from analytics.prokofiev import prokofiev_forecast
+from controllers.data_loader import load_frame, MCK_COLUMNS
+from libs.database import session_scope
 
 
-def calculate_final_predict(db: Session, dict):
-    equation_names = [key for key in dict['equation'].keys() if key != 'const']
+class ForecastPipeline:
+    """Прогноз по сохраненному уравнению регрессии.
 
-    res_name = []
-    for name in equation_names:
-        result = predict_prokofiev(db, str(name))
-        res_name.append(result)
+    Столбцы и коэффициенты разбираются один раз при сборке; запуск - один запрос
+    (через кеш загрузчика), прогноз Прокофьева для всех факторов и скалярное произведение.
+    """
 
+    def __init__(self, equation: dict, window: int = 5):
+        self.window = window
+        self.const = float(equation.get('const', 0.0))
+        self.factors = [name for name in equation if name != 'const']
+        self.coefficients = np.array([equation[name] for name in self.factors], dtype=float)
+        # Неизвестные базе факторы дают NaN, как и predict_prokofiev
+        self.columns = [name for name in self.factors if name in MCK_COLUMNS]
+        self.positions = [self.factors.index(name) for name in self.columns]
 
-    final_prediction = dict['equation']['const']
+    def factor_forecasts(self, db: Session) -> np.ndarray:
+        forecasts = np.full(len(self.factors), np.nan)
+        if self.columns:
+            frame = load_frame(db, columns=self.columns)
+            forecasts[self.positions] = prokofiev_forecast(frame.to_numpy(), self.window)
+        return forecasts
 
-    for i, name in enumerate(equation_names):
-        coefficient = dict['equation'][name]
-        prediction = res_name[i]
-        final_prediction += coefficient * prediction
+    def run(self, db: Session) -> float:
+        return float(self.const + self.factor_forecasts(db) @ self.coefficients)
 
-    print(f"Final prediction: {final_prediction:.6f}")
-
-    return final_prediction
 
-def calculate_final_predict_integral(db: Session, dict):
+# (версия модели, окно) -> ForecastPipeline
+_pipelines = {}
 
-    equation_names = [key for key in dict['equation'].keys() if key != 'const']
 
-    res_name = []
-    for name in equation_names:
-        result = predict_prokofiev(db, str(name))
-        res_name.append(result)
+def get_pipeline(equation: dict, version=None, window: int = 5) -> ForecastPipeline:
+    """Собранный прогноз для модели; кешируется по версии модели.
 
+    version - уникальный ключ версии, например ("interval", номер версии в хранилище моделей).
+    """
+    if version is None:
+        return ForecastPipeline(equation, window)
+    key = (version, window)
+    pipeline = _pipelines.get(key)
+    if pipeline is None:
+        pipeline = _pipelines[key] = ForecastPipeline(equation, window)
+    return pipeline
 
-    final_prediction = dict['equation']['const']
 
-    for i, name in enumerate(equation_names):
-        coefficient = dict['equation'][name]
-        prediction = res_name[i]
-        final_prediction += coefficient * prediction
+def calculate_final_predict(db: Session, dict, version=None, window: int = 5):
+    """Точечный прогноз по уравнению модели (интегральной или интервальной)"""
+    final_prediction = get_pipeline(dict['equation'], version, window).run(db)
 
     print(f"Final prediction: {final_prediction:.6f}")
 
     return final_prediction
 
+
 if __name__ == "__main__":
-    db = next(get_db())
-    calculate_final_predict(db)
-    calculate_final_predict_integral(db)
+    from controllers.model_crud import get_latest_model, model_to_dict
+
+    with session_scope() as db:
+        for name in ("integral", "interval"):
+            record = get_latest_model(db, name)
+            if record is not None:
+                model = model_to_dict(record)
+                calculate_final_predict(db, model, model['version'])
@@ -1,53 +1,101 @@
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+import pandas as pd
 from sqlalchemy.orm import Session
-from controllers.data_crud import get_all_data
-from libs.database import get_db
+
+from controllers.data_loader import load_frame, MCK_COLUMNS
+from libs.database import session_scope
+
+
+def growth_terms(values: np.ndarray):
+    """Выровненный уровень последнего года и средний абсолютный прирост к нему.
+
+    values - окно из N лет (N x k). Для года j средний абсолютный прирост
+    g_j = mean_{i<j} (y_j - y_i) / (j - i); середина окна выравнивается средним,
+    дальше уровень растет на g_j (для N = 5 - ровно схема y1..y5).
+    Гармонические числа - накопленной суммой, свертка с 1/(j - i) - одним умножением.
+    """
+    n = len(values)
+    lags = np.arange(1, n)
+    harmonic = np.concatenate([[0.0], np.cumsum(1.0 / lags)])  # H_0..H_{n-1}
+
+    # Toeplitz-ядро 1/(j - i) для i < j: S_j = sum_i y_i / (j - i)
+    offsets = np.subtract.outer(np.arange(n), np.arange(n))
+    kernel = np.where(offsets > 0, 1.0 / np.maximum(offsets, 1), 0.0)
+    weighted = kernel @ values
+
+    counts = np.maximum(np.arange(n), 1)[:, None]
+    growth = (values * harmonic[:, None] - weighted) / counts
+    growth[0] = 0.0
+
+    # Среднее относится к середине окна; при четном N середина между годами - первый шаг половинный
+    center = (n + 1) // 2
+    level = values.mean(axis=0) + growth[center:].sum(axis=0)
+    if n % 2 == 0:
+        level -= growth[center] / 2
+    return level, growth[-1]
+
+
+@lru_cache(maxsize=128)
+def prokofiev_weights(window: int, horizon: int) -> np.ndarray:
+    """Веса прогноза (horizon x window): прогноз линеен по значениям окна.
+
+    Считаются один раз на (window, horizon); сам прогноз - одно умножение, O(N) на показатель.
+    """
+    level, growth = growth_terms(np.eye(window))
+    steps = np.arange(1, horizon + 1)[:, None]
+    weights = level[None, :] + steps * growth[None, :]
+    weights.flags.writeable = False
+    return weights
+
+
+def prokofiev_plan(values, window: int = 5, horizon: int = 1) -> np.ndarray:
+    """Прогноз на horizon лет вперед по последним window годам (horizon x показатели).
+
+    При истории короче окна - NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    if window < 2 or len(values) < window:
+        return np.full((horizon, values.shape[1]), np.nan)
+    return prokofiev_weights(window, horizon) @ values[-window:]
+
+
+def prokofiev_forecast(values, window: int = 5) -> np.ndarray:
+    """Прогноз на один год вперед для каждого столбца матрицы (годы x показатели)"""
+    return prokofiev_plan(values, window, 1)[0]
+
+
+def predict_prokofiev_columns(db: Session, columns: List[str], window: int = 5) -> dict:
+    """Прогнозы сразу для нескольких показателей: один запрос, один векторный проход"""
+    known = [column for column in dict.fromkeys(columns) if column in MCK_COLUMNS]
+    forecasts = dict.fromkeys(columns, np.nan)
+    if known:
+        frame = load_frame(db, columns=known)
+        forecasts.update(zip(known, prokofiev_forecast(frame.to_numpy(), window).tolist()))
+    return forecasts
+
+
+def plan_prokofiev(db: Session, columns: List[str] = None, window: int = 5, horizon: int = 3) -> pd.DataFrame:
+    """План на horizon лет для показателей (по умолчанию - для всех): строки - годы прогноза"""
+    columns = MCK_COLUMNS if columns is None else columns
+    frame = load_frame(db, columns=columns)
+    last_year = int(frame.index.max()) if len(frame) else 0
+    return pd.DataFrame(prokofiev_plan(frame.to_numpy(), window, horizon), columns=columns,
+                        index=pd.Index(range(last_year + 1, last_year + horizon + 1), name='year'))
 
 
 def predict_prokofiev(db: Session, index = ""):
-    try:
-        data = get_all_data(db)
-        if not data or len(data) < 5:
-            return []
-
-        last_five_records = data[-5:]
-        if not hasattr(last_five_records[0], index):
-            return []
-
-        last_five_years_data = [getattr(record, index) for record in last_five_records]
-        y1, y2, y3, y4, y5 = last_five_years_data
-
-        abs_pr_12 = y2 - y1
-        abs_pr_24 = y4 - y2
-        abs_pr_34 = y4 - y3
-        abs_pr_45 = y5 - y4
-        abs_pr_35 = y5 - y3
-        abs_pr_25 = y5 - y2
-        abs_pr_23 = y3 - y2
-
-        avg_abs_pr_13 = (y3 - y1) / 2
-        avg_abs_pr_23 = (avg_abs_pr_13 + abs_pr_23) / 2
-        avg_abs_pr_14 = (y4 - y1) / 3
-        avg_abs_pr_24 = abs_pr_24 / 2
-        avg_abs_pr_34 = (avg_abs_pr_14 + avg_abs_pr_24 + abs_pr_34) / 3
-        avg_abs_pr_15 = (y5 - y1) / 4
-        avg_abs_pr_25 = abs_pr_25 / 3
-        avg_abs_pr_35 = abs_pr_35 / 2
-        avg_abs_pr_45 = (avg_abs_pr_15 + avg_abs_pr_25 + avg_abs_pr_35 + abs_pr_45) / 4
-
-        alignment_3 = (y1 + y2 + y3 + y4 + y5) / 5
-        alignment_2 = alignment_3 - avg_abs_pr_23
-        alignment_1 = alignment_2 - abs_pr_12
-        alignment_4 = alignment_3 + avg_abs_pr_34
-        alignment_5 = alignment_4 + avg_abs_pr_45
-
-        predict = alignment_5 + avg_abs_pr_45
-
-        return predict
-
-    except Exception as e:
-        print(e)
+    """Прогноз по одному показателю (NaN, если данных меньше пяти лет или показатель неизвестен)"""
+    return predict_prokofiev_columns(db, [index])[index]
+
 
 if __name__ == "__main__":
-    db = next(get_db())
+    with session_scope() as db:
 
-    print(predict_prokofiev(db, "fare_cost"))
\ No newline at end of file
+        print(predict_prokofiev(db, "fare_cost"))
+        print(predict_prokofiev_columns(db, MCK_COLUMNS))
+        print(plan_prokofiev(db, horizon=3))
@@ -0,0 +1,129 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from sqlalchemy.orm import Session
+
+from analytics.corel_matrix import get_correl_matrix, get_second_correl_matrix
+from analytics.graphics import diagnostics_data, draw_diagnostics, update_diagnostics
+from analytics.integral import integral_index
+from controllers.data_loader import load_frame
+from controllers.model_crud import list_models, get_latest_model, model_arrays, TARGETS
+from libs.database import session_scope
+
+FORMATS = ("png", "svg", "pdf")
+
+
+def render_diagnostics(fig: Figure, payload: dict):
+    artists = draw_diagnostics(fig)
+    update_diagnostics(artists, diagnostics_data(payload["arrays"]))
+    fig.suptitle(payload["title"])
+
+
+def render_heatmap(fig: Figure, payload: dict):
+    ax = fig.subplots()
+    labels = payload["labels"]
+    matrix = payload["matrix"]
+    image = ax.imshow(matrix, cmap="coolwarm", vmin=-1, vmax=1)
+    ax.set_xticks(range(len(labels)), labels, rotation=45, ha="right")
+    ax.set_yticks(range(len(labels)), labels)
+    for i in range(len(labels)):
+        for j in range(len(labels)):
+            ax.text(j, i, f"{matrix[i, j]:.2f}", ha="center", va="center", fontsize=7)
+    fig.colorbar(image, ax=ax)
+    ax.set_title(payload["title"])
+
+
+def render_trend(fig: Figure, payload: dict):
+    ax = fig.subplots()
+    ax.plot(payload["years"], payload["values"], "o-", color="blue")
+    ax.set_xlabel("Год")
+    ax.set_ylabel("Интегральный показатель")
+    ax.set_title(payload["title"])
+    ax.grid(True)
+
+
+RENDERERS = {
+    "diagnostics": (render_diagnostics, (14, 6)),
+    "heatmap": (render_heatmap, (10, 8)),
+    "trend": (render_trend, (10, 5)),
+}
+
+
+def render_job(kind: str, payload: dict, stem: str, formats) -> list:
+    """Отрисовка одного графика во все форматы на холсте Agg (без pyplot и окон).
+
+    Выполняется в процессе пула.
+    """
+    render, figsize = RENDERERS[kind]
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    render(fig, payload)
+    fig.tight_layout()
+    paths = []
+    for fmt in formats:
+        path = f"{stem}.{fmt}"
+        fig.savefig(path, format=fmt)
+        paths.append(path)
+    return paths
+
+
+def collect_jobs(db: Session, all_versions: bool = False) -> list:
+    """Данные всех графиков отчета: (вид, данные, имя файла без расширения)"""
+    jobs = []
+    records = list_models(db) if all_versions else \
+        [record for record in (get_latest_model(db, name) for name in TARGETS) if record is not None]
+    for record in records:
+        jobs.append(("diagnostics", {
+            "title": f"Диагностика модели {record.name}, версия {record.version}",
+            "arrays": model_arrays(record),
+        }, f"diagnostics_{record.name}_v{record.version}"))
+
+    years = load_frame(db).index.tolist()
+    if years:
+        integral_index.ensure_run(db)
+        for name, title, matrix in (
+                ("correlation_integral", "Корреляция факторов и интегрального показателя",
+                 get_correl_matrix(db, years)),
+                ("correlation_interval", "Корреляция факторов и интервала",
+                 get_second_correl_matrix(db, years))):
+            jobs.append(("heatmap", {"title": title, "labels": list(matrix.columns),
+                                     "matrix": matrix.to_numpy()}, name))
+
+        integral = load_frame(db, with_integral=True)["integrated_index"]
+        jobs.append(("trend", {"title": "Динамика интегрального показателя",
+                               "years": integral.index.to_numpy(), "values": integral.to_numpy(dtype=float)},
+                     "integral_trend"))
+    return jobs
+
+
+def export_report(db: Session, out_dir, formats=FORMATS, workers: int = None, all_versions: bool = False) -> list:
+    """Пакет графиков для отчета без GUI: диагностика моделей, корреляции, динамика показателя.
+
+    Данные читаются из базы в текущем процессе, графики рисуются параллельно в пуле процессов.
+    Возвращает список созданных файлов.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    jobs = collect_jobs(db, all_versions)
+    stems = [str(out_dir / stem) for _, _, stem in jobs]
+    workers = workers or os.cpu_count() or 1
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = pool.map(render_job, [kind for kind, _, _ in jobs], [payload for _, payload, _ in jobs],
+                               stems, [formats] * len(jobs))
+            return [path for paths in results for path in paths]
+    return [path for job, stem in zip(jobs, stems) for path in render_job(job[0], job[1], stem, formats)]
+
+
+if __name__ == "__main__":
+    # Запуск из корня проекта: python -m analytics.report [каталог]
+    import sys
+
+    out = sys.argv[1] if len(sys.argv) > 1 else Path(__file__).parent.parent.absolute() / "data/report"
+    with session_scope() as db:
+        for path in export_report(db, out):
+            print(path)
@@ -3,7 +3,7 @@ import pandas as pd
 from typing import List, Dict
 import numpy as np
 from sqlalchemy.orm import Session
-from models.data_models import MCKData
+from controllers.data_loader import load_frame
 
 
 getcontext().prec = 15
@@ -11,6 +11,19 @@ columns_in_norm = ['failures_1', 'failures_2', 'failures_3',
                    'train_losses', 'investments', 'passengers_daily',
                    'tech_failures', 'fare_cost', 'interval']
 
+# Направление нормализации: True - обратная (чем меньше значение, тем лучше)
+NORM_DIRECTIONS = {
+    'failures_1': True,
+    'failures_2': True,
+    'failures_3': True,
+    'train_losses': False,
+    'investments': False,
+    'passengers_daily': False,
+    'tech_failures': False,
+    'fare_cost': False,
+    'interval': False,
+}
+
 
 def excel_normalize(value, min_val, max_val, reverse=False):
     """Нормализация как в Excel"""
@@ -29,188 +42,115 @@ def excel_normalize(value, min_val, max_val, reverse=False):
     return float(result)
 
 def get_data(db: Session, years: List[int]) -> pd.DataFrame:
-    data_records = db.query(MCKData).filter(MCKData.year.in_(years)).order_by(MCKData.year).all()
-
-    # Создаем DataFrame с исходными данными
-    raw_data = []
-    for rec in data_records:
-        raw_data.append({
-            'year': rec.year,
-            'failures_1': rec.failures_1,
-            'failures_2': rec.failures_2,
-            'failures_3': rec.failures_3,
-            'train_losses': rec.train_losses,
-            'investments': rec.investments,
-            'passengers_daily': rec.passengers_daily,
-            'tech_failures': rec.tech_failures,
-            'fare_cost': rec.fare_cost,
-            'interval': rec.interval
-        })
-
-    df_raw = pd.DataFrame(raw_data).set_index('year')
-
-    return pd.DataFrame(df_raw)
-
-
-def normalize_data(data: pd.DataFrame) -> pd.DataFrame:
-    min_max_dict = {}
-
-    # Проходим по всем числовым столбцам (исключая год)
-    numeric_columns = data.select_dtypes(include=[np.number]).columns
-    if 'year' in numeric_columns:
-        numeric_columns = numeric_columns.drop('year')
-
-    for column in numeric_columns:
-        min_val = data[column].min()
-        max_val = data[column].max()
-        min_max_dict[column] = {'min': min_val, 'max': max_val}
-
-    normalize_df = pd.DataFrame()
-
-    normalize_df['failures_1'] = data['failures_1'].apply(
-        lambda x: excel_normalize(x, min_max_dict['failures_1']['min'],
-                                  min_max_dict['failures_1']['max'], reverse=True)
-    )
-
-    normalize_df['failures_2'] = data['failures_2'].apply(
-        lambda x: excel_normalize(x, min_max_dict['failures_2']['min'],
-                                  min_max_dict['failures_2']['max'], reverse=True)
-    )
-
-    normalize_df['failures_3'] = data['failures_3'].apply(
-        lambda x: excel_normalize(x, min_max_dict['failures_3']['min'],
-                                  min_max_dict['failures_3']['max'], reverse=True)
-    )
-
-    normalize_df['train_losses'] = data['train_losses'].apply(
-        lambda x: excel_normalize(x, min_max_dict['train_losses']['min'],
-                                  min_max_dict['train_losses']['max'])
-    )
-
-    normalize_df['investments'] = data['investments'].apply(
-        lambda x: excel_normalize(x, min_max_dict['investments']['min'],
-                                  min_max_dict['investments']['max'])
-    )
-
-    normalize_df['passengers_daily'] = data['passengers_daily'].apply(
-        lambda x: excel_normalize(x, min_max_dict['passengers_daily']['min'],
-                                  min_max_dict['passengers_daily']['max'])
-    )
-
-    normalize_df['tech_failures'] = data['tech_failures'].apply(
-        lambda x: excel_normalize(x, min_max_dict['tech_failures']['min'],
-                                  min_max_dict['tech_failures']['max'])
-    )
-
-    normalize_df['fare_cost'] = data['fare_cost'].apply(
-        lambda x: excel_normalize(x, min_max_dict['fare_cost']['min'],
-                                  min_max_dict['fare_cost']['max'])
-    )
-
-    normalize_df['interval'] = data['interval'].apply(
-        lambda x: excel_normalize(x, min_max_dict['interval']['min'],
-                                  min_max_dict['interval']['max'])
-    )
-    normalize_df = normalize_df.round(15)
-    return normalize_df
-
-
-def calculate(normalized: pd.DataFrame):
-    #1
-    row_means = normalized.mean(axis=1)
-    
-    correlation_results = pd.DataFrame(index=normalized.columns, columns=['correlation'])
-
-    for column in normalized.columns:
-        corr_value = normalized[column].corr(row_means)
-        correlation_results.loc[column, 'correlation'] = corr_value
-
-    correlation_results = correlation_results.astype(float)
-    sum_correlation = correlation_results.values.sum()
-    weights = abs(correlation_results / sum_correlation).round(15)
-
-    #2
-    y2_stage = pd.DataFrame()
-
-    weighted_sum = pd.Series(0, index=normalized.index)
-
-    for column in normalized.columns:
-        column_weight = weights.loc[column, 'correlation']
-        weighted_sum += normalized[column] * column_weight
-
-    y2_stage['weighted_sum'] = weighted_sum
-
-    correlation_results = pd.DataFrame(index=normalized.columns, columns=['correlation'])
-
-    for column in normalized.columns:
-        corr_value = normalized[column].corr(weighted_sum)
-        correlation_results.loc[column, 'correlation'] = corr_value
-
-    sum_correlation = correlation_results.values.sum()
-    weights = abs(correlation_results / sum_correlation).round(15)
-
-    #3
-    y3_stage = pd.DataFrame()
+    """Исходные данные по годам (индекс - год)"""
+    return load_frame(db, years, columns_in_norm)
 
-    weighted_sum = pd.Series(0, index=normalized.index)
 
-    for column in normalized.columns:
-        column_weight = weights.loc[column, 'correlation']
-        weighted_sum += normalized[column] * column_weight
+def normalize_column(values, reverse=False, exact=False) -> np.ndarray:
+    """Min-max нормализация одного столбца.
 
-    y3_stage['weighted_sum'] = weighted_sum
+    exact=True - режим совместимости с Excel: расчет через Decimal по каждой ячейке.
+    Пропуски (NaN) в min/max не участвуют и остаются пропусками, как в pandas.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.size == 0 or np.isnan(values).all():
+        return values
+    min_val = np.nanmin(values)
+    max_val = np.nanmax(values)
 
-    correlation_results = pd.DataFrame(index=normalized.columns, columns=['correlation'])
-
-    for column in normalized.columns:
-        corr_value = normalized[column].corr(weighted_sum)
-        correlation_results.loc[column, 'correlation'] = corr_value
-
-    sum_correlation = correlation_results.values.sum()
-    weights = abs(correlation_results / sum_correlation).round(15)
-
-    #4
-    y4_stage = pd.DataFrame()
-    weighted_sum = pd.Series(0, index=normalized.index)
-
-    for column in normalized.columns:
-        column_weight = weights.loc[column, 'correlation']
-        weighted_sum += normalized[column] * column_weight
-
-    y4_stage['weighted_sum'] = weighted_sum
-
-    correlation_results = pd.DataFrame(index=normalized.columns, columns=['correlation'])
+    if max_val == min_val:
+        return np.full(values.shape, 0.5)
 
-    for column in normalized.columns:
-        corr_value = normalized[column].corr(weighted_sum)
-        correlation_results.loc[column, 'correlation'] = corr_value
+    if exact:
+        return np.array([float(excel_normalize(v, min_val, max_val, reverse=reverse)) for v in values])
 
-    sum_correlation = correlation_results.values.sum()
-    weights = abs(correlation_results / sum_correlation).round(15)
+    if reverse:
+        return (max_val - values) / (max_val - min_val)
+    return (values - min_val) / (max_val - min_val)
 
-    #5
-    y5_stage = pd.DataFrame()
-    weighted_sum = pd.Series(0, index=normalized.index)
 
-    for column in normalized.columns:
-        column_weight = weights.loc[column, 'correlation']
-        weighted_sum += normalized[column] * column_weight
+def normalize_data(data: pd.DataFrame, directions: Dict[str, bool] = None, exact=False) -> pd.DataFrame:
+    """Нормализация показателей по таблице направлений (reverse=True - чем меньше, тем лучше)"""
+    if directions is None:
+        directions = NORM_DIRECTIONS
 
-    y5_stage['weighted_sum'] = weighted_sum
+    normalize_df = pd.DataFrame(index=data.index)
+    for column, reverse in directions.items():
+        if column in data.columns:
+            normalize_df[column] = normalize_column(data[column].to_numpy(), reverse=reverse, exact=exact)
 
-    correlation_results = pd.DataFrame(index=normalized.columns, columns=['correlation'])
+    normalize_df = normalize_df.round(15)
+    return normalize_df
 
-    for column in normalized.columns:
-        corr_value = normalized[column].corr(weighted_sum)
-        correlation_results.loc[column, 'correlation'] = corr_value
 
-    sum_correlation = correlation_results.values.sum()
-    weights = abs(correlation_results / sum_correlation).round(15)
+def correlate_with(centered: np.ndarray, norms: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """Корреляция Пирсона каждого столбца с вектором target (одно матрично-векторное умножение)"""
+    target_centered = target - target.mean()
+    target_norm = np.sqrt(target_centered @ target_centered)
+    denominator = norms * target_norm
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = (centered.T @ target_centered) / denominator
+    # Постоянные столбцы (max == min) не коррелируют ни с чем
+    return np.where(denominator > 0, corr, 0.0)
+
+
+def calculate(normalized: pd.DataFrame, tol: float = 1e-10, max_iter: int = 100, initial_weights=None):
+    """Итерационный расчет весов по методу Рябцева.
+
+    Шаг: корреляция показателей с текущей свёрткой -> новые веса -> взвешенная сумма.
+    Останавливается, когда веса меняются меньше чем на tol, или после max_iter шагов.
+    initial_weights - веса предыдущего расчета для "теплого старта".
+    Возвращает (свёртка, веса, history).
+    """
+    values = normalized.to_numpy(dtype=float)
+    centered = values - values.mean(axis=0)
+    norms = np.sqrt((centered * centered).sum(axis=0))
+
+    if initial_weights is None:
+        target = values.mean(axis=1)
+        weights = None
+    else:
+        weights = np.asarray(initial_weights, dtype=float)
+        target = values @ weights
+
+    history = []
+    residual = np.inf
+    for iteration in range(1, max_iter + 1):
+        corr = correlate_with(centered, norms, target)
+        new_weights = np.abs(corr / corr.sum()).round(15)
+
+        residual = np.inf if weights is None else np.abs(new_weights - weights).max()
+        weights = new_weights
+        history.append({'iteration': iteration, 'weights': weights, 'residual': residual})
+        if residual <= tol:
+            break
+        target = values @ weights
+
+    y_stage = pd.DataFrame({'weighted_sum': values @ weights}, index=normalized.index)
+    weights_df = pd.DataFrame({'correlation': weights}, index=normalized.columns)
+    info = {
+        'iterations': len(history),
+        'residual': residual,
+        'converged': residual <= tol,
+        'history': history,
+    }
+    return y_stage, weights_df, info
 
-    return y5_stage, weights
 
 pd.set_option('display.max_rows', None)  # Показать все строки
 pd.set_option('display.max_columns', None)  # Показать все столбцы
 pd.set_option('display.width', None)  # Без ограничения ширины
 pd.set_option('display.max_colwidth', None)  # Без ограничения ширины столбцов
 pd.set_option('display.float_format', '{:.15f}'.format)
+
+
+if __name__ == "__main__":
+    from libs.database import session_scope
+    from controllers.data_loader import load_years
+
+    with session_scope() as db:
+        years = load_years(db)
+        results, weights, info = calculate(normalize_data(get_data(db, years)))
+        print(results)
+        print(weights)
+        print(f"Итераций: {info['iterations']}, невязка: {info['residual']:.3e}")
@@ -0,0 +1,146 @@
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from analytics.ryab import columns_in_norm, NORM_DIRECTIONS, excel_normalize, normalize_data
+from controllers.data_crud import get_all_data_dataframe
+from controllers.rollup_crud import rebuild_rollups
+from libs.database import Base, ENGINE_PROFILES, make_engine
+from models.data_models import MCKData
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def make_mck_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Синтетические данные МЦК заданного размера"""
+    rng = np.random.default_rng(seed)
+    data = {column: rng.uniform(0, 1000, rows).round(3) for column in columns_in_norm}
+    return pd.DataFrame(data, index=pd.RangeIndex(rows, name='year'))
+
+
+def legacy_normalize(data: pd.DataFrame) -> pd.DataFrame:
+    """Прежний путь: excel_normalize для каждой ячейки через Series.apply"""
+    normalize_df = pd.DataFrame()
+    for column, reverse in NORM_DIRECTIONS.items():
+        min_val = data[column].min()
+        max_val = data[column].max()
+        normalize_df[column] = data[column].apply(
+            lambda x: excel_normalize(x, min_val, max_val, reverse=reverse)
+        )
+    return normalize_df.round(15)
+
+
+def bench_normalize(sizes=(10_000, 100_000, 1_000_000)):
+    print("=== Нормализация (метод Рябцева) ===")
+    for rows in sizes:
+        df = make_mck_frame(rows)
+        legacy, legacy_time = timed(legacy_normalize, df)
+        fast, fast_time = timed(normalize_data, df)
+        diff = np.abs(legacy.to_numpy(dtype=float) - fast.to_numpy()).max()
+        print(f"{rows:>9} строк: Decimal/apply {legacy_time:8.3f} c, NumPy {fast_time:8.4f} c, "
+              f"ускорение x{legacy_time / fast_time:.0f}, макс. расхождение {diff:.1e}")
+
+
+def make_records(rows: int, seed: int = 0) -> list:
+    """Синтетические строки mck_data (годы 0..rows-1)"""
+    rng = np.random.default_rng(seed)
+    int_columns = {'failures_1', 'failures_2', 'failures_3', 'passengers_daily', 'tech_failures'}
+    return [
+        {'year': year, **{column: (int(rng.integers(0, 1000)) if column in int_columns
+                                   else float(rng.uniform(1, 1000))) for column in columns_in_norm}}
+        for year in range(rows)
+    ]
+
+
+def make_memory_db(rows: int, seed: int = 0):
+    """Сессия к базе в памяти с rows записями mck_data"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    records = make_records(rows, seed)
+    if records:
+        with engine.begin() as conn:
+            conn.execute(insert(MCKData), records)
+    db = sessionmaker(bind=engine)()
+    rebuild_rollups(db)
+    return db
+
+
+def orm_dataframe(db) -> pd.DataFrame:
+    """Прежний путь: ORM-объекты -> список словарей -> DataFrame"""
+    data_dicts = []
+    for record in db.query(MCKData).order_by(MCKData.year).all():
+        row = {column: getattr(record, column) for column in ['year'] + columns_in_norm}
+        row['profitability'] = record.fare_cost * record.passengers_daily
+        row['cap_invest_interval'] = record.investments / record.interval
+        data_dicts.append(row)
+    return pd.DataFrame(data_dicts)
+
+
+def bench_dataframe(sizes=(1_000, 10_000, 100_000)):
+    print("=== get_all_data_dataframe ===")
+    for rows in sizes:
+        db = make_memory_db(rows)
+        orm, orm_time = timed(orm_dataframe, db)
+        db.expunge_all()
+        fast, fast_time = timed(get_all_data_dataframe, db)
+        diff = np.abs(orm['cap_invest_interval'].to_numpy() - fast['cap_invest_interval'].to_numpy()).max()
+        print(f"{rows:>9} строк: ORM {orm_time:8.3f} c, SQL -> DataFrame {fast_time:8.4f} c, "
+              f"ускорение x{orm_time / fast_time:.1f}, макс. расхождение {diff:.1e}")
+        db.close()
+
+
+def engine_throughput(engine, records: list, lookups: int) -> dict:
+    """Вставки по одной строке в своей транзакции, пакетная вставка и выборки по году"""
+    Base.metadata.create_all(engine)
+    half = len(records) // 2
+    Session = sessionmaker(bind=engine)
+
+    start = time.perf_counter()
+    for record in records[:half]:
+        with Session() as db:
+            db.add(MCKData(**record))
+            db.commit()
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(insert(MCKData), records[half:])
+    bulk = time.perf_counter() - start
+
+    years = np.random.default_rng(0).integers(0, len(records), lookups).tolist()
+    start = time.perf_counter()
+    with Session() as db:
+        for year in years:
+            db.execute(select(MCKData).where(MCKData.year == year)).scalar_one()
+    lookup = time.perf_counter() - start
+
+    engine.dispose()
+    return {'single': half / single, 'bulk': (len(records) - half) / bulk, 'select': lookups / lookup}
+
+
+def bench_engine_profiles(rows: int = 2_000, lookups: int = 5_000):
+    print("=== Профили SQLite (файл на диске) ===")
+    records = make_records(rows)
+    engines = {'по умолчанию': lambda url: create_engine(url)}
+    engines.update({name: (lambda url, name=name: make_engine(url, name)) for name in ENGINE_PROFILES})
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, factory in engines.items():
+            url = f"sqlite:///{Path(tmp) / (name.replace(' ', '_') + '.db')}"
+            result = engine_throughput(factory(url), records, lookups)
+            print(f"{name:>13}: вставка по одной {result['single']:9.0f} стр/с, пакетом {result['bulk']:9.0f} стр/с, "
+                  f"выборка по году {result['select']:8.0f} запр/с")
+
+
+if __name__ == "__main__":
+    bench_normalize()
+    bench_dataframe()
+    bench_engine_profiles()
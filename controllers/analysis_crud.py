@@ -1,36 +1,170 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from models.data_models import AnalysisResult
+from sqlalchemy import desc, select, literal
+from sqlalchemy.dialects.sqlite import insert
+from models.data_models import AnalysisResult, AnalysisRun
+from controllers.data_loader import invalidate_cache
 from datetime import datetime
 
 
-def save_analysis_result(db: Session, year: int, integrated_index: float):
-    """Сохранение результата анализа"""
+def create_analysis_run(db: Session, params_hash: str, data_fingerprint: str, weights: dict = None,
+                        iterations: int = None, residual: float = None, duration: float = None,
+                        results: dict = None, base_run_id: int = None, exclude_years=()):
+    """Создание нового расчета вместе с его результатами {год: значение}.
+
+    С base_run_id остальные годы (кроме results и exclude_years) копируются из этого расчета.
+    """
     try:
-        # Удаляем старый результат если есть
-        old_result = db.query(AnalysisResult).filter(AnalysisResult.year == year).first()
-        if old_result:
-            db.delete(old_result)
-
-        result = AnalysisResult(
-            year=year,
-            integrated_index=integrated_index,
-            created_at=datetime.now()
+        now = datetime.now()
+        run = AnalysisRun(
+            params_hash=params_hash,
+            data_fingerprint=data_fingerprint,
+            weights=weights,
+            iterations=iterations,
+            residual=residual,
+            duration=duration,
+            created_at=now,
+            updated_at=now
         )
-        db.add(result)
+        db.add(run)
+        db.flush()
+        if base_run_id is not None:
+            _copy_results(db, base_run_id, run.id, set(results or ()) | set(exclude_years))
+        if results:
+            _upsert_results(db, run.id, results)
+        db.commit()
+        invalidate_cache()
+        db.refresh(run)
+        return run
+    except Exception as e:
+        db.rollback()
+        raise e
+
+
+def update_analysis_run(db: Session, run_id: int, results: dict = None, **fields):
+    """Обновление метаданных расчета и части его результатов одной транзакцией"""
+    try:
+        run = db.get(AnalysisRun, run_id)
+        for key, value in fields.items():
+            setattr(run, key, value)
+        run.updated_at = datetime.now()
+        if results:
+            _upsert_results(db, run_id, results)
         db.commit()
-        db.refresh(result)
-        return result
+        invalidate_cache()
+        db.refresh(run)
+        return run
     except Exception as e:
         db.rollback()
         raise e
 
 
-def get_analysis_results(db: Session):
-    """Получение всех результатов анализа"""
-    return db.query(AnalysisResult).order_by(AnalysisResult.year).all()
+def find_analysis_run(db: Session, params_hash: str, data_fingerprint: str):
+    """Последний расчет с теми же параметрами и входными данными"""
+    return (db.query(AnalysisRun)
+            .filter(AnalysisRun.params_hash == params_hash,
+                    AnalysisRun.data_fingerprint == data_fingerprint)
+            .order_by(desc(AnalysisRun.updated_at))
+            .first())
+
+
+def get_active_run(db: Session):
+    """Текущий (последний использованный) расчет"""
+    return db.query(AnalysisRun).order_by(desc(AnalysisRun.updated_at), desc(AnalysisRun.id)).first()
+
+
+def get_active_run_id(db: Session):
+    run = get_active_run(db)
+    return run.id if run else None
+
+
+def save_analysis_result(db: Session, year: int, integrated_index: float, run_id: int = None):
+    """Сохранение результата анализа"""
+    run_id = save_analysis_results(db, {year: integrated_index}, run_id)
+    return (db.query(AnalysisResult)
+            .filter(AnalysisResult.run_id == run_id, AnalysisResult.year == year)
+            .first())
+
+
+def save_analysis_results(db: Session, results: dict, run_id: int = None):
+    """Сохранение набора результатов {год: значение} одной транзакцией (INSERT ... ON CONFLICT).
+
+    Без run_id результаты пишутся в текущий расчет. Возвращает id расчета.
+    """
+    if run_id is None:
+        run_id = get_active_run_id(db)
+    if run_id is None:
+        return create_analysis_run(db, params_hash="", data_fingerprint="", results=results).id
+    try:
+        _upsert_results(db, run_id, results)
+        db.commit()
+        invalidate_cache()
+        return run_id
+    except Exception as e:
+        db.rollback()
+        raise e
+
+
+def _upsert_results(db: Session, run_id: int, results: dict):
+    if not results:
+        return
+    now = datetime.now()
+    rows = [{'run_id': run_id, 'year': int(year), 'integrated_index': float(value), 'created_at': now}
+            for year, value in results.items()]
+    stmt = insert(AnalysisResult)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AnalysisResult.run_id, AnalysisResult.year],
+        set_={
+            'integrated_index': stmt.excluded.integrated_index,
+            'created_at': stmt.excluded.created_at,
+        }
+    )
+    db.execute(stmt, rows)
+
+
+def _copy_results(db: Session, from_run_id: int, to_run_id: int, exclude_years):
+    r = AnalysisResult.__table__
+    source = (select(literal(to_run_id), r.c.year, r.c.integrated_index, r.c.created_at)
+              .where(r.c.run_id == from_run_id))
+    if exclude_years:
+        source = source.where(r.c.year.not_in([int(year) for year in exclude_years]))
+    db.execute(r.insert().from_select(['run_id', 'year', 'integrated_index', 'created_at'], source))
+
+
+def delete_analysis_result(db: Session, year: int, run_id: int = None):
+    """Удаление результата анализа за год (по умолчанию - в текущем расчете)"""
+    if run_id is None:
+        run_id = get_active_run_id(db)
+    result = (db.query(AnalysisResult)
+              .filter(AnalysisResult.run_id == run_id, AnalysisResult.year == year)
+              .first())
+    if result:
+        db.delete(result)
+        db.commit()
+        invalidate_cache()
+    return result
+
+
+def get_analysis_results(db: Session, run_id: int = None):
+    """Получение всех результатов анализа (по умолчанию - текущего расчета)"""
+    if run_id is None:
+        run_id = get_active_run_id(db)
+    return (db.query(AnalysisResult)
+            .filter(AnalysisResult.run_id == run_id)
+            .order_by(AnalysisResult.year)
+            .all())
+
+
+def get_results_by_years(db: Session, years, run_id: int = None) -> dict:
+    """Результаты текущего расчета за указанные годы {год: значение}"""
+    if run_id is None:
+        run_id = get_active_run_id(db)
+    results = (db.query(AnalysisResult)
+               .filter(AnalysisResult.run_id == run_id, AnalysisResult.year.in_(years))
+               .order_by(AnalysisResult.year)
+               .all())
+    return {result.year: result.integrated_index for result in results}
 
 
 def get_last_analysis(db: Session):
     """Получение последнего анализа"""
-    return db.query(AnalysisResult).order_by(desc(AnalysisResult.created_at)).first()
\ No newline at end of file
+    return db.query(AnalysisResult).order_by(desc(AnalysisResult.created_at)).first()
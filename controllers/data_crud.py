@@ -1,5 +1,7 @@
 from sqlalchemy.orm import Session
 from models.data_models import MCKData
+from controllers.data_loader import invalidate_cache, build_select, fetch_array, MCK_DTYPES
+from controllers.rollup_crud import refresh_mck_years
 import pandas as pd
 
 
@@ -21,7 +23,10 @@ def create_mck_data(db: Session, year: int, failures_1: int, failures_2: int,
             interval=interval
         )
         db.add(data)
+        db.flush()
+        refresh_mck_years(db, [year])
         db.commit()
+        invalidate_cache()
         db.refresh(data)
         return data
     except Exception as e:
@@ -41,7 +46,10 @@ def delete_data(db: Session, year: int):
     data = db.query(MCKData).filter(MCKData.year == year).first()
     if data:
         db.delete(data)
+        db.flush()
+        refresh_mck_years(db, [year])
         db.commit()
+        invalidate_cache()
     return data
 
 def update_data(db: Session, year: int, **kwargs):
@@ -50,36 +58,21 @@ def update_data(db: Session, year: int, **kwargs):
     if data:
         for key, value in kwargs.items():
             setattr(data, key, value)
+        db.flush()
+        refresh_mck_years(db, [year])
         db.commit()
+        invalidate_cache()
         db.refresh(data)
     return data
 
 
 def get_all_data_dataframe(db: Session) -> pd.DataFrame:
-    """Получение всех данных в виде DataFrame"""
-    try:
-        # Вариант 1: Через SQLAlchemy query (проще)
-        data = db.query(MCKData).order_by(MCKData.year).all()
-        # Преобразуем в список словарей
-        data_dicts = []
-        for record in data:
-            data_dicts.append({
-                'year': record.year,
-                'failures_1': record.failures_1,
-                'failures_2': record.failures_2,
-                'failures_3': record.failures_3,
-                'train_losses': record.train_losses,
-                'investments': record.investments,
-                'passengers_daily': record.passengers_daily,
-                'tech_failures': record.tech_failures,
-                'fare_cost': record.fare_cost,
-                'interval': record.interval,
-                'profitability': record.profitability,
-                'cap_invest_interval': record.cap_invest_interval
-            })
-
-        return pd.DataFrame(data_dicts)
+    """Получение всех данных в виде DataFrame (с производными показателями)"""
+    names, values = fetch_array(db, build_select())
+    df = pd.DataFrame(values, columns=names).astype(MCK_DTYPES)
 
-    except Exception as e:
-        print(f"Ошибка получения данных: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+    # Выручка от перевозок в сутки, руб.
+    df['profitability'] = df['fare_cost'] * df['passengers_daily'].astype('float64')
+    # Капитальные вложения на единицу интервала движения, млн руб./мин
+    df['cap_invest_interval'] = df['investments'] / df['interval'].where(df['interval'] != 0)
+    return df
@@ -0,0 +1,259 @@
+import csv
+import json
+import tempfile
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func, Integer, Float, LargeBinary
+from sqlalchemy.orm import Session
+
+from controllers.data_loader import build_select, MCK_COLUMNS
+from controllers.model_crud import get_latest_model, model_to_dict, model_arrays, TARGETS
+from models.data_models import MCKData, MCKMeasurement, AnalysisResult, RegressionModel
+
+CHUNK_SIZE = 10_000
+XLSX_MAX_ROWS = 1_048_575  # строк данных на листе Excel (без заголовка)
+SNAPSHOT_VERSION = 1
+
+
+def _table_select(model, order_by):
+    """Все столбцы таблицы, кроме двоичных массивов (они есть только в снимке)"""
+    table = model.__table__
+    columns = [column for column in table.columns if not isinstance(column.type, LargeBinary)]
+    return select(*columns).order_by(*[table.c[name] for name in order_by])
+
+
+EXPORTS = {
+    'mck_data': _table_select(MCKData, ['year']),
+    'mck_measurements': _table_select(MCKMeasurement, ['entity', 'granularity', 'period_start']),
+    'analysis_results': _table_select(AnalysisResult, ['run_id', 'year']),
+    'regression_models': _table_select(RegressionModel, ['name', 'version']),
+}
+
+
+def iter_chunks(db: Session, stmt, chunk_size: int = CHUNK_SIZE):
+    """(имена столбцов, пакет строк) из курсора без загрузки всей выборки в память"""
+    result = db.connection().execution_options(stream_results=True).execute(stmt)
+    try:
+        names = list(result.keys())
+        for rows in result.partitions(chunk_size):
+            yield names, rows
+    finally:
+        result.close()
+
+
+def _plain(value):
+    """Значение ячейки для CSV / XLSX: JSON - строкой, дата - в ISO"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+
+def export_csv(db: Session, table: str, path, chunk_size: int = CHUNK_SIZE) -> int:
+    rows_written = 0
+    with open(path, 'w', newline='', encoding='utf-8-sig') as file:
+        writer = csv.writer(file)
+        for names, rows in iter_chunks(db, EXPORTS[table], chunk_size):
+            if rows_written == 0:
+                writer.writerow(names)
+            writer.writerows([[_plain(value) for value in row] for row in rows])
+            rows_written += len(rows)
+    return rows_written
+
+
+def export_xlsx(db: Session, path, tables=None, chunk_size: int = CHUNK_SIZE) -> dict:
+    """Таблицы на отдельных листах книги в режиме write-only (строки сразу уходят в файл).
+
+    Таблица длиннее листа Excel продолжается на листах <имя>_2, <имя>_3, ...
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    counts = {}
+    for table in tables or EXPORTS:
+        sheet, on_sheet, part = None, 0, 1
+        counts[table] = 0
+        for names, rows in iter_chunks(db, EXPORTS[table], chunk_size):
+            for row in rows:
+                if sheet is None or on_sheet == XLSX_MAX_ROWS:
+                    sheet = workbook.create_sheet(table if part == 1 else f"{table}_{part}")
+                    sheet.append(names)
+                    on_sheet, part = 0, part + 1
+                sheet.append([_plain(value) for value in row])
+                on_sheet += 1
+            counts[table] += len(rows)
+        if sheet is None:
+            workbook.create_sheet(table).append([column.name for column in EXPORTS[table].selected_columns])
+    workbook.save(path)
+    return counts
+
+
+def _column_dtypes(db: Session, stmt):
+    """Число строк и тип NumPy для каждого столбца выборки.
+
+    Целые без NULL - int64, остальные числа - float64 (NULL -> NaN), прочее - строки
+    фиксированной ширины по максимальной длине в базе.
+    """
+    source = stmt.subquery()
+    aggregates = [func.count()]
+    for column in stmt.selected_columns:
+        if isinstance(column.type, Integer):
+            aggregates.append(func.count(source.c[column.name]))
+        elif isinstance(column.type, Float):
+            aggregates.append(None)
+        else:
+            aggregates.append(func.max(func.length(source.c[column.name])))
+    total, *stats = db.execute(select(*[aggregate for aggregate in aggregates if aggregate is not None])
+                               .select_from(source)).one()
+
+    dtypes, stats = {}, iter(stats)
+    for column, aggregate in zip(stmt.selected_columns, aggregates[1:]):
+        if isinstance(column.type, Integer):
+            dtypes[column.name] = np.dtype('int64' if next(stats) == total else 'float64')
+        elif aggregate is None:
+            dtypes[column.name] = np.dtype('float64')
+        else:
+            dtypes[column.name] = np.dtype(f'<U{max(next(stats) or 0, 1)}')
+    return total, dtypes
+
+
+def _column_value(value):
+    if value is None:
+        return ''
+    return _plain(value) if isinstance(value, (dict, list, datetime)) else value
+
+
+def _write_columns(db: Session, stmt, folder: Path, prefix: str, chunk_size: int) -> list:
+    """Столбцы выборки в отдельные .npy через memmap; в памяти только текущий пакет"""
+    total, dtypes = _column_dtypes(db, stmt)
+    arrays = {name: np.lib.format.open_memmap(folder / f"{prefix}{name}.npy", mode='w+',
+                                              dtype=dtype, shape=(total,))
+              for name, dtype in dtypes.items()}
+    filled = 0
+    for names, rows in iter_chunks(db, stmt, chunk_size):
+        rows = rows[:total - filled]  # строки, добавленные после подсчета, не попадают в выгрузку
+        for position, name in enumerate(names):
+            values = [row[position] for row in rows]
+            if dtypes[name].kind == 'U':
+                values = [_column_value(value) for value in values]
+            elif dtypes[name].kind == 'f':
+                values = [np.nan if value is None else value for value in values]
+            arrays[name][filled:filled + len(rows)] = values
+        filled += len(rows)
+
+    for array in arrays.values():
+        array.flush()
+    paths = [Path(array.filename) for array in arrays.values()]
+    arrays.clear()  # закрываем отображения до перезаписи/упаковки файлов
+    if filled < total:  # строки удалены после подсчета
+        for path in paths:
+            values = np.load(path, mmap_mode='r')[:filled].copy()
+            np.save(path, values)
+    return paths
+
+
+def _pack_npz(paths, folder: Path, out_path, compress: bool):
+    """Сборка .npz (zip из .npy, как np.savez) из готовых файлов без чтения в память"""
+    compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    with zipfile.ZipFile(out_path, 'w', compression=compression, allowZip64=True) as archive:
+        for path in paths:
+            archive.write(path, arcname=path.relative_to(folder).as_posix())
+
+
+def export_npz(db: Session, path, tables=None, chunk_size: int = CHUNK_SIZE, compress: bool = False) -> list:
+    """Поколоночная выгрузка таблиц в .npz: ключи вида '<таблица>/<столбец>'"""
+    path = Path(path)
+    with tempfile.TemporaryDirectory(dir=path.parent) as tmp:
+        folder = Path(tmp)
+        paths = []
+        for table in tables or EXPORTS:
+            (folder / table).mkdir()
+            paths += _write_columns(db, EXPORTS[table], folder, f"{table}/", chunk_size)
+        _pack_npz(paths, folder, path, compress)
+    return [p.relative_to(folder).with_suffix('').as_posix() for p in paths]
+
+
+def save_snapshot(db: Session, path, chunk_size: int = CHUNK_SIZE) -> Path:
+    """Снимок данных для аналитики без SQLite.
+
+    В .npz: данные МЦК с интегральным показателем текущего расчета (data/<столбец>),
+    массивы последних версий моделей (models/<имя>/<массив>) и метаданные (meta, JSON).
+    """
+    path = Path(path)
+    meta = {'version': SNAPSHOT_VERSION, 'created_at': datetime.now().isoformat(sep=' '), 'models': {}}
+    with tempfile.TemporaryDirectory(dir=path.parent) as tmp:
+        folder = Path(tmp)
+        (folder / 'data').mkdir()
+        paths = _write_columns(db, build_select(with_integral=True), folder, 'data/', chunk_size)
+
+        for name in TARGETS:
+            record = get_latest_model(db, name)
+            if record is None:
+                continue
+            model = model_to_dict(record)
+            model['version'] = record.version
+            meta['models'][name] = model
+            (folder / 'models' / name).mkdir(parents=True)
+            for key, values in model_arrays(record).items():
+                paths.append(folder / 'models' / name / f"{key}.npy")
+                np.save(paths[-1], values)
+
+        paths.append(folder / 'meta.npy')
+        np.save(paths[-1], np.array(json.dumps(meta, ensure_ascii=False)))
+        _pack_npz(paths, folder, path, compress=False)
+    return path
+
+
+def load_snapshot(path) -> dict:
+    """Снимок: frame - как load_frame(with_integral=True), models - словари моделей с массивами"""
+    with np.load(path) as archive:
+        meta = json.loads(archive['meta'].item())
+        if meta['version'] != SNAPSHOT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия снимка: {meta['version']}")
+        frame = pd.DataFrame({column: archive[f'data/{column}'] for column in MCK_COLUMNS + ['integrated_index']},
+                             index=pd.Index(archive['data/year'].astype(np.int64), name='year')).astype(float)
+        models = {}
+        for name, model in meta['models'].items():
+            model['version'] = (name, model['version'])
+            model['arrays'] = {key: archive[f'models/{name}/{key}'] for key in ('observed', 'fitted', 'resid')}
+            models[name] = model
+    return {'frame': frame, 'models': models, 'created_at': meta['created_at']}
+
+
+def export_path(db: Session, path) -> str:
+    """Выгрузка по расширению файла: .csv - данные МЦК (mck_data), .xlsx / .npz - все таблицы,
+    .snapshot.npz - снимок для аналитики"""
+    path = Path(path)
+    name = path.name.lower()
+    if name.endswith('.snapshot.npz'):
+        save_snapshot(db, path)
+        return f"Снимок данных сохранен: {path}"
+    if name.endswith('.npz'):
+        export_npz(db, path)
+        return f"Таблицы выгружены: {path}"
+    if name.endswith('.xlsx'):
+        counts = export_xlsx(db, path)
+        return "\n".join([f"Выгружено в {path}:"] + [f"  {table}: {count}" for table, count in counts.items()])
+    if name.endswith('.csv'):
+        return f"Выгружено строк: {export_csv(db, 'mck_data', path)} ({path})"
+    raise ValueError(f"Неподдерживаемый формат файла: {path.suffix}")
+
+
+if __name__ == "__main__":
+    import sys
+    from libs.database import session_scope
+
+    out = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent.parent.absolute() / "data/export"
+    out.mkdir(parents=True, exist_ok=True)
+    with session_scope() as db:
+        for table in EXPORTS:
+            print(table, export_csv(db, table, out / f"{table}.csv"))
+        print(export_path(db, out / "mck.xlsx"))
+        print(export_path(db, out / "mck.npz"))
+        print(export_path(db, out / "mck.snapshot.npz"))
+    print(load_snapshot(out / "mck.snapshot.npz")['frame'].tail())
@@ -0,0 +1,321 @@
+import csv
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from controllers.data_loader import invalidate_cache, GRANULARITIES, MCK_COLUMNS
+from controllers.measurement_crud import upsert_measurements, incomplete_years, unmeasured_indicators, DEFAULT_ENTITY
+from controllers.rollup_crud import refresh_mck_years
+from models.data_models import MCKData
+
+CHUNK_SIZE = 50_000
+MAX_REPORTED = 1_000  # отклоненных строк в отчете (остальные - только в файле отклонений)
+MAX_SHOWN = 20  # строк отчета в сообщении
+
+INT_COLUMNS = ['year', 'failures_1', 'failures_2', 'failures_3', 'passengers_daily', 'tech_failures']
+YEAR_RANGE = (1900, 2100)
+
+# Заголовки файла -> поля mck_data (сравнение без учета регистра и пробелов по краям)
+HEADER_ALIASES = {
+    'год': 'year',
+    'отказы 1': 'failures_1', 'отказы 1 кат.': 'failures_1',
+    'отказы 2': 'failures_2', 'отказы 2 кат.': 'failures_2',
+    'отказы 3': 'failures_3', 'отказы 3 кат.': 'failures_3',
+    'поездопотери': 'train_losses',
+    'кап. вложения': 'investments',
+    'пассажиры': 'passengers_daily', 'пассажиры (сут.)': 'passengers_daily',
+    'тех. отказы': 'tech_failures',
+    'стоимость': 'fare_cost', 'стоимость проезда': 'fare_cost',
+    'интервал': 'interval', 'интервал движения': 'interval',
+    'участок': 'entity',
+    'дата': 'period_start', 'период': 'period_start', 'начало периода': 'period_start',
+    'детализация': 'granularity',
+}
+FIELDS = ['year'] + MCK_COLUMNS
+# Файл измерений (mck_measurements) - со столбцами периода; участок необязателен
+MEASUREMENT_FIELDS = ['entity', 'period_start', 'granularity'] + MCK_COLUMNS
+GRANULARITY_ALIASES = {'день': 'day', 'сутки': 'day', 'месяц': 'month', 'год': 'year'}
+
+
+def map_headers(headers):
+    """Вид файла и номер/имя столбца файла -> поле.
+
+    Файл со столбцами period_start и granularity - измерения ('measurements': нужен хотя бы
+    один показатель), иначе годовые данные ('mck_data': нужны все поля). ValueError, если
+    каких-то полей нет.
+    """
+    mapping = {}
+    for header in headers:
+        name = str(header).strip().rstrip(':').lower() if header is not None else ''
+        field = name if name in MEASUREMENT_FIELDS + FIELDS else HEADER_ALIASES.get(name)
+        if field is not None and field not in mapping.values():
+            mapping[header] = field
+    fields = set(mapping.values())
+
+    if {'period_start', 'granularity'} <= fields:
+        if not fields & set(MCK_COLUMNS):
+            raise ValueError("В файле измерений нет ни одного показателя")
+        return 'measurements', {header: field for header, field in mapping.items() if field in MEASUREMENT_FIELDS}
+    missing = [field for field in FIELDS if field not in fields]
+    if missing:
+        raise ValueError(f"В файле нет столбцов: {', '.join(missing)}")
+    return 'mck_data', {header: field for header, field in mapping.items() if field in FIELDS}
+
+
+def detect_csv_format(path) -> dict:
+    """Разделитель и десятичный знак CSV (выгрузки Excel с русской локалью - ';' и ',')"""
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        sample = file.read(64 * 1024)
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t').delimiter
+    except csv.Error:
+        delimiter = ','
+    return {'sep': delimiter, 'decimal': ',' if delimiter == ';' else '.'}
+
+
+def read_csv_chunks(path, chunk_size: int = CHUNK_SIZE, progress=None):
+    """Пакеты строк CSV как DataFrame (в памяти только текущий пакет)"""
+    size = max(Path(path).stat().st_size, 1)
+    with open(path, 'rb') as file:
+        reader = pd.read_csv(file, chunksize=chunk_size, encoding='utf-8-sig', **detect_csv_format(path))
+        for chunk in reader:
+            yield chunk
+            if progress is not None:
+                progress(min(file.tell() / size, 1.0))
+
+
+def read_xlsx_chunks(path, chunk_size: int = CHUNK_SIZE, progress=None):
+    """Пакеты строк первого листа .xlsx (openpyxl в режиме только чтения)"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total = max((sheet.max_row or 1) - 1, 1)
+        rows = sheet.iter_rows(values_only=True)
+        headers = next(rows, None)
+        if headers is None:
+            return
+        headers = [f"column_{i}" if header is None else header for i, header in enumerate(headers)]
+        batch, read = [], 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_size:
+                read += len(batch)
+                yield pd.DataFrame(batch, columns=headers)
+                batch = []
+                if progress is not None:
+                    progress(min(read / total, 1.0))
+        if batch:
+            yield pd.DataFrame(batch, columns=headers)
+    finally:
+        workbook.close()
+
+
+def read_chunks(path, chunk_size: int = CHUNK_SIZE, progress=None):
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.xlsx', '.xlsm'):
+        return read_xlsx_chunks(path, chunk_size, progress)
+    if suffix in ('.csv', '.txt'):
+        return read_csv_chunks(path, chunk_size, progress)
+    raise ValueError(f"Неподдерживаемый формат файла: {suffix}")
+
+
+def _text(raw: pd.DataFrame) -> pd.DataFrame:
+    """Текстовые столбцы (в .xlsx - вперемешку с числами) как строки без пробелов по краям"""
+    return raw.select_dtypes(include=object).astype(str).apply(lambda column: column.str.strip())
+
+
+def _numbers(raw: pd.DataFrame, text: pd.DataFrame, fields, reject):
+    """Числовые поля ("1,5" -> 1.5) с отклонением пустых, нечисловых, дробных целых и отрицательных"""
+    values = raw[fields].apply(lambda column: pd.to_numeric(
+        text[column.name].str.replace(',', '.', regex=False) if column.name in text else column,
+        errors='coerce'))
+    empty = raw[fields].isna() | (text == '').reindex(columns=fields, fill_value=False)
+    for field in fields:
+        reject(empty[field], f"{field}: пусто")
+        reject(values[field].isna(), f"{field}: не число")
+    for field in INT_COLUMNS:
+        if field in fields:
+            reject(values[field] != np.round(values[field]), f"{field}: не целое")
+    indicators = [field for field in fields if field in MCK_COLUMNS]
+    reject((values[indicators] < 0).any(axis=1), "отрицательное значение")
+    return values
+
+
+def _split(raw: pd.DataFrame, reasons: pd.Series, first_line: int):
+    """Маска корректных строк и отклоненные строки с номером строки файла и причиной"""
+    valid = reasons == ''
+    rejected = raw[~valid].astype(str).assign(reason=reasons[~valid])
+    rejected.insert(0, 'line', (np.flatnonzero(~valid.to_numpy()) + first_line))
+    return valid, rejected
+
+
+def _rejector(index):
+    reasons = pd.Series('', index=index, dtype=object)
+
+    def reject(mask, text):
+        mask = mask & (reasons == '')
+        reasons[mask] = text
+    return reasons, reject
+
+
+def validate_chunk(chunk: pd.DataFrame, mapping: dict, first_line: int):
+    """Приведение типов и проверка пакета.
+
+    Возвращает (корректные строки в типах mck_data, отклоненные строки с номером строки
+    файла и причиной). Все проверки - векторные по столбцам.
+    """
+    raw = chunk[list(mapping)].rename(columns=mapping)[FIELDS]
+    reasons, reject = _rejector(raw.index)
+    values = _numbers(raw, _text(raw), FIELDS, reject)
+    reject(~values['year'].between(*YEAR_RANGE), f"year: вне диапазона {YEAR_RANGE[0]}-{YEAR_RANGE[1]}")
+
+    valid, rejected = _split(raw, reasons, first_line)
+    clean = values[valid].astype({field: 'int64' for field in INT_COLUMNS})
+    return clean, rejected
+
+
+def _dates(text: pd.Series) -> pd.Series:
+    """Даты: ISO (2030-01-31, из .xlsx) или с днем впереди (31.01.2030)"""
+    iso = pd.to_datetime(text, errors='coerce', format='ISO8601')
+    return iso.fillna(pd.to_datetime(text.where(iso.isna()), errors='coerce', format='mixed', dayfirst=True))
+
+
+def validate_measurement_chunk(chunk: pd.DataFrame, mapping: dict, first_line: int):
+    """То же для файла измерений: участок, начало периода, детализация и переданные показатели"""
+    raw = chunk[list(mapping)].rename(columns=mapping)
+    if 'entity' not in raw:
+        raw.insert(0, 'entity', DEFAULT_ENTITY)
+    indicators = [field for field in MCK_COLUMNS if field in raw]
+    raw = raw[['entity', 'period_start', 'granularity'] + indicators]
+    reasons, reject = _rejector(raw.index)
+
+    keys = raw[['entity', 'period_start', 'granularity']].astype(object)
+    keys = keys.where(keys.notna(), '').astype(str).apply(lambda column: column.str.strip())
+    granularity = keys['granularity'].str.lower().replace(GRANULARITY_ALIASES)
+    period_start = _dates(keys['period_start'])
+    reject(keys['entity'] == '', "entity: пусто")
+    reject(~granularity.isin(GRANULARITIES), f"granularity: не из {', '.join(GRANULARITIES)}")
+    reject(period_start.isna(), "period_start: не дата")
+    reject(~period_start.dt.year.between(*YEAR_RANGE),
+           f"period_start: вне диапазона {YEAR_RANGE[0]}-{YEAR_RANGE[1]}")
+    values = _numbers(raw, _text(raw[indicators]), indicators, reject)
+
+    valid, rejected = _split(raw, reasons, first_line)
+    clean = values[valid].astype({field: 'int64' for field in INT_COLUMNS if field in indicators})
+    clean.insert(0, 'granularity', granularity[valid])
+    clean.insert(0, 'period_start', period_start[valid])
+    clean.insert(0, 'entity', keys['entity'][valid])
+    return clean, rejected
+
+
+def upsert_chunk(db: Session, clean: pd.DataFrame):
+    """Вставка или обновление пакета по году одной транзакцией (вместе со сводками этих лет)"""
+    if clean.empty:
+        return
+    # Повтор года внутри пакета - остается последняя строка (как и при повторе между пакетами)
+    clean = clean.drop_duplicates('year', keep='last')
+    stmt = insert(MCKData)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MCKData.year],
+        set_={field: stmt.excluded[field] for field in MCK_COLUMNS},
+    )
+    try:
+        db.execute(stmt, clean.to_dict('records'))
+        refresh_mck_years(db, clean['year'].tolist())
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+
+
+def import_file(db: Session, path, chunk_size: int = CHUNK_SIZE, rejected_path=None, progress=None) -> dict:
+    """Потоковый импорт .xlsx / .csv в mck_data или, для файла со столбцами периода,
+    в mck_measurements.
+
+    Файл читается пакетами по chunk_size строк, каждый пакет проверяется и записывается
+    своей транзакцией (upsert по году или по участку, детализации и началу периода),
+    поэтому память ограничена размером пакета.
+    Отклоненные строки пишутся в rejected_path (CSV), если он задан; в отчет попадают
+    первые MAX_REPORTED. progress(доля) вызывается после каждого пакета.
+    """
+    imported = rejected_count = 0
+    reported = []
+    kind = mapping = None
+    line = 2  # первая строка данных после заголовка
+    rejected_file = open(rejected_path, 'w', newline='', encoding='utf-8-sig') if rejected_path else None
+    try:
+        for chunk in read_chunks(path, chunk_size, progress):
+            if mapping is None:
+                kind, mapping = map_headers(chunk.columns)
+            validate = validate_measurement_chunk if kind == 'measurements' else validate_chunk
+            clean, rejected = validate(chunk, mapping, line)
+            line += len(chunk)
+
+            if kind == 'measurements':
+                if len(clean):
+                    upsert_measurements(db, clean, chunk_size)
+            else:
+                upsert_chunk(db, clean)
+            imported += len(clean)
+            rejected_count += len(rejected)
+
+            if len(rejected):
+                if rejected_file is not None:
+                    rejected.to_csv(rejected_file, index=False, header=rejected_file.tell() == 0)
+                room = MAX_REPORTED - sum(len(frame) for frame in reported)
+                if room > 0:
+                    reported.append(rejected.head(room))
+    finally:
+        if rejected_file is not None:
+            rejected_file.close()
+        invalidate_cache()
+
+    return {
+        'kind': kind,
+        'imported': imported,
+        'rejected': rejected_count,
+        'rejected_rows': pd.concat(reported, ignore_index=True) if reported else pd.DataFrame(),
+        # участки и годы, не вошедшие в годовой ряд из-за неполных измерений
+        'incomplete': incomplete_years(db) if kind == 'measurements' else pd.DataFrame(),
+        # годы, в которых измерены не все показатели
+        'unmeasured': unmeasured_indicators(db) if kind == 'measurements' else pd.DataFrame(),
+    }
+
+
+def format_import_report(report: dict, max_shown: int = MAX_SHOWN) -> str:
+    lines = [f"Загружено строк: {report['imported']}", f"Отклонено строк: {report['rejected']}"]
+    shown = report['rejected_rows'].head(max_shown)
+    for row in shown.itertuples(index=False):
+        lines.append(f"  строка {row.line}: {row.reason}")
+    if report['rejected'] > len(shown):
+        lines.append(f"  ... и еще {report['rejected'] - len(shown)}")
+    incomplete = report.get('incomplete', pd.DataFrame())
+    if len(incomplete):
+        lines.append(f"Неполные годы измерений (не вошли в годовой ряд): {len(incomplete)}")
+        for row in incomplete.head(max_shown).itertuples(index=False):
+            lines.append(f"  {row.entity}, {row.year}: полных месяцев {row.months}")
+        if len(incomplete) > max_shown:
+            lines.append(f"  ... и еще {len(incomplete) - max_shown}")
+    unmeasured = report.get('unmeasured', pd.DataFrame())
+    if len(unmeasured):
+        lines.append(f"Годы с неполным набором показателей: {len(unmeasured)}")
+        for row in unmeasured.head(max_shown).itertuples(index=False):
+            source = "взяты из mck_data" if row.filled else "нет строки mck_data, год не вошел в ряд"
+            lines.append(f"  {row.year}: {', '.join(row.indicators)} - {source}")
+        if len(unmeasured) > max_shown:
+            lines.append(f"  ... и еще {len(unmeasured) - max_shown}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+    from libs.database import session_scope
+
+    with session_scope() as db:
+        source = sys.argv[1]
+        print(format_import_report(import_file(db, source, rejected_path=Path(source).with_suffix('.rejected.csv'))))
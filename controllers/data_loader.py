@@ -0,0 +1,315 @@
+import threading
+from typing import List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, desc, func, case, cast, literal, and_, or_, union_all, Integer
+from sqlalchemy.orm import Session
+
+from models.data_models import MCKData, MCKMeasurement, MCKRollup, AnalysisResult, AnalysisRun
+
+MCK_COLUMNS = ['failures_1', 'failures_2', 'failures_3',
+               'train_losses', 'investments', 'passengers_daily',
+               'tech_failures', 'fare_cost', 'interval']
+
+# Схема типов для выгрузки mck_data (Int64 допускает пропуски)
+MCK_DTYPES = {
+    'year': 'int64',
+    'failures_1': 'Int64',
+    'failures_2': 'Int64',
+    'failures_3': 'Int64',
+    'train_losses': 'float64',
+    'investments': 'float64',
+    'passengers_daily': 'Int64',
+    'tech_failures': 'Int64',
+    'fare_cost': 'float64',
+    'interval': 'float64',
+}
+
+# Детализация измерений - от самой мелкой к самой крупной
+GRANULARITIES = ('day', 'month', 'year')
+
+# Источники сводок mck_rollups; строки mck_data сводятся как годовые измерения участка MCK_DATA_ENTITY
+MCK_DATA_SOURCE = 'mck_data'
+MEASUREMENTS_SOURCE = 'measurements'
+MCK_DATA_ENTITY = 'mck'
+
+# Свертка измерений до года: (внутри участка за год, по участкам линии).
+# Счетчики, потери и вложения складываются; суточные пассажиры - среднее за год
+# (взвешенное по дням) и сумма по участкам; стоимость и интервал - средние.
+MEASUREMENT_AGGREGATES = {
+    'failures_1': ('sum', 'sum'),
+    'failures_2': ('sum', 'sum'),
+    'failures_3': ('sum', 'sum'),
+    'train_losses': ('sum', 'sum'),
+    'investments': ('sum', 'sum'),
+    'passengers_daily': ('avg', 'sum'),
+    'tech_failures': ('sum', 'sum'),
+    'fare_cost': ('avg', 'avg'),
+    'interval': ('avg', 'avg'),
+}
+
+# (годы, столбцы, с интегральным показателем, с измерениями) -> DataFrame
+_cache = {}
+# Загрузки идут из потоков пула: кадр, прочитанный до сброса кеша, в кеш не попадает
+_cache_lock = threading.Lock()
+_generation = 0
+
+
+def invalidate_cache():
+    """Сброс кеша загрузчика - вызывается при любой записи в mck_data / analysis_results"""
+    global _generation
+    with _cache_lock:
+        _generation += 1
+        _cache.clear()
+
+
+def _integer_column(column: str) -> bool:
+    return isinstance(MCKMeasurement.__table__.c[column].type, Integer)
+
+
+def _month_days(start):
+    """Число дней месяца по дате его начала"""
+    return cast(func.strftime('%d', func.date(start, '+1 month', '-1 day')), Integer)
+
+
+def _raw_groups(columns: List[str], years: List[int], period: str, name: str):
+    """Группы строк mck_measurements: period='month' - суточные и месячные строки по месяцам,
+    'year' - годовые строки. Столбцы: участок, год, детализация, начало периода, строк,
+    <показатель>_sum / _count - как в mck_rollups."""
+    m = MCKMeasurement.__table__
+    if period == 'month':
+        start, where = func.strftime('%Y-%m-01', m.c.period_start), [m.c.granularity.in_(('day', 'month'))]
+    else:
+        start, where = func.printf('%04d-01-01', m.c.year), [m.c.granularity == 'year']
+    if years is not None:
+        where.append(m.c.year.in_(years))
+    stats = []
+    for column in columns:
+        stats += [func.sum(m.c[column]).label(f'{column}_sum'), func.count(m.c[column]).label(f'{column}_count')]
+    return (select(m.c.entity, m.c.year, m.c.granularity, start.label('period_start'), func.count().label('rows'),
+                   *stats)
+            .where(*where).group_by(m.c.entity, m.c.year, m.c.granularity, start).subquery(name))
+
+
+def _rollup_groups(columns: List[str], years: List[int], period: str, name: str):
+    """Те же группы из готовых сводок mck_rollups"""
+    r = MCKRollup.__table__
+    where = [r.c.period == period, r.c.source == MEASUREMENTS_SOURCE]
+    if period == 'year':
+        where.append(r.c.granularity == 'year')
+    if years is not None:
+        where.append(r.c.year.in_(years))
+    stats = [r.c[f'{column}_{stat}'] for column in columns for stat in ('sum', 'count')]
+    return select(r.c.entity, r.c.year, r.c.granularity, r.c.period_start, r.c.rows, *stats).where(*where).subquery(name)
+
+
+def _entity_years(groups, columns: List[str]):
+    """Значения участков за год и признак полноты (complete) по группам измерений.
+
+    Месяц берется из суточных строк, если они есть за каждый день месяца, иначе из месячной
+    строки; год участка - из 12 таких месяцев, иначе из годовой строки. Участок и год, у
+    которых нет ни того, ни другого, - неполные (complete = 0, значения NULL).
+    Показатель, измеренный не во всех строках выбранных месяцев (файл только с частью
+    показателей), за год участка - NULL. Средние взвешиваются по дням: месячная строка
+    весит как дни месяца.
+    """
+    months = groups('month', 'months')
+    full_days = groups('month', 'full_days')
+    is_day, is_month = months.c.granularity == 'day', months.c.granularity == 'month'
+    days = _month_days(months.c.period_start)
+    has_full_days = (select(full_days.c.rows)
+                     .where(full_days.c.entity == months.c.entity, full_days.c.year == months.c.year,
+                            full_days.c.granularity == 'day', full_days.c.period_start == months.c.period_start,
+                            full_days.c.rows == _month_days(full_days.c.period_start))
+                     .exists())
+    # На месяц выбирается одна группа: суточная за все дни месяца или месячная строка
+    chosen = or_(and_(is_day, months.c.rows == days), and_(is_month, ~has_full_days))
+
+    stats = [func.count().label('months')]
+    for column in columns:
+        weight = case((is_month, days), else_=1) if MEASUREMENT_AGGREGATES[column][0] == 'avg' else 1
+        for part in ('sum', 'count'):
+            stats.append(func.sum(months.c[f'{column}_{part}'] * weight).label(f'{column}_{part}'))
+        # месяцы, в которых показатель есть в каждой строке
+        stats.append(func.sum(case((months.c[f'{column}_count'] == months.c.rows, 1), else_=0))
+                     .label(f'{column}_months'))
+    by_months = (select(months.c.entity, months.c.year, *stats).where(chosen)
+                 .group_by(months.c.entity, months.c.year).cte('by_months'))
+
+    def value(source, column):
+        if MEASUREMENT_AGGREGATES[column][0] == 'avg':
+            return source.c[f'{column}_sum'] / func.nullif(source.c[f'{column}_count'], 0)
+        return source.c[f'{column}_sum']
+
+    year_rows = groups('year', 'year_rows')
+    whole = by_months.c.months == 12
+    from_months = (select(by_months.c.entity, by_months.c.year,
+                          case((whole, 1), else_=0).label('complete'),
+                          *[case((whole & (by_months.c[f'{column}_months'] == 12), value(by_months, column)))
+                            .label(column) for column in columns])
+                   .outerjoin(year_rows, and_(year_rows.c.entity == by_months.c.entity,
+                                              year_rows.c.year == by_months.c.year))
+                   .where(or_(whole, year_rows.c.entity.is_(None))))
+    from_year_rows = (select(year_rows.c.entity, year_rows.c.year, literal(1).label('complete'),
+                             *[value(year_rows, column).label(column) for column in columns])
+                      .outerjoin(by_months, and_(by_months.c.entity == year_rows.c.entity,
+                                                 by_months.c.year == year_rows.c.year))
+                      .where(or_(by_months.c.months.is_(None), by_months.c.months < 12)))
+    return union_all(from_months, from_year_rows).subquery('per_entity'), by_months
+
+
+def _measured_yearly(groups, columns: List[str]):
+    """Годы, полностью покрытые измерениями у всех участков, со сводкой по участкам.
+
+    Показатель, не измеренный хотя бы у одного участка, за год - NULL.
+    """
+    per_entity, _ = _entity_years(groups, columns)
+    selected = []
+    for column in columns:
+        value = getattr(func, MEASUREMENT_AGGREGATES[column][1])(per_entity.c[column])
+        value = func.round(value) if _integer_column(column) else value
+        selected.append(case((func.count(per_entity.c[column]) == func.count(), value)).label(column))
+    return (select(per_entity.c.year, *selected).group_by(per_entity.c.year)
+            .having(func.min(per_entity.c.complete) == 1))
+
+
+def measurements_select(columns: List[str] = None, years: List[int] = None):
+    """Годовые значения из строк mck_measurements в SQLite (правила - _entity_years)"""
+    columns = MCK_COLUMNS if columns is None else columns
+    return _measured_yearly(lambda period, name: _raw_groups(columns, years, period, name), columns)
+
+
+def rollup_measurements_select(columns: List[str] = None, years: List[int] = None):
+    """То же по готовым сводкам mck_rollups (по строке на участок и месяц / год)"""
+    columns = MCK_COLUMNS if columns is None else columns
+    return _measured_yearly(lambda period, name: _rollup_groups(columns, years, period, name), columns)
+
+
+def measurement_gaps_select(years: List[int] = None):
+    """Участки и годы, не вошедшие в годовой ряд: меньше 12 полных месяцев и нет годовой строки"""
+    per_entity, by_months = _entity_years(lambda period, name: _rollup_groups([], years, period, name), [])
+    gaps = select(per_entity.c.entity, per_entity.c.year).where(per_entity.c.complete == 0).subquery('gaps')
+    return (select(gaps.c.entity, gaps.c.year, by_months.c.months)
+            .join(by_months, and_(by_months.c.entity == gaps.c.entity, by_months.c.year == gaps.c.year))
+            .order_by(gaps.c.entity, gaps.c.year))
+
+
+def yearly_source(columns: List[str] = None, measurements: bool = True, years: List[int] = None,
+                  from_rollups: bool = True):
+    """Годовой ряд: mck_data, а за годы, полностью покрытые измерениями, - их свертка.
+
+    Неполные по измерениям годы берутся из mck_data (если там есть строка). Показатели,
+    которых нет в измерениях года, берутся из строки mck_data за этот год; если строки нет,
+    год в ряд не входит (при любом наборе columns, см. unmeasured_select). По умолчанию
+    читается из сводок mck_rollups; from_rollups=False - свертка исходных строк (для
+    проверки сводок).
+    """
+    mck = MCKData.__table__
+    columns = MCK_COLUMNS if columns is None else columns
+    if not measurements:
+        return mck
+    if from_rollups:
+        measured = rollup_measurements_select(MCK_COLUMNS, years).subquery('measured')
+        r = MCKRollup.__table__
+        entered = (select(r.c.year, *[r.c[f'{column}_sum'].label(column) for column in columns])
+                   .where(r.c.period == 'year', r.c.source == MCK_DATA_SOURCE,
+                          *([] if years is None else [r.c.year.in_(years)])))
+    else:
+        measured = measurements_select(MCK_COLUMNS, years).subquery('measured')
+        entered = select(mck.c.year, *[mck.c[column] for column in columns])
+    entered = entered.subquery('entered')
+
+    only_entered = select(entered).where(entered.c.year.not_in(select(measured.c.year)))
+    filled = (select(measured.c.year,
+                     *[func.coalesce(measured.c[column], entered.c[column]).label(column) for column in columns])
+              .select_from(measured.outerjoin(entered, entered.c.year == measured.c.year))
+              .where(or_(entered.c.year.is_not(None),
+                         and_(*[measured.c[column].is_not(None) for column in MCK_COLUMNS]))))
+    return union_all(only_entered, filled).subquery('mck_yearly')
+
+
+def unmeasured_select(years: List[int] = None):
+    """Годы, покрытые измерениями, с показателями, которых в измерениях нет:
+    year, filled (1 - взяты из mck_data, 0 - строки mck_data нет, год не входит в ряд),
+    <показатель> (1 - не измерен)"""
+    measured = rollup_measurements_select(MCK_COLUMNS, years).subquery('measured')
+    r = MCKRollup.__table__
+    entered = select(r.c.year).where(r.c.period == 'year', r.c.source == MCK_DATA_SOURCE).subquery('entered')
+    missing = [measured.c[column].is_(None) for column in MCK_COLUMNS]
+    return (select(measured.c.year, case((entered.c.year.is_not(None), 1), else_=0).label('filled'),
+                   *[case((flag, 1), else_=0).label(column) for flag, column in zip(missing, MCK_COLUMNS)])
+            .select_from(measured.outerjoin(entered, entered.c.year == measured.c.year))
+            .where(or_(*missing)).order_by(measured.c.year))
+
+
+def build_select(years: List[int] = None, columns: List[str] = None, with_integral: bool = False,
+                 measurements: bool = True):
+    """Один Core SELECT по годовому ряду (+ LEFT JOIN результатов текущего расчета).
+
+    measurements=False - только введенные вручную строки mck_data.
+    """
+    columns = MCK_COLUMNS if columns is None else columns
+    mck = yearly_source(columns, measurements, years)
+    selected = [mck.c.year] + [mck.c[column] for column in columns]
+    source = mck
+
+    if with_integral:
+        results = AnalysisResult.__table__
+        runs = AnalysisRun.__table__
+        active_run = select(runs.c.id).order_by(desc(runs.c.updated_at), desc(runs.c.id)).limit(1)
+        source = mck.outerjoin(results, (results.c.year == mck.c.year) &
+                               results.c.run_id.is_not_distinct_from(active_run.scalar_subquery()))
+        selected.append(results.c.integrated_index)
+
+    stmt = select(*selected).select_from(source).order_by(mck.c.year)
+    if years is not None:
+        stmt = stmt.where(mck.c.year.in_(years))
+    return stmt
+
+
+def fetch_array(db: Session, stmt):
+    """Выполнение SELECT через курсор DB-API: (имена столбцов, матрица float) без ORM-объектов"""
+    compiled = stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True})
+    params = [compiled.params[name] for name in compiled.positiontup or []]
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(str(compiled), params)
+        names = [description[0] for description in cursor.description]
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    return names, np.array(rows, dtype=float).reshape(len(rows), len(names))
+
+
+def load_frame(db: Session, years: List[int] = None, columns: List[str] = None,
+               with_integral: bool = False, measurements: bool = True) -> pd.DataFrame:
+    """Данные МЦК в виде DataFrame (индекс - год), с мемоизацией по (годы, столбцы)"""
+    columns = list(MCK_COLUMNS if columns is None else columns)
+    key = (None if years is None else tuple(sorted(years)), tuple(columns), with_integral, measurements)
+
+    with _cache_lock:
+        frame = _cache.get(key)
+        generation = _generation
+    if frame is None:
+        _, values = fetch_array(db, build_select(years, columns, with_integral, measurements))
+        names = columns + (['integrated_index'] if with_integral else [])
+        frame = pd.DataFrame(values[:, 1:], columns=names,
+                             index=pd.Index(values[:, 0].astype(np.int64), name='year'))
+        with _cache_lock:
+            if generation == _generation:  # запись между чтением и сохранением - кадр устарел
+                _cache[key] = frame
+
+    return frame.copy()
+
+
+def load_years(db: Session) -> List[int]:
+    """Годы годового ряда (mck_data и измерения)"""
+    return load_frame(db, columns=[]).index.tolist()
+
+
+def load_arrays(db: Session, years: List[int] = None, columns: List[str] = None,
+                with_integral: bool = False):
+    """Годы и матрица значений (годы x столбцы) в виде непрерывных массивов NumPy"""
+    frame = load_frame(db, years, columns, with_integral)
+    return frame.index.to_numpy(), np.ascontiguousarray(frame.to_numpy())
@@ -0,0 +1,154 @@
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import select, delete, func, exists
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from controllers.data_loader import (invalidate_cache, measurement_gaps_select, unmeasured_select, GRANULARITIES,
+                                     MCK_COLUMNS)
+from controllers.rollup_crud import refresh_measurement_keys
+from models.data_models import MCKMeasurement
+
+DEFAULT_ENTITY = 'mck'  # вся линия
+CHUNK_SIZE = 50_000
+KEY_COLUMNS = ['entity', 'granularity', 'period_start']
+PERIODS = {'day': 'D', 'month': 'M', 'year': 'Y'}
+
+
+def normalize_measurements(frame: pd.DataFrame) -> pd.DataFrame:
+    """Приведение измерений к виду таблицы: участок по умолчанию, начало периода
+    по детализации (месяц - 1-е число, год - 1 января), год периода"""
+    frame = frame.copy()
+    if 'entity' not in frame:
+        frame['entity'] = DEFAULT_ENTITY
+    unknown = set(frame['granularity'].unique()) - set(GRANULARITIES)
+    if unknown:
+        raise ValueError(f"Неизвестная детализация: {', '.join(map(str, unknown))}")
+
+    start = pd.to_datetime(frame['period_start'])
+    for granularity, period in PERIODS.items():
+        mask = frame['granularity'] == granularity
+        if mask.any():
+            start[mask] = start[mask].dt.to_period(period).dt.start_time
+    frame['period_start'] = start.dt.date
+    frame['year'] = start.dt.year.astype('int64')
+    return frame
+
+
+def upsert_measurements(db: Session, frame: pd.DataFrame, chunk_size: int = CHUNK_SIZE) -> int:
+    """Вставка или обновление измерений по (участок, детализация, начало периода).
+
+    Обновляются только переданные показатели; пакеты по chunk_size строк и сводки
+    затронутых участков и лет пишутся в одной транзакции.
+    """
+    frame = normalize_measurements(frame).drop_duplicates(KEY_COLUMNS, keep='last')
+    columns = [column for column in MCK_COLUMNS if column in frame]
+    frame = frame[KEY_COLUMNS + ['year'] + columns]
+    frame = frame.astype(object).where(frame.notna(), None)  # NaN -> NULL, значения - типы Python
+
+    stmt = insert(MCKMeasurement)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=KEY_COLUMNS,
+        set_={column: stmt.excluded[column] for column in columns},
+    )
+    try:
+        for start in range(0, len(frame), chunk_size):
+            db.execute(stmt, frame.iloc[start:start + chunk_size].to_dict('records'))
+        refresh_measurement_keys(db, frame[['entity', 'year']].drop_duplicates().itertuples(index=False))
+        db.commit()
+        invalidate_cache()
+    except Exception as e:
+        db.rollback()
+        raise e
+    return len(frame)
+
+
+def _filters(entity: str = None, granularity: str = None, start: date = None, end: date = None):
+    m = MCKMeasurement
+    conditions = []
+    if entity is not None:
+        conditions.append(m.entity == entity)
+    if granularity is not None:
+        conditions.append(m.granularity == granularity)
+    if start is not None:
+        conditions.append(m.period_start >= start)
+    if end is not None:
+        conditions.append(m.period_start < end)
+    return conditions
+
+
+def get_measurements(db: Session, entity: str = None, granularity: str = None,
+                     start: date = None, end: date = None) -> pd.DataFrame:
+    """Измерения за [start, end) в виде DataFrame"""
+    m = MCKMeasurement.__table__
+    stmt = (select(*[m.c[column] for column in KEY_COLUMNS + MCK_COLUMNS])
+            .where(*_filters(entity, granularity, start, end))
+            .order_by(m.c.entity, m.c.granularity, m.c.period_start))
+    rows = db.execute(stmt).all()
+    return pd.DataFrame(rows, columns=KEY_COLUMNS + MCK_COLUMNS)
+
+
+def delete_measurements(db: Session, entity: str = None, granularity: str = None,
+                        start: date = None, end: date = None) -> int:
+    """Удаление измерений за [start, end); без условий - всех"""
+    conditions = _filters(entity, granularity, start, end)
+    try:
+        keys = db.execute(select(MCKMeasurement.entity, MCKMeasurement.year).where(*conditions).distinct()).all()
+        result = db.execute(delete(MCKMeasurement).where(*conditions))
+        refresh_measurement_keys(db, keys)
+        db.commit()
+        invalidate_cache()
+        return result.rowcount
+    except Exception as e:
+        db.rollback()
+        raise e
+
+
+def has_measurements(db: Session, year: int) -> bool:
+    return db.query(exists().where(MCKMeasurement.year == year)).scalar()
+
+
+def list_entities(db: Session):
+    """Участки и количество измерений по детализациям: {участок: {детализация: строк}}"""
+    rows = db.execute(select(MCKMeasurement.entity, MCKMeasurement.granularity, func.count())
+                      .group_by(MCKMeasurement.entity, MCKMeasurement.granularity)).all()
+    entities = {}
+    for entity, granularity, count in rows:
+        entities.setdefault(entity, {})[granularity] = count
+    return entities
+
+
+def incomplete_years(db: Session) -> pd.DataFrame:
+    """Участки и годы, не вошедшие в годовой ряд из-за неполных измерений: months - полных месяцев"""
+    return pd.DataFrame(db.execute(measurement_gaps_select()).all(), columns=['entity', 'year', 'months'])
+
+
+def unmeasured_indicators(db: Session) -> pd.DataFrame:
+    """Годы измерений, в которых измерены не все показатели: indicators - не измеренные,
+    filled - взяты из mck_data (False - строки mck_data за год нет, год не вошел в ряд)"""
+    rows = db.execute(unmeasured_select()).all()
+    return pd.DataFrame([(row.year, bool(row.filled), [column for column in MCK_COLUMNS if getattr(row, column)])
+                         for row in rows], columns=['year', 'filled', 'indicators'])
+
+
+if __name__ == "__main__":
+    import numpy as np
+    from libs.database import temporary_session
+    from controllers.data_loader import load_frame
+
+    rng = np.random.default_rng(0)
+    days = pd.date_range("2030-01-01", "2031-12-31", freq="D")
+    # демонстрация на временной базе - data/app.db не меняется
+    with temporary_session() as db:
+        for entity in ("segment_1", "segment_2"):
+            upsert_measurements(db, pd.DataFrame({
+                'entity': entity, 'granularity': 'day', 'period_start': days,
+                'failures_1': rng.integers(0, 2, len(days)), 'failures_2': rng.integers(0, 2, len(days)),
+                'failures_3': rng.integers(0, 3, len(days)), 'train_losses': rng.random(len(days)),
+                'investments': rng.random(len(days)), 'passengers_daily': rng.integers(50_000, 90_000, len(days)),
+                'tech_failures': rng.integers(0, 2, len(days)), 'fare_cost': 60.0, 'interval': rng.uniform(4, 6, len(days)),
+            }))
+        print(list_entities(db))
+        print(incomplete_years(db))
+        print(load_frame(db).tail())
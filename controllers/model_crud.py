@@ -0,0 +1,114 @@
+import pickle
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import desc, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models.data_models import RegressionModel
+
+TARGETS = {'integral': 'integrated_index', 'interval': 'interval'}
+SAVE_ATTEMPTS = 3
+
+
+def _to_bytes(values) -> bytes:
+    return np.asarray(values, dtype='<f8').tobytes()
+
+
+def _result_arrays(result: dict) -> dict:
+    """Массивы для графиков; у старых pickle-результатов - из объекта statsmodels"""
+    if "fitted" in result:
+        return {key: result[key] for key in ("observed", "fitted", "resid")}
+    model = result["model"]
+    return {"observed": model.model.endog, "fitted": model.fittedvalues, "resid": model.resid}
+
+
+def save_model(db: Session, name: str, result: dict):
+    """Сохранение результата регрессии новой версией модели name.
+
+    Номер версии вычисляется в том же INSERT (SQLite выполняет его под блокировкой записи),
+    так что параллельные записи получают разные версии; уникальный индекс (name, version)
+    страхует - при конфликте сохранение повторяется со следующей версией.
+    """
+    arrays = _result_arrays(result)
+    for attempt in range(SAVE_ATTEMPTS):
+        try:
+            record = RegressionModel(
+                name=name,
+                version=(select(func.coalesce(func.max(RegressionModel.version), 0) + 1)
+                         .where(RegressionModel.name == name).scalar_subquery()),
+                target=TARGETS.get(name),
+                factors=list(result["final_factors"]),
+                removed=list(result["removed"]),
+                equation={k: float(v) for k, v in result["equation"].items()},
+                t_values={k: float(v) for k, v in result["t_values"].items()},
+                r2=float(result["r2"]),
+                f_fact=float(result["f_fact"]),
+                f_crit=None if result["f_crit"] is None else float(result["f_crit"]),
+                observed=_to_bytes(arrays["observed"]),
+                fitted=_to_bytes(arrays["fitted"]),
+                resid=_to_bytes(arrays["resid"]),
+            )
+            db.add(record)
+            db.commit()
+            db.refresh(record)
+            return record
+        except IntegrityError as e:
+            db.rollback()
+            if attempt == SAVE_ATTEMPTS - 1:
+                raise e
+        except Exception as e:
+            db.rollback()
+            raise e
+
+
+def get_latest_model(db: Session, name: str):
+    """Последняя версия модели (без массивов)"""
+    return (db.query(RegressionModel)
+            .filter(RegressionModel.name == name)
+            .order_by(desc(RegressionModel.version))
+            .first())
+
+
+def get_model(db: Session, name: str, version: int):
+    return (db.query(RegressionModel)
+            .filter(RegressionModel.name == name, RegressionModel.version == version)
+            .first())
+
+
+def list_models(db: Session, name: str = None):
+    """Все сохраненные версии моделей"""
+    query = db.query(RegressionModel)
+    if name is not None:
+        query = query.filter(RegressionModel.name == name)
+    return query.order_by(RegressionModel.name, RegressionModel.version).all()
+
+
+def model_to_dict(record: RegressionModel) -> dict:
+    """Словарь в формате результата регрессии (без объекта statsmodels)"""
+    return {
+        "equation": dict(record.equation),
+        "t_values": dict(record.t_values),
+        "f_fact": record.f_fact,
+        "f_crit": record.f_crit,
+        "r2": record.r2,
+        "removed": list(record.removed),
+        "final_factors": list(record.factors),
+        "version": (record.name, record.version),
+    }
+
+
+def model_arrays(record: RegressionModel) -> dict:
+    """Наблюдаемые, расчетные значения и остатки (загружаются при первом обращении)"""
+    return {key: np.frombuffer(getattr(record, key) or b'', dtype='<f8')
+            for key in ("observed", "fitted", "resid")}
+
+
+def import_pickle_models(db: Session, data_dir: Path = Path(__file__).parent.parent.absolute() / 'data'):
+    """Однократный перенос старых data/<name>.pkl в хранилище моделей"""
+    for name in TARGETS:
+        path = data_dir / f"{name}.pkl"
+        if path.exists() and get_latest_model(db, name) is None:
+            with open(path, 'rb') as file:
+                save_model(db, name, pickle.load(file))
@@ -0,0 +1,173 @@
+from typing import Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, delete, insert, func, literal, union_all, exists
+from sqlalchemy.orm import Session
+
+from controllers.data_loader import (invalidate_cache, fetch_array, yearly_source, MCK_COLUMNS,
+                                     MCK_DATA_SOURCE, MEASUREMENTS_SOURCE, MCK_DATA_ENTITY)
+from models.data_models import MCKData, MCKMeasurement, MCKRollup, ROLLUP_STATS
+
+KEY_BATCH = 500  # пар (участок, год) за один пересчет
+ROLLUP_KEY = ['source', 'entity', 'year', 'period', 'granularity', 'period_start']
+ROLLUP_VALUES = ['rows'] + [f'{column}_{stat}' for column in MCK_COLUMNS for stat in ROLLUP_STATS]
+ROLLUP_COLUMNS = ROLLUP_KEY + ROLLUP_VALUES
+
+
+def _periods(source: str):
+    """Исходная таблица, участок, детализация, столбцы группировки и
+    (период, начало периода, условие на исходные строки) для источника сводки"""
+    if source == MCK_DATA_SOURCE:
+        table = MCKData.__table__
+        return table, literal(MCK_DATA_ENTITY), literal('year'), [table.c.year], [
+            ('year', func.printf('%04d-01-01', table.c.year), None),
+        ]
+    table = MCKMeasurement.__table__
+    return table, table.c.entity, table.c.granularity, [table.c.year, table.c.entity, table.c.granularity], [
+        ('year', func.printf('%04d-01-01', table.c.year), None),
+        # помесячная сводка - только из суточных и месячных строк
+        ('month', func.strftime('%Y-%m-01', table.c.period_start), table.c.granularity.in_(('day', 'month'))),
+    ]
+
+
+def _key_filter(source: str, entity, year, keys):
+    """Условие на группы пар (участок, год).
+
+    Участки и годы фильтруются по отдельности (SQLite ищет по индексу, а не перебирает
+    его, как для (entity, year) IN (...)); лишние группы из их сочетаний просто
+    пересчитываются, удаление и вставка используют одно и то же условие.
+    """
+    if keys is None:
+        return []
+    years = year.in_(sorted({year_ for _, year_ in keys}))
+    if source == MCK_DATA_SOURCE:
+        return [years]
+    return [entity.in_(sorted({entity_ for entity_, _ in keys})), years]
+
+
+def source_rollups_select(source: str, keys: List[Tuple[str, int]] = None):
+    """SELECT строк сводки из исходной таблицы (все или только для пар (участок, год))"""
+    table, entity, granularity, group_by, periods = _periods(source)
+    selects = []
+    for period, start, condition in periods:
+        # Фильтр создается для каждого SELECT: раскрываемый IN нельзя разделять между ними
+        where = _key_filter(source, entity, table.c.year, keys) + ([] if condition is None else [condition])
+        stats = []
+        for column in MCK_COLUMNS:
+            value = table.c[column]
+            stats += [func.sum(value), func.count(value), func.min(value), func.max(value)]
+        selects.append(
+            select(literal(source), entity, table.c.year, literal(period), granularity, start, func.count(), *stats)
+            .where(*where)
+            .group_by(*group_by, start))
+    return union_all(*selects)
+
+
+def refresh_rollups(db: Session, source: str, keys: List[Tuple[str, int]] = None):
+    """Пересчет сводок затронутых пар (участок, год) из исходных строк; None - всех.
+
+    Вызывается в транзакции записи до commit: группа пересчитывается целиком,
+    поэтому min / max остаются верными и после удаления строк.
+    """
+    rollups = MCKRollup.__table__
+    batches = [None] if keys is None else [keys[i:i + KEY_BATCH] for i in range(0, len(keys), KEY_BATCH)]
+    for batch in batches:
+        if batch is not None and not batch:
+            continue
+        conditions = [rollups.c.source == source] + _key_filter(source, rollups.c.entity, rollups.c.year, batch)
+        db.execute(delete(rollups).where(*conditions))
+        db.execute(insert(rollups).from_select(ROLLUP_COLUMNS, source_rollups_select(source, batch)))
+
+
+def refresh_mck_years(db: Session, years: Iterable[int]):
+    refresh_rollups(db, MCK_DATA_SOURCE, [(MCK_DATA_ENTITY, int(year)) for year in set(years)])
+
+
+def refresh_measurement_keys(db: Session, keys: Iterable[Tuple[str, int]]):
+    refresh_rollups(db, MEASUREMENTS_SOURCE, sorted({(entity, int(year)) for entity, year in keys}))
+
+
+def rebuild_rollups(db: Session):
+    """Полный пересчет всех сводок"""
+    try:
+        db.execute(delete(MCKRollup))
+        for source in (MCK_DATA_SOURCE, MEASUREMENTS_SOURCE):
+            refresh_rollups(db, source)
+        db.commit()
+        invalidate_cache()
+    except Exception as e:
+        db.rollback()
+        raise e
+    return db.query(func.count(MCKRollup.id)).scalar()
+
+
+def ensure_rollups(db: Session) -> bool:
+    """Построение сводок для базы, заполненной до их появления. True - если строились."""
+    if db.query(exists().where(MCKRollup.id.is_not(None))).scalar():
+        return False
+    if not (db.query(exists().where(MCKData.id.is_not(None))).scalar() or
+            db.query(exists().where(MCKMeasurement.id.is_not(None))).scalar()):
+        return False
+    rebuild_rollups(db)
+    return True
+
+
+def check_rollups(db: Session, rtol: float = 1e-9) -> dict:
+    """Сверка сводок с исходными строками.
+
+    missing / extra - групп нет в mck_rollups / нет в исходных данных, mismatched -
+    значения расходятся больше чем на rtol; yearly_diff - максимальное расхождение
+    годового ряда по сводкам и по исходным строкам.
+    """
+    expected = pd.DataFrame(
+        db.execute(union_all(*[source_rollups_select(source).subquery().select()
+                               for source in (MCK_DATA_SOURCE, MEASUREMENTS_SOURCE)])).all(),
+        columns=ROLLUP_COLUMNS)
+    rollups = MCKRollup.__table__
+    actual = pd.DataFrame(db.execute(select(*[rollups.c[column] for column in ROLLUP_COLUMNS])).all(),
+                          columns=ROLLUP_COLUMNS)
+    for frame in (expected, actual):
+        frame['period_start'] = frame['period_start'].astype(str)
+
+    merged = expected.merge(actual, on=ROLLUP_KEY, how='outer', suffixes=('', '_actual'), indicator=True)
+    both = merged[merged['_merge'] == 'both']
+    mismatched = np.zeros(len(both), dtype=bool)
+    for column in ROLLUP_VALUES:
+        left = both[column].to_numpy(dtype=float)
+        right = both[f'{column}_actual'].to_numpy(dtype=float)
+        same = np.isclose(left, right, rtol=rtol, atol=0) | (np.isnan(left) & np.isnan(right))
+        mismatched |= ~same
+
+    _, from_rollups = fetch_array(db, select(yearly_source()))
+    _, from_rows = fetch_array(db, select(yearly_source(from_rollups=False)))
+    from_rollups = from_rollups[np.argsort(from_rollups[:, 0])]
+    from_rows = from_rows[np.argsort(from_rows[:, 0])]
+    if from_rollups.shape != from_rows.shape or (np.isnan(from_rollups) != np.isnan(from_rows)).any():
+        yearly_diff = np.inf
+    elif from_rows.size:
+        yearly_diff = float(np.nanmax(np.abs(from_rollups - from_rows) / np.maximum(np.abs(from_rows), 1),
+                                      initial=0.0))
+    else:
+        yearly_diff = 0.0
+
+    return {
+        'rows': len(actual),
+        'missing': int((merged['_merge'] == 'left_only').sum()),
+        'extra': int((merged['_merge'] == 'right_only').sum()),
+        'mismatched': int(mismatched.sum()),
+        'yearly_diff': yearly_diff,
+        'ok': bool(len(merged) == len(both) and not mismatched.any() and yearly_diff <= rtol),
+    }
+
+
+if __name__ == "__main__":
+    # Запуск из корня проекта: python -m controllers.rollup_crud [rebuild|check]
+    import sys
+    from libs.database import session_scope
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    with session_scope() as db:
+        if command == "rebuild":
+            print(f"Сводок: {rebuild_rollups(db)}")
+        print(check_rollups(db))
@@ -1,6 +1,9 @@
 import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 Base = declarative_base()
@@ -15,23 +18,148 @@ def get_db_path():
 
 DATABASE_URL = f"sqlite:///{get_db_path()}"
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,
-    connect_args={
-        "check_same_thread": False
-    }
-)
+# Профили SQLite: PRAGMA выполняются для каждого нового соединения пула.
+# durable - fsync на каждую транзакцию; fast - WAL + NORMAL (безопасно при сбое
+# приложения, при отключении питания теряются последние транзакции), кеш и mmap больше.
+ENGINE_PROFILES = {
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,  # КиБ (отрицательное значение - размер, а не число страниц)
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,  # 256 МиБ
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+DEFAULT_PROFILE = "fast"
+
+# Пул соединений: задачи QThreadPool берут по соединению, остальные ждут pool_timeout
+POOL_SIZE = 4
+MAX_OVERFLOW = 4
+
+
+def make_engine(url: str = DATABASE_URL, profile: str = DEFAULT_PROFILE, echo: bool = False):
+    """Движок SQLite с PRAGMA профиля и ограниченным пулом соединений"""
+    pragmas = ENGINE_PROFILES[profile]
+    new_engine = create_engine(
+        url,
+        echo=echo,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=30,
+        query_cache_size=1000,  # кеш скомпилированных SQLAlchemy запросов
+        connect_args={
+            "check_same_thread": False,
+            "cached_statements": 256,  # кеш подготовленных выражений sqlite3 на соединение
+        }
+    )
+
+    @event.listens_for(new_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return new_engine
+
+
+active_profile = os.getenv("DB_PROFILE", DEFAULT_PROFILE)
+engine = make_engine(profile=active_profile, echo=os.getenv("DB_ECHO", "0") == "1")
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+
+def use_profile(profile: str):
+    """Переключение профиля движка (например, после чтения .env)"""
+    global engine, active_profile
+    if profile == active_profile:
+        return
+    old = engine
+    engine = make_engine(profile=profile, echo=old.echo)
+    active_profile = profile
+    SessionLocal.configure(bind=engine)
+    old.dispose()
+
+
+# Индексы, замененные в новых версиях схемы
+DROPPED_INDEXES = ["uq_analysis_results_year"]
+
+def upgrade_schema():
+    """Добавляет в существующие таблицы новые столбцы и удаляет устаревшие индексы"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for name in DROPPED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+
+def adopt_legacy_results():
+    """Результаты, сохраненные до появления расчетов (run_id NULL), - в отдельный расчет 'legacy'"""
+    with engine.begin() as conn:
+        count, last = conn.execute(text(
+            "SELECT count(*), max(created_at) FROM analysis_results WHERE run_id IS NULL")).one()
+        if not count:
+            return
+        at = last or datetime.now().isoformat(sep=' ')
+        run_id = conn.execute(text(
+            "INSERT INTO analysis_runs (params_hash, data_fingerprint, created_at, updated_at) "
+            "VALUES ('legacy', '', :at, :at)"), {"at": at}).lastrowid
+        conn.execute(text("UPDATE analysis_results SET run_id = :run_id WHERE run_id IS NULL"), {"run_id": run_id})
+
+
 def init_db():
+    upgrade_schema()
     Base.metadata.create_all(engine)
+    # create_all не добавляет индексы в уже существующие таблицы
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    adopt_legacy_results()
     print(f"База данных создана: {get_db_path()}")
 
-def get_db():
+@contextmanager
+def session_scope():
+    """Сессия на блок with: откат при исключении, закрытие (возврат соединения в пул) всегда"""
     db = SessionLocal()
     try:
         yield db
+    except Exception:
+        db.rollback()
+        raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@contextmanager
+def temporary_session(profile: str = DEFAULT_PROFILE):
+    """Сессия на временной базе со всеми таблицами - демонстрации и проверки не трогают data/app.db"""
+    import models.data_models, models.User  # noqa: F401 - таблицы в Base.metadata
+    from controllers.data_loader import invalidate_cache
+
+    with tempfile.TemporaryDirectory() as directory:
+        temp_engine = make_engine(f"sqlite:///{Path(directory) / 'app.db'}", profile)
+        Base.metadata.create_all(temp_engine)
+        invalidate_cache()  # кеш загрузчика общий для всех баз
+        db = sessionmaker(bind=temp_engine, autocommit=False, autoflush=False)()
+        try:
+            yield db
+        finally:
+            db.close()
+            temp_engine.dispose()
+            invalidate_cache()
@@ -1,9 +1,12 @@
 import sys
 import os
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 
 from controllers.crud import check_if_logged_in, load_user_session, create_user, check_existing_admin
-from libs.database import init_db
+from libs.database import init_db, session_scope, use_profile, DEFAULT_PROFILE
+from controllers.model_crud import import_pickle_models
+from controllers.rollup_crud import ensure_rollups
 from views.main_window import MainWindow
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -18,6 +21,7 @@ class MainApp:
     def __init__(self):
         self.app = QApplication(sys.argv)
         load_dotenv()
+        use_profile(getenv("DB_PROFILE", DEFAULT_PROFILE))
         self.init_database()
         self.init_admin()
         self.auth_window = Auth()
@@ -29,6 +33,9 @@ class MainApp:
     def init_database(self):
         try:
             init_db()
+            with session_scope() as db:
+                import_pickle_models(db)
+                ensure_rollups(db)
             print("База данных успешно инициализирована")
         except Exception as e:
             print(f"Ошибка инициализации БД: {e}")
@@ -105,5 +112,7 @@ class MainApp:
 
 
 if __name__ == "__main__":
+    # Нужно для пула процессов (перебор моделей) в сборке PyInstaller под Windows
+    multiprocessing.freeze_support()
     main_app = MainApp()
     sys.exit(main_app.run())
\ No newline at end of file
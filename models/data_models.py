@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, Float, DateTime
+from sqlalchemy import Column, Integer, Float, Date, DateTime, Index, String, JSON, ForeignKey, LargeBinary, Table
+from sqlalchemy.orm import deferred
 from libs.database import Base
 from datetime import datetime
 
@@ -20,10 +21,122 @@ class MCKData(Base):
     def __repr__(self):
         return f"<MCKData {self.year}>"
 
+class MCKMeasurement(Base):
+    """Измерения по участкам линии за сутки / месяц / год (показатели - как в mck_data)"""
+    __tablename__ = "mck_measurements"
+    __table_args__ = (
+        # ключ измерения, upsert и выборка ряда одного участка
+        Index("uq_mck_measurements_key", "entity", "granularity", "period_start", unique=True),
+        # свертка по годам (GROUP BY year, entity с выбором самой мелкой детализации)
+        Index("ix_mck_measurements_rollup", "year", "entity", "granularity"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String(64), nullable=False)  # участок линии ("mck" - вся линия)
+    period_start = Column(Date, nullable=False)  # начало периода
+    granularity = Column(String(8), nullable=False)  # day / month / year
+    year = Column(Integer, nullable=False)  # год period_start - для группировки по индексу
+    failures_1 = Column(Integer)
+    failures_2 = Column(Integer)
+    failures_3 = Column(Integer)
+    train_losses = Column(Float)
+    investments = Column(Float)
+    passengers_daily = Column(Integer)
+    tech_failures = Column(Integer)
+    fare_cost = Column(Float)
+    interval = Column(Float)
+    created_at = Column(DateTime, default=datetime.now)
+
+    def __repr__(self):
+        return f"<MCKMeasurement {self.entity} {self.granularity} {self.period_start}>"
+
+# Показатели mck_data и статистики сводки по каждому из них
+INDICATORS = [column.name for column in MCKData.__table__.columns if column.name not in ("id", "year")]
+ROLLUP_STATS = ("sum", "count", "min", "max")
+
+
+class MCKRollup(Base):
+    """Сводка за год / месяц по участку: <показатель>_sum / _count / _min / _max.
+
+    Поддерживается при записи исходных данных; среднее - sum / count (count - строк без NULL).
+    """
+    __table__ = Table(
+        "mck_rollups", Base.metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("source", String(16), nullable=False),  # mck_data / measurements
+        Column("entity", String(64), nullable=False),
+        Column("year", Integer, nullable=False),
+        Column("period", String(8), nullable=False),  # year / month
+        Column("granularity", String(8), nullable=False),  # детализация исходных строк
+        Column("period_start", Date, nullable=False),
+        Column("rows", Integer, nullable=False),  # исходных строк в группе
+        *[Column(f"{indicator}_{stat}", Integer if stat == "count" else Float)
+          for indicator in INDICATORS for stat in ROLLUP_STATS],
+        # ключ сводки; префикс (source, entity, year) - пересчет затронутых записью групп
+        Index("uq_mck_rollups_key", "source", "entity", "year", "period", "granularity", "period_start",
+              unique=True),
+        # годовой ряд для аналитики
+        Index("ix_mck_rollups_read", "period", "year", "source", "entity", "granularity"),
+    )
+
+    def __repr__(self):
+        return f"<MCKRollup {self.source} {self.entity} {self.period} {self.period_start}>"
+
+class AnalysisRun(Base):
+    __tablename__ = "analysis_runs"
+    __table_args__ = (
+        # поиск последнего расчета для тех же параметров и входных данных
+        Index("ix_analysis_runs_lookup", "params_hash", "data_fingerprint", "updated_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    params_hash = Column(String(64), nullable=False)  # хеш параметров метода
+    data_fingerprint = Column(String(64), nullable=False)  # хеш исходных данных
+    weights = Column(JSON)  # веса показателей {показатель: вес}
+    iterations = Column(Integer)
+    residual = Column(Float)
+    duration = Column(Float)  # время расчета, с
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, index=True)
+
+    def __repr__(self):
+        return f"<AnalysisRun {self.id}>"
+
 class AnalysisResult(Base):
     __tablename__ = "analysis_results"
+    __table_args__ = (
+        Index("uq_analysis_results_run_year", "run_id", "year", unique=True),  # для upsert
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("analysis_runs.id"), index=True)
     year = Column(Integer, index=True)
     integrated_index = Column(Float)  # y_оконч
-    created_at = Column(DateTime, default=datetime.now)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.now)
+
+
+class RegressionModel(Base):
+    __tablename__ = "regression_models"
+    __table_args__ = (
+        Index("uq_regression_models_name_version", "name", "version", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(32), nullable=False)  # integral / interval
+    version = Column(Integer, nullable=False)
+    target = Column(String(64))  # зависимая переменная
+    factors = Column(JSON)  # оставшиеся факторы
+    removed = Column(JSON)  # исключенные факторы
+    equation = Column(JSON)  # {const / фактор: коэффициент}
+    t_values = Column(JSON)
+    r2 = Column(Float)
+    f_fact = Column(Float)
+    f_crit = Column(Float)
+    created_at = Column(DateTime, default=datetime.now)
+    # Массивы float64 для графиков - загружаются только при обращении
+    observed = deferred(Column(LargeBinary))
+    fitted = deferred(Column(LargeBinary))
+    resid = deferred(Column(LargeBinary))
+
+    def __repr__(self):
+        return f"<RegressionModel {self.name} v{self.version}>"
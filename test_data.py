@@ -8,12 +8,12 @@ def add_test_data():
 
     # Пример данных за 2020-2024 годы согласно новым полям
     test_data = [
-        # year, f1, f2, f3, train_loss, invest, pass_daily, tech_fail, fare
-        (2020, 2, 5, 8, 1.2, 1200.5, 150000, 3, 45.0),
-        (2021, 1, 4, 6, 0.8, 1500.3, 160000, 2, 46.5),
-        (2022, 0, 3, 5, 0.5, 1800.7, 170000, 1, 48.0),
-        (2023, 1, 2, 4, 0.3, 2000.2, 180000, 0, 50.0),
-        (2024, 0, 1, 3, 0.1, 2200.9, 190000, 0, 52.5)
+        # year, f1, f2, f3, train_loss, invest, pass_daily, tech_fail, fare, interval
+        (2020, 2, 5, 8, 1.2, 1200.5, 150000, 3, 45.0, 6.0),
+        (2021, 1, 4, 6, 0.8, 1500.3, 160000, 2, 46.5, 5.8),
+        (2022, 0, 3, 5, 0.5, 1800.7, 170000, 1, 48.0, 5.5),
+        (2023, 1, 2, 4, 0.3, 2000.2, 180000, 0, 50.0, 5.2),
+        (2024, 0, 1, 3, 0.1, 2200.9, 190000, 0, 52.5, 5.0)
     ]
 
     for data in test_data:
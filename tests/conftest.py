@@ -0,0 +1,10 @@
+import pytest
+
+from libs.database import temporary_session
+
+
+@pytest.fixture
+def db():
+    """Сессия на временной базе (data/app.db не используется)"""
+    with temporary_session() as session:
+        yield session
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from analytics.backtest import backtest_frame
+
+
+def make_frame(n=12):
+    years = pd.Index(range(2010, 2010 + n), name='year')
+    return pd.DataFrame({'failures_1': np.arange(n, dtype=float) % 4,
+                         'interval': np.linspace(6, 4, n)}, index=years)
+
+
+def test_constant_only_equation_scores_full_windows_only():
+    frame = make_frame()
+    result = backtest_frame(frame, {'const': 5.0}, 'interval', window=5)
+
+    assert result['final'].iloc[:5].isna().all()
+    assert (result['final'].iloc[5:] == 5.0).all()
+    assert result['final_metrics']['points'] == 7
+    expected = np.abs(frame['interval'].iloc[5:] - 5.0).mean()
+    assert result['final_metrics']['mae'] == expected
+
+
+def test_factor_equation_uses_same_origins():
+    frame = make_frame()
+    constant = backtest_frame(frame, {'const': 5.0}, 'interval', window=5)
+    with_factor = backtest_frame(frame, {'const': 5.0, 'failures_1': 0.1}, 'interval', window=5)
+    assert constant['final_metrics']['points'] == with_factor['final_metrics']['points'] == 7
+    assert with_factor['indicators']['failures_1']['points'] == 7
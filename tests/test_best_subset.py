@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.best_subset import best_subset_search
+
+
+def make_frame(n=15, seed=1):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'x1': rng.normal(size=n), 'x2': rng.normal(size=n), 'zero': np.zeros(n)})
+    df['collinear'] = df['x1'] + df['x2']
+    df['y'] = 1 + 2 * df['x1'] + rng.normal(0, 0.1, n)
+    return df
+
+
+@pytest.mark.parametrize('workers, min_parallel', [(1, 1), (2, 1)])
+def test_degenerate_subsets_are_skipped(workers, min_parallel):
+    df = make_frame()
+    factors = ['x1', 'x2', 'zero', 'collinear']
+    models = best_subset_search(df, 'y', factors, top_k=100, workers=workers,
+                                batch_size=2, min_parallel=min_parallel)
+
+    chosen = [model['factors'] for model in models]
+    assert ['x1'] in chosen and ['x1', 'x2'] in chosen
+    assert not any('zero' in names for names in chosen)
+    assert ['x1', 'x2', 'collinear'] not in chosen
+    # x1, x2, collinear и их сочетания без зависимости: 6 наборов (из 3-х - только пары)
+    assert len(models) == 6
+    assert models[0]['factors'][0] == 'x1'
+    assert all(np.isfinite(model['adj_r2']) for model in models)
+
+
+def test_serial_and_pool_agree():
+    df = make_frame()
+    factors = ['x1', 'x2', 'collinear']
+    serial = best_subset_search(df, 'y', factors, workers=1)
+    pooled = best_subset_search(df, 'y', factors, workers=2, batch_size=1, min_parallel=1)
+    assert [model['factors'] for model in serial] == [model['factors'] for model in pooled]
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+
+from benchmarks import make_records, orm_dataframe
+from controllers.data_crud import get_all_data_dataframe
+from controllers.rollup_crud import rebuild_rollups
+from models.data_models import MCKData
+
+
+def fill(db, records):
+    db.execute(insert(MCKData), records)
+    db.commit()
+    rebuild_rollups(db)
+
+
+def test_frame_matches_orm_rows(db):
+    fill(db, make_records(500, seed=3))
+    orm = orm_dataframe(db)
+    db.expunge_all()
+    fast = get_all_data_dataframe(db)
+
+    assert list(fast['year']) == list(orm['year'])
+    for column in orm.columns:
+        np.testing.assert_allclose(fast[column].to_numpy(dtype=float), orm[column].to_numpy(dtype=float),
+                                   rtol=1e-12, err_msg=column)
+    np.testing.assert_allclose(fast['profitability'], fast['fare_cost'] * fast['passengers_daily'].astype(float))
+
+
+def test_zero_interval_gives_missing_ratio(db):
+    records = make_records(3)
+    records[1]['interval'] = 0.0
+    fill(db, records)
+    frame = get_all_data_dataframe(db)
+    assert pd.isna(frame.loc[1, 'cap_invest_interval'])
+    assert frame['cap_invest_interval'].notna().sum() == 2
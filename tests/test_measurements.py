@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from analytics.integral import IntegralIndex
+from controllers.data_crud import create_mck_data
+from controllers.data_loader import MCK_COLUMNS, load_frame, load_years, build_select, fetch_array, yearly_source
+from controllers.measurement_crud import upsert_measurements, unmeasured_indicators
+from sqlalchemy import select
+
+
+def add_years(db, years):
+    rng = np.random.default_rng(0)
+    for year in years:
+        create_mck_data(db, year, int(rng.integers(0, 5)), int(rng.integers(0, 5)), int(rng.integers(1, 9)),
+                        float(rng.random()), float(rng.uniform(1000, 2000)), int(rng.integers(100_000, 200_000)),
+                        int(rng.integers(0, 4)), float(rng.uniform(40, 60)), float(rng.uniform(4, 6)))
+
+
+def partial_months(year):
+    """12 месячных строк только с failures_1 и interval"""
+    return pd.DataFrame({
+        'granularity': 'month',
+        'period_start': pd.date_range(f"{year}-01-01", periods=12, freq='MS'),
+        'failures_1': 1,
+        'interval': 5.0,
+    })
+
+
+def test_partial_indicators_are_filled_from_mck_data(db):
+    add_years(db, range(2018, 2026))
+    entered = load_frame(db).loc[2025]
+    upsert_measurements(db, partial_months(2025))
+
+    frame = load_frame(db)
+    row = frame.loc[2025]
+    assert row['failures_1'] == 12
+    assert row['interval'] == 5.0
+    others = [column for column in MCK_COLUMNS if column not in ('failures_1', 'interval')]
+    assert (row[others] == entered[others]).all()
+    assert not frame.isna().any().any()
+
+    # свертка исходных строк дает тот же ряд, что и сводки
+    _, from_rows = fetch_array(db, select(yearly_source(from_rollups=False)))
+    _, from_rollups = fetch_array(db, select(yearly_source()))
+    np.testing.assert_allclose(from_rows, from_rollups)
+
+    report = unmeasured_indicators(db)
+    assert report['year'].tolist() == [2025] and report['filled'].tolist() == [True]
+    assert set(report['indicators'][0]) == set(others)
+
+
+def test_partial_year_without_mck_data_is_left_out(db):
+    add_years(db, range(2018, 2025))
+    upsert_measurements(db, partial_months(2025))
+
+    assert 2025 not in load_years(db)
+    assert 2025 not in load_frame(db, columns=['failures_1']).index
+    report = unmeasured_indicators(db)
+    assert report['year'].tolist() == [2025] and report['filled'].tolist() == [False]
+
+
+def test_integral_index_stays_finite_with_partial_measurements(db):
+    add_years(db, range(2018, 2026))
+    upsert_measurements(db, partial_months(2025))
+
+    index = IntegralIndex()
+    results, weights, _ = index.recompute(db)
+    assert 2025 in results
+    assert np.isfinite(list(results.values())).all()
+    assert np.isfinite(list(weights.values())).all()
@@ -0,0 +1,45 @@
+import threading
+
+import numpy as np
+from sqlalchemy.orm import sessionmaker
+
+from controllers.model_crud import save_model, list_models
+
+RESULT = {
+    "equation": {"const": 1.0, "x": 2.0},
+    "t_values": {"const": 3.0, "x": 4.0},
+    "r2": 0.5, "f_fact": 1.0, "f_crit": None,
+    "removed": [], "final_factors": ["x"],
+    "observed": np.ones(3), "fitted": np.ones(3), "resid": np.zeros(3),
+}
+
+
+def test_concurrent_saves_get_distinct_versions(db):
+    Session = sessionmaker(bind=db.get_bind())
+    errors = []
+
+    def save_many():
+        session = Session()
+        try:
+            for _ in range(10):
+                save_model(session, "integral", RESULT)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=save_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    versions = [record.version for record in list_models(db, "integral")]
+    assert versions == list(range(1, 41))
+
+
+def test_versions_are_per_name(db):
+    assert save_model(db, "integral", RESULT).version == 1
+    assert save_model(db, "interval", RESULT).version == 1
+    assert save_model(db, "integral", RESULT).version == 2
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.ols import ols_fit
+from analytics.equations import iterative_regression, single_step_regression
+
+
+def make_frame(n=12, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'x1': rng.normal(10, 2, n),
+        'x2': rng.normal(5, 1, n),
+        'zero': np.zeros(n),  # например, failures_3 = 0 во все годы
+    })
+    df['collinear'] = 2 * df['x1'] - df['x2']
+    df['y'] = 3 + 1.5 * df['x1'] - 2 * df['x2'] + rng.normal(0, 0.1, n)
+    return df
+
+
+def design(df, factors):
+    return np.column_stack([np.ones(len(df)), df[factors].to_numpy()])
+
+
+def test_full_rank_matches_lstsq():
+    df = make_frame()
+    X = design(df, ['x1', 'x2'])
+    fit = ols_fit(X, df['y'].to_numpy())
+    expected, *_ = np.linalg.lstsq(X, df['y'].to_numpy(), rcond=None)
+    np.testing.assert_allclose(fit['coef'], expected)
+    assert not fit['deficient'].any()
+    assert fit['df_resid'] == len(df) - 3
+
+
+@pytest.mark.parametrize('column', ['zero', 'collinear'])
+def test_rank_deficient_design(column):
+    df = make_frame()
+    X = design(df, ['x1', 'x2', column])
+    y = df['y'].to_numpy()
+    fit = ols_fit(X, y)
+
+    # Решение с минимальной нормой, как pinv в statsmodels, без огромных коэффициентов
+    np.testing.assert_allclose(fit['coef'], np.linalg.pinv(X) @ y, atol=1e-8)
+    np.testing.assert_allclose(fit['fitted'], X @ fit['coef'])
+    assert fit['deficient'].tolist() == [False, False, False, True]
+    assert fit['t_values'][3] == 0 and fit['p_values'][3] == 1
+    assert fit['df_resid'] == len(df) - 3
+    assert np.isfinite(fit['se']).all() and np.isfinite(fit['f_value'])
+
+
+@pytest.mark.parametrize('column', ['zero', 'collinear'])
+def test_iterative_regression_drops_deficient_factor(column):
+    df = make_frame()
+    result = iterative_regression(df, 'y', ['x1', 'x2', column])
+    assert result['removed'][0] == column
+    assert result['final_factors'] == ['x1', 'x2']
+    assert result['equation']['x1'] == pytest.approx(1.5, abs=0.1)
+
+
+def test_single_step_with_deficient_factor():
+    df = make_frame()
+    result = single_step_regression(df, 'y', ['x1', 'zero'])
+    assert result['t_values']['zero'] == 0
+    assert np.isfinite(result['f_fact'])
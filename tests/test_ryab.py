@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from analytics.ryab import normalize_column, normalize_data
+
+
+def test_normalize_column_skips_missing_values():
+    values = np.array([1.0, np.nan, 3.0, 5.0])
+    np.testing.assert_allclose(normalize_column(values), [0.0, np.nan, 0.5, 1.0])
+    np.testing.assert_allclose(normalize_column(values, reverse=True), [1.0, np.nan, 0.5, 0.0])
+    np.testing.assert_allclose(normalize_column(values, exact=True), [0.0, np.nan, 0.5, 1.0])
+
+
+def test_normalize_data_matches_pandas_min_max():
+    data = pd.DataFrame({'failures_1': [2.0, np.nan, 0.0], 'interval': [6.0, 5.5, np.nan]}, index=[2020, 2021, 2022])
+    normalized = normalize_data(data)
+    expected_failures = (data['failures_1'].max() - data['failures_1']) / (
+        data['failures_1'].max() - data['failures_1'].min())
+    expected_interval = (data['interval'] - data['interval'].min()) / (
+        data['interval'].max() - data['interval'].min())
+    pd.testing.assert_series_equal(normalized['failures_1'], expected_failures)
+    pd.testing.assert_series_equal(normalized['interval'], expected_interval)
@@ -1,18 +1,20 @@
-from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-                               QLabel, QTableWidget, QTableWidgetItem, QMessageBox,
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QPushButton,
+                               QLabel, QTableView, QMessageBox,
                                QHeaderView, QGroupBox, QTextEdit)
 from PySide6.QtCore import Qt
+import pandas as pd
 
-from analytics.ryab import calculate, normalize_data, get_data
-from controllers.data_crud import get_all_data_dataframe
-from libs.database import get_db
-from controllers.analysis_crud import save_analysis_result
-from analytics.corel_matrix import get_correl_matrix
+from analytics.integral import integral_index
+from views.app_manager import app_manager
+from views.table_model import FrameTableModel
+from views.tasks import TaskRunner
 
 class AnalyticsWindow(QWidget):
     def __init__(self):
         super().__init__()
+        self.tasks = TaskRunner(self)
         self.setup_ui()
+        app_manager.integral_updated_signal.connect(self.on_integral_updated)
 
     def setup_ui(self):
         layout = QVBoxLayout()
@@ -24,27 +26,32 @@ class AnalyticsWindow(QWidget):
         layout.addWidget(title)
 
         # Кнопка расчета
-        calc_btn = QPushButton("Рассчитать интегральный показатель")
-        calc_btn.clicked.connect(self.calculate_integral)
-        calc_btn.setStyleSheet("background: #2196F3; color: white; padding: 10px;")
-        layout.addWidget(calc_btn)
+        self.calc_btn = QPushButton("Рассчитать интегральный показатель")
+        self.calc_btn.clicked.connect(self.calculate_integral)
+        self.calc_btn.setStyleSheet("background: #2196F3; color: white; padding: 10px;")
+        layout.addWidget(self.calc_btn)
 
         # Группа для результатов
         results_group = QGroupBox("Результаты расчета")
         results_layout = QVBoxLayout()
 
+        # Сходимость последнего расчета весов
+        self.convergence_label = QLabel("")
+        results_layout.addWidget(self.convergence_label)
+
         # Таблица с интегральными показателями
-        self.integral_table = QTableWidget()
-        self.integral_table.setColumnCount(2)
-        self.integral_table.setHorizontalHeaderLabels(["Год", "Интегральный показатель"])
+        self.integral_model = FrameTableModel(["Год", "Интегральный показатель"],
+                                              {"integrated_index": "{:.4f}"}, parent=self)
+        self.integral_table = QTableView()
+        self.integral_table.setModel(self.integral_model)
         self.integral_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         results_layout.addWidget(QLabel("Интегральные показатели качества:"))
         results_layout.addWidget(self.integral_table)
 
         # Таблица с весами
-        self.weights_table = QTableWidget()
-        self.weights_table.setColumnCount(2)
-        self.weights_table.setHorizontalHeaderLabels(["Показатель", "Вес"])
+        self.weights_model = FrameTableModel(["Показатель", "Вес"], {"weight": "{:.6f}"}, parent=self)
+        self.weights_table = QTableView()
+        self.weights_table.setModel(self.weights_model)
         self.weights_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         results_layout.addWidget(QLabel("Веса показателей:"))
         results_layout.addWidget(self.weights_table)
@@ -63,72 +70,65 @@ class AnalyticsWindow(QWidget):
         self.setWindowTitle("Аналитика МЦК - Метод Рябцева")
         self.resize(800, 800)
 
-    # def calculate_correl_matrix(self):
-    #     try:
-    #         db = next(get_db())
-    #         from controllers.data_crud import get_all_data
-    #         data = get_all_data(db)
-    #         years = [record.year for record in data]
-    #         if not years:
-    #             QMessageBox.warning(self, "Ошибка", "Нет данных для анализа!")
-    #             return
-    #
-    #         result = get_correl_matrix(db, years)
-    #         return result
-    #     except Exception as e:
-    #         QMessageBox.warning(self, "Ошибка", f"Ошибка расчета: {str(e)}")
-
     def calculate_integral(self):
-        """Расчет интегрального показателя"""
-        try:
-            db = next(get_db())
+        """Расчет интегрального показателя в фоновом потоке"""
+        self.calc_btn.setEnabled(False)
+        self.tasks.start("integral", lambda db, task: integral_index.recompute(db),
+                         on_result=self.on_integral_calculated, on_error=self.on_task_error,
+                         on_finished=lambda: self.calc_btn.setEnabled(True))
 
-            # Получаем все годы из базы
-            from controllers.data_crud import get_all_data
-            data = get_all_data(db)
-            years = [record.year for record in data]
-            if not years:
+    def on_integral_calculated(self, calculated):
+        try:
+            if calculated is None:
                 QMessageBox.warning(self, "Ошибка", "Нет данных для анализа!")
                 return
 
-            data_for_normalize = get_data(db, years)
-
-            results, weights = calculate(normalize_data(data_for_normalize))
-            results = results['weighted_sum'].to_dict()
-            weights = weights['correlation'].to_dict()
+            results, weights, info = calculated
+            self.show_convergence(info)
             if not results:
                 QMessageBox.warning(self, "Ошибка", "Не удалось рассчитать показатели!")
                 return
 
-
-            # Сохраняем результаты
-            for year, value in results.items():
-                save_analysis_result(db, year, value)
-
             # Отображаем результаты
             self.display_results(results, weights)
             self.display_interpretation(weights)
 
-            QMessageBox.information(self, "Успех", "Расчет завершен!")
+            if info.get('reused'):
+                QMessageBox.information(self, "Успех", "Данные не менялись - использован сохраненный расчет")
+            else:
+                QMessageBox.information(self, "Успех", "Расчет завершен!")
 
         except Exception as e:
             QMessageBox.warning(self, "Ошибка", f"Ошибка расчета: {str(e)}")
             import traceback
             print(traceback.format_exc())  # Для детальной отладки
 
+    def show_convergence(self, info):
+        if info.get('iterations') is None:
+            self.convergence_label.setText("")
+            return
+        residual = "-" if info.get('residual') is None else f"{info['residual']:.3e}"
+        self.convergence_label.setText(f"Итераций: {info['iterations']}, невязка: {residual}")
+
+    def on_task_error(self, message):
+        QMessageBox.warning(self, "Ошибка", f"Ошибка расчета: {message}")
+
+    def on_integral_updated(self, results, weights):
+        """Инкрементальное обновление после изменения данных"""
+        self.display_results(results, weights)
+        self.display_interpretation(weights)
+
     def display_results(self, results, weights):
-        """Отображение результатов в таблицах"""
+        """Отображение результатов в таблицах (обновляются только изменившиеся строки)"""
         # Интегральные показатели
-        self.integral_table.setRowCount(len(results))
-        for row, (year, value) in enumerate(results.items()):
-            self.integral_table.setItem(row, 0, QTableWidgetItem(str(year)))
-            self.integral_table.setItem(row, 1, QTableWidgetItem(f"{value:.4f}"))
+        integral = pd.DataFrame({"integrated_index": list(results.values())},
+                                index=pd.Index(list(results.keys()), name="year"))
+        self.integral_model.update_frame(integral)
 
         # Веса показателей
-        self.weights_table.setRowCount(len(weights))
-        for row, (indicator, weight) in enumerate(weights.items()):
-            self.weights_table.setItem(row, 0, QTableWidgetItem(self.get_indicator_name(indicator)))
-            self.weights_table.setItem(row, 1, QTableWidgetItem(f"{weight:.6f}"))
+        names = [self.get_indicator_name(indicator) for indicator in weights]
+        self.weights_model.update_frame(pd.DataFrame({"weight": list(weights.values())},
+                                                     index=pd.Index(names, name="indicator")))
 
     def display_interpretation(self, weights):
         """Отображение интерпретации результатов"""
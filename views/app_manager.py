@@ -4,6 +4,8 @@ from PySide6.QtCore import QObject, Signal
 class AppManager(QObject):
     show_main_signal = Signal(int, bool)  # user_id, is_admin
     logout_signal = Signal(bool) # сохранена ли авторизация? True or False
+    integral_updated_signal = Signal(object, object)  # результаты по годам, веса
+    model_saved_signal = Signal(str, int)  # имя модели, версия
 
     def __init__(self):
         super().__init__()
@@ -1,16 +1,23 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QPushButton, QLabel, QLineEdit,
-    QTableWidget, QTableWidgetItem, QMessageBox, QHeaderView,
-    QGridLayout, QScrollArea
+    QTableView, QMessageBox, QHeaderView,
+    QGridLayout, QScrollArea, QFileDialog, QProgressBar, QHBoxLayout
 )
 from PySide6.QtCore import Qt
-from libs.database import get_db
-from controllers.data_crud import create_mck_data, get_all_data, delete_data
+from controllers.data_crud import create_mck_data, delete_data
+from controllers.data_import import import_file, format_import_report
+from controllers.data_export import export_path
+from controllers.data_loader import load_frame
+from analytics.integral import integral_index
+from views.app_manager import app_manager
+from views.table_model import FrameTableModel, ButtonDelegate
+from views.tasks import TaskRunner
 
 
 class DataInputWindow(QWidget):
     def __init__(self):
         super().__init__()
+        self.tasks = TaskRunner(self)
         self.setup_ui()
         self.load_data()
 
@@ -61,17 +68,44 @@ class DataInputWindow(QWidget):
         add_btn = QPushButton("Добавить данные")
         add_btn.clicked.connect(self.add_data)
         add_btn.setStyleSheet("background: #4CAF50; color: white; padding: 10px; font-weight: bold;")
-        scroll_layout.addWidget(add_btn)
+
+        # Импорт из файла
+        self.import_btn = QPushButton("Импорт из файла (.xlsx, .csv)")
+        self.import_btn.clicked.connect(self.import_data)
+        self.import_btn.setStyleSheet("background: #2196F3; color: white; padding: 10px; font-weight: bold;")
+        self.import_progress = QProgressBar()
+        self.import_progress.setVisible(False)
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.addWidget(add_btn)
+        buttons_layout.addWidget(self.import_btn)
+
+        self.export_btn = QPushButton("Экспорт (.xlsx, .csv, .npz)")
+        self.export_btn.clicked.connect(self.export_data)
+        self.export_btn.setStyleSheet("background: #607D8B; color: white; padding: 10px; font-weight: bold;")
+        buttons_layout.addWidget(self.export_btn)
+        scroll_layout.addLayout(buttons_layout)
+        scroll_layout.addWidget(self.import_progress)
 
         # Таблица
-        self.table = QTableWidget()
-        self.table.setColumnCount(11)
         headers = [
             "Год", "Отказы 1", "Отказы 2", "Отказы 3", "Поездопотери",
             "Кап. вложения", "Пассажиры", "Тех. отказы", "Стоимость", "Интервал"
         ]
-        self.table.setHorizontalHeaderLabels(headers)
+        formats = {
+            'failures_1': "{:.0f}", 'failures_2': "{:.0f}", 'failures_3': "{:.0f}",
+            'train_losses': "{:.2f}", 'investments': "{:.2f}", 'passengers_daily': "{:.0f}",
+            'tech_failures': "{:.0f}", 'fare_cost': "{:.2f}", 'interval': "{:.4f}",
+        }
+        self.model = FrameTableModel(headers, formats, action="Удалить", parent=self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.delete_delegate = ButtonDelegate(parent=self.table)
+        self.delete_delegate.clicked.connect(lambda row: self.delete_record(self.model.row_key(row)))
+        self.table.setItemDelegateForColumn(len(headers), self.delete_delegate)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        # Ширина столбцов - по видимым строкам, а не по выборке из всей таблицы
+        self.table.horizontalHeader().setResizeContentsPrecision(0)
         scroll_layout.addWidget(self.table)
 
         scroll_widget.setLayout(scroll_layout)
@@ -98,51 +132,111 @@ class DataInputWindow(QWidget):
                 'fare_cost': float(self.inputs['fare_cost'].text()),
                 'interval': float(self.inputs['interval'].text())
             }
+        except ValueError:
+            QMessageBox.warning(self, "Ошибка", "Проверьте правильность введенных данных!")
+            return
 
-            db = next(get_db())
-            create_mck_data(db, **data)
+        self.tasks.start("add", lambda db, task: self.insert_row(db, data),
+                         on_result=self.on_data_added,
+                         on_error=lambda message: QMessageBox.warning(self, "Ошибка", f"Ошибка добавления: {message}"),
+                         write=True)
 
-            self.clear_inputs()
-            self.load_data()
-            QMessageBox.information(self, "Успех", "Данные добавлены!")
+    @staticmethod
+    def insert_row(db, data):
+        create_mck_data(db, **data)
+        return data, integral_index.upsert_row(db, data['year'])
 
-        except ValueError:
-            QMessageBox.warning(self, "Ошибка", "Проверьте правильность введенных данных!")
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка добавления: {str(e)}")
+    def on_data_added(self, data):
+        values, calculated = data
+        self.update_integral(calculated)
+        self.clear_inputs()
+        self.model.upsert_row(values.pop('year'), values)
+        QMessageBox.information(self, "Успех", "Данные добавлены!")
 
     def clear_inputs(self):
         for input_field in self.inputs.values():
             input_field.clear()
 
     def load_data(self):
-        db = next(get_db())
-        data = get_all_data(db)
-        self.table.setRowCount(len(data))
-
-        for row, record in enumerate(data):
-            self.table.setItem(row, 0, QTableWidgetItem(str(record.year)))
-            self.table.setItem(row, 1, QTableWidgetItem(str(record.failures_1)))
-            self.table.setItem(row, 2, QTableWidgetItem(str(record.failures_2)))
-            self.table.setItem(row, 3, QTableWidgetItem(str(record.failures_3)))
-            self.table.setItem(row, 4, QTableWidgetItem(f"{record.train_losses:.2f}"))
-            self.table.setItem(row, 5, QTableWidgetItem(f"{record.investments:.2f}"))
-            self.table.setItem(row, 6, QTableWidgetItem(str(record.passengers_daily)))
-            self.table.setItem(row, 7, QTableWidgetItem(str(record.tech_failures)))
-            self.table.setItem(row, 8, QTableWidgetItem(f"{record.fare_cost:.2f}"))
-            self.table.setItem(row, 9, QTableWidgetItem(f"{record.interval:.4f}"))
-
-            # Кнопка удаления
-            delete_btn = QPushButton("Удалить")
-            delete_btn.setStyleSheet("background: #f44336; color: white;")
-            delete_btn.clicked.connect(lambda checked, y=record.year: self.delete_record(y))
-            self.table.setCellWidget(row, 10, delete_btn)
+        self.tasks.start("load", lambda db, task: load_frame(db, measurements=False), on_result=self.model.set_frame,
+                         on_error=lambda message: QMessageBox.warning(self, "Ошибка", f"Ошибка загрузки: {message}"))
 
     def delete_record(self, year):
-        try:
-            db = next(get_db())
-            delete_data(db, year)
-            self.load_data()
-            QMessageBox.information(self, "Успех", f"Данные за {year} год удалены!")
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка удаления: {str(e)}")
+        self.tasks.start(("delete", year), lambda db, task: self.remove_row(db, year),
+                         on_result=lambda calculated: self.on_data_deleted(year, calculated),
+                         on_error=lambda message: QMessageBox.warning(self, "Ошибка", f"Ошибка удаления: {message}"),
+                         write=True)
+
+    @staticmethod
+    def remove_row(db, year):
+        delete_data(db, year)
+        return integral_index.remove_year(db, year)
+
+    def on_data_deleted(self, year, calculated):
+        self.update_integral(calculated)
+        self.model.remove_row(year)
+        QMessageBox.information(self, "Успех", f"Данные за {year} год удалены!")
+
+    def import_data(self):
+        """Загрузка данных из .xlsx / .csv в фоне с отчетом об отклоненных строках.
+
+        Файл с годами - в mck_data, файл со столбцами периода и детализации - в измерения.
+        """
+        path, _ = QFileDialog.getOpenFileName(self, "Импорт данных", "",
+                                              "Таблицы (*.xlsx *.csv);;Excel (*.xlsx);;CSV (*.csv)")
+        if not path:
+            return
+        rejected_path = path.rsplit('.', 1)[0] + "_rejected.csv"
+        self.import_btn.setEnabled(False)
+        self.import_progress.setValue(0)
+        self.import_progress.setVisible(True)
+        self.tasks.start("import", lambda db, task: self.import_rows(db, task, path, rejected_path),
+                         on_result=lambda result: self.on_data_imported(result, rejected_path),
+                         on_error=lambda message: QMessageBox.warning(self, "Ошибка", f"Ошибка импорта: {message}"),
+                         on_progress=self.import_progress.setValue,
+                         on_finished=self.on_import_finished, write=True)
+
+    @staticmethod
+    def import_rows(db, task, path, rejected_path):
+        report = import_file(db, path, rejected_path=rejected_path,
+                             progress=lambda share: task.report(share * 100))
+        # Пересчет только если показатель уже рассчитывался (как при добавлении строки)
+        calculated = None
+        if report['imported'] and integral_index.loaded:
+            calculated = integral_index.recompute(db)
+        return report, calculated
+
+    def on_data_imported(self, result, rejected_path):
+        report, calculated = result
+        self.update_integral(calculated)
+        self.load_data()
+        text = format_import_report(report)
+        if report['rejected']:
+            text += f"\n\nОтклоненные строки сохранены в {rejected_path}"
+            QMessageBox.warning(self, "Импорт завершен", text)
+        else:
+            QMessageBox.information(self, "Импорт завершен", text)
+
+    def on_import_finished(self):
+        self.import_btn.setEnabled(True)
+        self.import_progress.setVisible(False)
+
+    def export_data(self):
+        """Выгрузка таблиц в файл в фоне (формат - по расширению)"""
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Экспорт данных", "mck.xlsx",
+            "Excel - все таблицы (*.xlsx);;CSV - данные МЦК (*.csv);;"
+            "NumPy - все таблицы (*.npz);;Снимок для аналитики (*.snapshot.npz)")
+        if not path:
+            return
+        self.export_btn.setEnabled(False)
+        self.tasks.start("export", lambda db, task: export_path(db, path),
+                         on_result=lambda message: QMessageBox.information(self, "Экспорт завершен", message),
+                         on_error=lambda message: QMessageBox.warning(self, "Ошибка", f"Ошибка экспорта: {message}"),
+                         on_finished=lambda: self.export_btn.setEnabled(True))
+
+    def update_integral(self, calculated):
+        """Передаем инкрементально пересчитанный интегральный показатель в окно аналитики"""
+        if calculated is not None:
+            results, weights, _ = calculated
+            app_manager.integral_updated_signal.emit(results, weights)
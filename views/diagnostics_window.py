@@ -0,0 +1,88 @@
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg, NavigationToolbar2QT
+from matplotlib.figure import Figure
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QMessageBox
+from PySide6.QtCore import Qt
+
+from analytics.graphics import diagnostics_data, draw_diagnostics, update_diagnostics
+from controllers.model_crud import get_latest_model, model_arrays
+from views.app_manager import app_manager
+from views.tasks import TaskRunner
+
+TITLES = {
+    "integral": "Диагностика модели интегрального показателя",
+    "interval": "Диагностика модели ср./сут. интервала",
+}
+
+
+class DiagnosticsWindow(QWidget):
+    """Графики диагностики модели на встроенном холсте.
+
+    Фигура строится один раз; при новой версии модели меняются только данные точек и линий.
+    Подсказки у точек - analytics.graphics.PointHover (KD-дерево и blitting).
+    """
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.version = None
+        self.data = None
+        self.tasks = TaskRunner(self)
+        self.setup_ui()
+        app_manager.model_saved_signal.connect(self.on_model_saved)
+
+        self.setWindowTitle(TITLES.get(name, name))
+        self.resize(1200, 600)
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        self.version_label = QLabel()
+        self.version_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.version_label)
+
+        self.figure = Figure(figsize=(14, 6))
+        self.canvas = FigureCanvasQTAgg(self.figure)
+        self.artists = draw_diagnostics(self.figure)
+        layout.addWidget(NavigationToolbar2QT(self.canvas, self))
+        layout.addWidget(self.canvas)
+
+        self.setLayout(layout)
+
+    def read_model(self, db, current):
+        """Массивы и точки графиков последней версии модели (рабочий поток); None - версия не менялась"""
+        record = get_latest_model(db, self.name)
+        if record is None:
+            raise ValueError(f"Модель {self.name} еще не построена")
+        version = (record.name, record.version)
+        if version == current:
+            return None
+        label = f"Версия модели: {record.version} от {record.created_at:%d.%m.%Y %H:%M}"
+        return version, label, diagnostics_data(model_arrays(record))
+
+    def show_model(self, loaded):
+        """Перерисовка по загруженной версии (поток интерфейса) и показ окна"""
+        try:
+            if loaded is not None:
+                version, label, data = loaded
+                update_diagnostics(self.artists, data)
+                self.figure.tight_layout()
+                self.canvas.draw_idle()
+                self.version, self.data = version, data
+                self.version_label.setText(label)
+            self.show()
+            self.raise_()
+        except Exception as e:
+            self.on_task_error(str(e))
+
+    def show_diagnostics(self):
+        """Загрузка последней версии модели в фоне; перерисовка, только если версия новая"""
+        current = self.version
+        self.tasks.start("load", lambda db, task: self.read_model(db, current),
+                         on_result=self.show_model, on_error=self.on_task_error)
+
+    def on_task_error(self, message):
+        QMessageBox.warning(self, "Ошибка", f"Ошибка построения графиков: {message}")
+
+    def on_model_saved(self, name, version):
+        if name == self.name and self.isVisible():
+            self.show_diagnostics()
@@ -1,25 +1,23 @@
-from pathlib import Path
-
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QPushButton, QTableWidget,
-    QTableWidgetItem, QCheckBox, QTextEdit, QHBoxLayout, QScrollArea
+    QWidget, QVBoxLayout, QLabel, QPushButton, QTableWidget, QTableView,
+    QTableWidgetItem, QCheckBox, QTextEdit, QHBoxLayout, QHeaderView, QAbstractItemView, QMessageBox, QScrollArea
 )
 from PySide6.QtCore import Qt
 import pandas as pd
-import pickle
-from libs.database import get_db
-from controllers.data_crud import get_all_data
+from controllers.model_crud import save_model
+from controllers.data_loader import load_years
 from analytics.corel_matrix import get_correl_matrix
-from analytics.equations import build_integral_model, print_regression_result
+from analytics.equations import build_integral_model, search_integral_models, print_regression_result
+from views.app_manager import app_manager
+from views.table_model import FrameTableModel
+from views.tasks import TaskRunner
 
 
 class IntegralRegressionWindow(QWidget):
     def __init__(self):
         super().__init__()
-        self.db = next(get_db())
-        data = get_all_data(self.db)
-        years = [record.year for record in data]
-        self.years = years
+        self.tasks = TaskRunner(self)
+        self.years = []  # заполняются фоновой загрузкой
         self.selected_factors = []
         self.setup_ui()
         self.load_corr_table()
@@ -33,7 +31,9 @@ class IntegralRegressionWindow(QWidget):
         layout.addWidget(title)
 
         # Таблица корреляций
-        self.corr_table = QTableWidget()
+        self.corr_model = FrameTableModel(["Фактор", "Корреляция с y"], {"correlation": "{:.4f}"}, parent=self)
+        self.corr_table = QTableView()
+        self.corr_table.setModel(self.corr_model)
         layout.addWidget(self.corr_table)
 
         # Блок чекбоксов
@@ -60,6 +60,25 @@ class IntegralRegressionWindow(QWidget):
         run_btn.clicked.connect(self.run_regression)
         layout.addWidget(run_btn)
 
+        # Перебор всех наборов факторов
+        search_layout = QHBoxLayout()
+        search_btn = QPushButton("Перебрать все комбинации факторов")
+        search_btn.clicked.connect(self.run_search)
+        search_layout.addWidget(search_btn)
+        save_btn = QPushButton("Сохранить выбранную модель")
+        save_btn.clicked.connect(self.save_selected_model)
+        search_layout.addWidget(save_btn)
+        layout.addLayout(search_layout)
+
+        self.search_table = QTableWidget()
+        self.search_table.setColumnCount(7)
+        self.search_table.setHorizontalHeaderLabels(["Факторы", "R²", "R² скорр.", "AIC", "BIC", "Fфакт", "Fкр"])
+        self.search_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.search_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.search_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.search_models = []
+        layout.addWidget(self.search_table)
+
         # Вывод результатов
         self.result_output = QTextEdit()
         self.result_output.setReadOnly(True)
@@ -70,18 +89,27 @@ class IntegralRegressionWindow(QWidget):
         self.setWindowTitle("Регрессия интегрального показателя")
 
     def load_corr_table(self):
-        """Загружаем таблицу корреляций (только строка integrated_index)"""
-        corr_matrix = get_correl_matrix(self.db, self.years)
+        """Загружаем годы и таблицу корреляций (только строка integrated_index) в фоновом потоке"""
+        self.tasks.start("load", lambda db, task: self.read_corr_table(db),
+                         on_result=self.show_corr_table, on_error=self.on_task_error)
+
+    @staticmethod
+    def read_corr_table(db):
+        years = load_years(db)
+        corr_matrix = get_correl_matrix(db, years)
         row = corr_matrix.loc["integrated_index"].drop("integrated_index")
-        df = pd.DataFrame(row)
+        df = pd.DataFrame({"correlation": row})
+        df.index.name = "factor"
+        return years, df
 
-        self.corr_table.setColumnCount(2)
-        self.corr_table.setRowCount(len(df))
-        self.corr_table.setHorizontalHeaderLabels(["Фактор", "Корреляция с y"])
+    def show_corr_table(self, loaded):
+        self.years, df = loaded
+        self.corr_model.set_frame(df)
 
-        for i, (factor, value) in enumerate(df.itertuples()):
-            self.corr_table.setItem(i, 0, QTableWidgetItem(str(factor)))
-            self.corr_table.setItem(i, 1, QTableWidgetItem(f"{value:.4f}"))
+    def years_loaded(self) -> bool:
+        if not self.years:
+            self.result_output.setPlainText("⚠️ Данные еще загружаются или отсутствуют!")
+        return bool(self.years)
 
     def run_regression(self):
         """Запускаем регрессию по выбранным пользователем факторам"""
@@ -92,13 +120,69 @@ class IntegralRegressionWindow(QWidget):
             return
         iterative = self.auto_step_checkbox.isChecked()
 
-        result = build_integral_model(self.db, self.years, selected, iterative=iterative)
-        with open(Path(__file__).parent.parent.absolute() / 'data/integral.pkl', 'wb') as file:
-            pickle.dump(result, file)
+        self.start_fit(selected, iterative)
+
+    def start_fit(self, factors, iterative):
+        """Построение и сохранение модели в фоновом потоке"""
+        if not self.years_loaded():
+            return
+        years = list(self.years)
+        self.result_output.setPlainText("⏳ Расчет модели...")
+        self.tasks.start("fit", lambda db, task: self.fit_and_save(db, years, factors, iterative),
+                         on_result=self.on_model_saved, on_error=self.on_task_error, write=True)
+
+    @staticmethod
+    def fit_and_save(db, years, factors, iterative):
+        # Рабочий поток: только расчет и БД, без виджетов
+        result = build_integral_model(db, years, factors, iterative=iterative)
+        record = save_model(db, "integral", result)
+        return result, factors, record.version
+
+    def on_model_saved(self, saved):
+        result, factors, version = saved
+        app_manager.model_saved_signal.emit("integral", version)
+        self.show_result(result, factors)
+
+    def run_search(self):
+        """Перебор всех комбинаций факторов в фоновом потоке"""
+        if not self.years_loaded():
+            return
+        factors = list(self.checkboxes.keys())
+        years = list(self.years)
+        self.search_table.setRowCount(0)
+        self.tasks.start("search", lambda db, task: search_integral_models(db, years, factors),
+                         on_result=self.show_search, on_error=self.on_task_error)
+
+    def show_search(self, models):
+        """Вывод лучших моделей перебора"""
+        self.search_models = models
+        self.search_table.setRowCount(len(self.search_models))
+        for row, model in enumerate(self.search_models):
+            f_crit = "-" if model["f_crit"] is None else f"{model['f_crit']:.4f}"
+            values = [", ".join(model["factors"]), f"{model['r2']:.4f}", f"{model['adj_r2']:.4f}",
+                      f"{model['aic']:.3f}", f"{model['bic']:.3f}", f"{model['f_fact']:.4f}", f_crit]
+            for col, value in enumerate(values):
+                self.search_table.setItem(row, col, QTableWidgetItem(value))
+        if self.search_models:
+            self.search_table.selectRow(0)
+
+    def save_selected_model(self):
+        """Сохраняем выбранную в таблице перебора модель"""
+        row = self.search_table.currentRow()
+        if row < 0 or row >= len(self.search_models):
+            self.result_output.setPlainText("⚠️ Не выбрана модель!")
+            return
+        self.start_fit(self.search_models[row]["factors"], iterative=False)
+
+    def on_task_error(self, message):
+        self.result_output.setPlainText(f"⚠️ Ошибка расчета: {message}")
+        QMessageBox.warning(self, "Ошибка", f"Ошибка расчета: {message}")
+
+    def show_result(self, result, factors):
         # Перенаправляем красивый вывод в QTextEdit
         output_lines = []
         output_lines.append("=== Результат регрессии ===")
-        output_lines.append(f"Факторы: {', '.join(selected)}")
+        output_lines.append(f"Факторы: {', '.join(factors)}")
         output_lines.append("")
         output_lines.append("Уравнение:")
         terms = []
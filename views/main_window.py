@@ -1,12 +1,12 @@
 from PySide6.QtGui import QPixmap
 from PySide6.QtWidgets import QWidget, QLabel, QMessageBox, QLineEdit, QApplication
 
-from analytics.graphics import plot_regression_diagnostics
 from ui.ui_main import Ui_MainWindow
 from views.analytics_window import AnalyticsWindow
 from views.app_manager import app_manager
 from controllers.crud import delete_user_session
 from views.data_input_window import DataInputWindow
+from views.diagnostics_window import DiagnosticsWindow
 from views.integral_regression_window import IntegralRegressionWindow
 from views.interval_regression_window import IntervalRegressionWindow
 from views.profile_window import ProfileWindow
@@ -31,6 +31,7 @@ class MainWindow(QWidget):
         self.profile_window = None
         self.integral_window = None
         self.interval_window = None
+        self.diagnostics_windows = {}
         self.setWindowIcon(QPixmap("ui/resources/app_icon.png"))
         self.setup_ui_based_on_permissions()
 
@@ -63,11 +64,17 @@ class MainWindow(QWidget):
             self.profile_window = ProfileWindow(self.user_id, self.is_admin)
         self.profile_window.show()
 
+    def open_charts(self, name):
+        """Окно графиков модели создается один раз и переиспользуется"""
+        if name not in self.diagnostics_windows:
+            self.diagnostics_windows[name] = DiagnosticsWindow(name)
+        self.diagnostics_windows[name].show_diagnostics()
+
     def open_integral_charts(self):
-        plot_regression_diagnostics("integral")
+        self.open_charts("integral")
 
     def open_interval_charts(self):
-        plot_regression_diagnostics("interval")
+        self.open_charts("interval")
 
     def open_integral_window(self):
         if self.integral_window is None:
@@ -1,22 +1,20 @@
-import pickle
-from pathlib import Path
-
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                                QLabel, QTableWidget, QTableWidgetItem, QMessageBox,
-                               QHeaderView, QGroupBox, QTextEdit)
+                               QHeaderView, QGroupBox, QTextEdit, QSpinBox)
 from PySide6.QtCore import Qt
 
 from analytics.predict import calculate_final_predict
-from analytics.ryab import calculate, normalize_data, get_data
+from analytics.prokofiev import plan_prokofiev
+from analytics.backtest import backtest, format_backtest
 from controllers.crud import update_forecasts
-from controllers.data_crud import get_all_data_dataframe
-from libs.database import get_db
-from controllers.analysis_crud import save_analysis_result
-from analytics.corel_matrix import get_correl_matrix
+from controllers.model_crud import get_latest_model, model_to_dict
+from views.tasks import TaskRunner
 
 class ProkofievWindow(QWidget):
     def __init__(self):
         super().__init__()
+        self.models = {}
+        self.tasks = TaskRunner(self)
         self.setup_ui()
 
     def setup_ui(self):
@@ -53,44 +51,142 @@ class ProkofievWindow(QWidget):
         self.result_label.setStyleSheet("font-size: 18px; font-weight: bold; margin: 10px;")
         layout.addWidget(result_label)
 
+        # План по всем показателям
+        plan_group = QGroupBox("План по всем показателям")
+        plan_layout = QVBoxLayout()
+
+        params_layout = QHBoxLayout()
+        params_layout.addWidget(QLabel("Окно, лет:"))
+        self.window_spin = QSpinBox()
+        self.window_spin.setRange(2, 50)
+        self.window_spin.setValue(5)
+        params_layout.addWidget(self.window_spin)
+        params_layout.addWidget(QLabel("Горизонт, лет:"))
+        self.horizon_spin = QSpinBox()
+        self.horizon_spin.setRange(1, 10)
+        self.horizon_spin.setValue(3)
+        params_layout.addWidget(self.horizon_spin)
+        plan_btn = QPushButton("Построить план")
+        plan_btn.clicked.connect(self.calculate_plan)
+        params_layout.addWidget(plan_btn)
+        plan_layout.addLayout(params_layout)
+
+        self.plan_table = QTableWidget()
+        self.plan_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        plan_layout.addWidget(self.plan_table)
+
+        plan_group.setLayout(plan_layout)
+        layout.addWidget(plan_group)
+
+        # Проверка прогноза на истории
+        backtest_btn = QPushButton("Проверить модели на истории")
+        backtest_btn.clicked.connect(self.run_backtest)
+        layout.addWidget(backtest_btn)
+
+        self.backtest_output = QTextEdit()
+        self.backtest_output.setReadOnly(True)
+        layout.addWidget(self.backtest_output)
 
         self.setLayout(layout)
         self.setWindowTitle("Рассчет ср./сут. интервала с помощью метода Прокофьева")
-        self.resize(800, 200)
-
+        self.resize(800, 700)
+
+
+    @staticmethod
+    def load_model(db, name, cached=None):
+        """Последняя сохраненная версия модели и ее ключ (name, version) - ключ кеша прогноза.
+
+        Выполняется в рабочем потоке; cached - модель из self.models на момент запуска
+        (self.models меняет только show_forecast в потоке интерфейса).
+        """
+        record = get_latest_model(db, name)
+        if record is None:
+            raise ValueError(f"Модель {name} еще не построена")
+        version = (record.name, record.version)
+        if cached is not None and cached[1] == version:
+            return cached
+        return model_to_dict(record), version
+
+    def forecast(self, name):
+        """Точечный прогноз по последней версии модели в фоне"""
+        cached = self.models.get(name)
+        self.tasks.start(name, lambda db, task: self.predict(db, name, cached),
+                         on_result=self.show_forecast, on_error=self.on_task_error)
+
+    def predict(self, db, name, cached):
+        """Прогноз (рабочий поток): (name, модель, прогноз)"""
+        model = self.load_model(db, name, cached)
+        loaded_dict, version = model
+        return name, model, calculate_final_predict(db, loaded_dict, version)
+
+    def show_forecast(self, forecast):
+        """Запоминание загруженной модели и вывод прогноза (поток интерфейса)"""
+        name, model, predict = forecast
+        self.models[name] = model
+        if name == "interval":
+            self.show_interval(predict)
+        else:
+            self.show_integral(predict)
 
     def calculate_equation(self):
         """Расчет интервального показателя"""
-        try:
-            db = next(get_db())
-            with open(Path(__file__).parent.parent.absolute() / 'data/interval.pkl', 'rb') as file:
-                loaded_dict = pickle.load(file)
-            predict = calculate_final_predict(db, loaded_dict)
-            self.result_label.setText("Точечный прогноз среднесуточного интервала по модели: " +
-                                      str(predict))
-            update_forecasts(new_interval=predict)
-
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка расчета: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
+        self.forecast("interval")
+
+    def show_interval(self, predict):
+        self.result_label.setText("Точечный прогноз среднесуточного интервала по модели: " +
+                                  str(predict))
+        update_forecasts(new_interval=predict)
 
     def calculate_first_equation(self):
         """Расчет интегрального показателя"""
-        try:
-            db = next(get_db())
-            with open(Path(__file__).parent.parent.absolute() / 'data/integral.pkl', 'rb') as file:
-                loaded_dict = pickle.load(file)
-            predict = calculate_final_predict(db, loaded_dict)
-            self.result_label_first.setText("Точечный прогноз по 1й модели: " +
-                                      str(predict))
-            update_forecasts(new_integral=predict)
-
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка расчета: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-
+        self.forecast("integral")
+
+    def show_integral(self, predict):
+        self.result_label_first.setText("Точечный прогноз по 1й модели: " +
+                                        str(predict))
+        update_forecasts(new_integral=predict)
+
+    def calculate_plan(self):
+        """План по методу Прокофьева на несколько лет для всех показателей"""
+        window, horizon = self.window_spin.value(), self.horizon_spin.value()
+        self.tasks.start("plan", lambda db, task: plan_prokofiev(db, window=window, horizon=horizon),
+                         on_result=self.show_plan, on_error=self.on_task_error)
+
+    def show_plan(self, plan):
+        self.plan_table.setRowCount(len(plan))
+        self.plan_table.setColumnCount(len(plan.columns))
+        self.plan_table.setHorizontalHeaderLabels(list(plan.columns))
+        self.plan_table.setVerticalHeaderLabels([str(year) for year in plan.index])
+        for row, values in enumerate(plan.itertuples(index=False)):
+            for col, value in enumerate(values):
+                self.plan_table.setItem(row, col, QTableWidgetItem(f"{value:.4f}"))
+
+    def run_backtest(self):
+        """Скользящая проверка обеих сохраненных моделей по всем годам"""
+        window = self.window_spin.value()
+        self.backtest_output.setPlainText("⏳ Проверка моделей...")
+        self.tasks.start("backtest", lambda db, task: self.backtest_reports(db, task, window),
+                         on_result=self.backtest_output.setPlainText, on_error=self.on_task_error,
+                         on_progress=self.show_backtest_progress)
+
+    @staticmethod
+    def backtest_reports(db, task, window):
+        targets = (("integral", "integrated_index"), ("interval", "interval"))
+        reports = []
+        for step, (name, target) in enumerate(targets, start=1):
+            record = get_latest_model(db, name)
+            if record is None:
+                reports.append(f"Модель {name} еще не построена")
+            else:
+                reports.append(format_backtest(backtest(db, record.equation, target, window), target))
+            task.report(100 * step // len(targets))
+        return "\n\n".join(reports)
+
+    def show_backtest_progress(self, percent):
+        self.backtest_output.setPlainText(f"⏳ Проверка моделей... {percent}%")
+
+    def on_task_error(self, message):
+        QMessageBox.warning(self, "Ошибка", f"Ошибка расчета: {message}")
 
     def display_results(self, results, weights):
         pass
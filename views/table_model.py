@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QEvent, Signal
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import QStyledItemDelegate
+
+
+class FrameTableModel(QAbstractTableModel):
+    """Модель таблицы над DataFrame.
+
+    Первый столбец - индекс (ключ строки), далее столбцы кадра. Значения хранятся
+    массивами NumPy и форматируются в data() только для отображаемых ячеек.
+    Изменения передаются представлению точечно: вставка/удаление строк и dataChanged.
+    """
+
+    def __init__(self, headers, formats=None, action=None, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)  # индекс + столбцы
+        self.formats = formats or {}  # столбец -> формат, например "{:.4f}"
+        self.action = action  # подпись кнопки в последнем столбце (None - без кнопки)
+        self.frame = pd.DataFrame()
+        self._keys = np.array([])
+        self._values = []
+
+    # --- интерфейс QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers) + (self.action is not None)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or orientation != Qt.Horizontal:
+            return None
+        return self.headers[section] if section < len(self.headers) else ""
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        row, col = index.row(), index.column()
+        if col == 0:
+            return self._format(self.frame.index.name, self._keys[row])
+        if col > len(self._values):
+            return self.action
+        return self._format(self.frame.columns[col - 1], self._values[col - 1][row])
+
+    # --- обновление данных ---
+
+    def set_frame(self, frame: pd.DataFrame):
+        """Полная замена данных"""
+        self.beginResetModel()
+        self._assign(frame)
+        self.endResetModel()
+
+    def update_frame(self, frame: pd.DataFrame):
+        """Замена данных с минимальными уведомлениями.
+
+        Если строки и столбцы те же - один dataChanged на диапазон изменившихся строк,
+        иначе полный сброс модели.
+        """
+        if not (frame.index.equals(self.frame.index) and frame.columns.equals(self.frame.columns)):
+            self.set_frame(frame)
+            return
+        old = self.frame.to_numpy()
+        new = frame.to_numpy()
+        changed = np.flatnonzero(((old != new) & ~(pd.isna(old) & pd.isna(new))).any(axis=1))
+        self._assign(frame)
+        if changed.size:
+            self.dataChanged.emit(self.index(int(changed[0]), 0),
+                                  self.index(int(changed[-1]), self.columnCount() - 1))
+
+    def upsert_row(self, key, values: dict):
+        """Добавление строки по ключу (с сохранением сортировки) или обновление существующей"""
+        row = pd.DataFrame([values], index=pd.Index([key], name=self.frame.index.name))
+        row = row.reindex(columns=self.frame.columns)
+        if key in self.frame.index:
+            position = self.frame.index.get_loc(key)
+            frame = self.frame.copy()
+            frame.loc[key] = row.loc[key]
+            self._assign(frame)
+            self.dataChanged.emit(self.index(position, 0), self.index(position, self.columnCount() - 1))
+            return
+        position = int(np.searchsorted(self._keys, key))
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._assign(pd.concat([self.frame.iloc[:position], row, self.frame.iloc[position:]]))
+        self.endInsertRows()
+
+    def remove_row(self, key):
+        if key not in self.frame.index:
+            return
+        position = self.frame.index.get_loc(key)
+        self.beginRemoveRows(QModelIndex(), position, position)
+        self._assign(self.frame.drop(index=key))
+        self.endRemoveRows()
+
+    def row_key(self, row: int):
+        key = self._keys[row]
+        return key.item() if isinstance(key, np.generic) else key
+
+    def _assign(self, frame: pd.DataFrame):
+        self.frame = frame
+        self._keys = frame.index.to_numpy()
+        self._values = [frame[column].to_numpy() for column in frame.columns]
+
+    def _format(self, column, value):
+        if pd.isna(value):
+            return ""
+        fmt = self.formats.get(column)
+        return fmt.format(value) if fmt else str(value)
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Кнопка в ячейке, нарисованная делегатом (один объект на весь столбец вместо виджета на строку)"""
+
+    clicked = Signal(int)  # номер строки
+
+    def __init__(self, color="#f44336", parent=None):
+        super().__init__(parent)
+        self.color = QColor(color)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        rect = option.rect.adjusted(2, 2, -2, -2)
+        painter.fillRect(rect, self.color)
+        painter.setPen(Qt.white)
+        painter.drawText(rect, Qt.AlignCenter, index.data())
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and option.rect.contains(event.position().toPoint()):
+            self.clicked.emit(index.row())
+            return True
+        return False
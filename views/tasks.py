@@ -0,0 +1,126 @@
+import itertools
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Qt
+
+from libs.database import session_scope
+
+
+class TaskCancelled(Exception):
+    """Задача отменена - результат не передается в интерфейс"""
+
+
+class TaskSignals(QObject):
+    progress = Signal(int)  # 0..100
+    result = Signal(object)
+    error = Signal(str)
+    finished = Signal()
+
+
+class Task(QRunnable):
+    """Фоновая задача пула потоков.
+
+    fn(db, task) выполняется в рабочем потоке со своей сессией БД (закрывается после
+    выполнения); task.report(percent) передает прогресс и прерывает задачу после отмены.
+    Запись (write=True) отменой не прерывается - отменяется только передача результата.
+    """
+
+    def __init__(self, fn, write: bool = False):
+        super().__init__()
+        self.fn = fn
+        self.write = write
+        self.signals = TaskSignals()
+        self.cancelled = False
+        # Ссылку на задачу держит TaskRunner до finished
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        if self.cancelled and not self.write:
+            raise TaskCancelled()
+
+    def report(self, percent: int):
+        self.check()
+        self.signals.progress.emit(int(percent))
+
+    def run(self):
+        try:
+            with session_scope() as db:
+                result = self.fn(db, self)
+            self.check()
+        except TaskCancelled:
+            pass
+        except Exception as e:
+            print(traceback.format_exc())
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+class TaskRunner(QObject):
+    """Запуск задач окна в общем QThreadPool.
+
+    Обработчики вызываются в потоке интерфейса (очередь событий Qt). Новая задача чтения
+    с тем же ключом отменяет предыдущую, чтобы устаревший результат не перезаписал свежий.
+    Записи (write=True) друг друга не отменяют: у каждой свой ключ, и каждая доводит
+    изменение до БД и интерфейса.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool.globalInstance()
+        self.tasks = {}  # ключ -> последняя запущенная задача
+        self.alive = set()  # все еще выполняющиеся задачи, включая отмененные
+        self.counter = itertools.count()
+
+    def start(self, key, fn, on_result=None, on_error=None, on_progress=None, on_finished=None,
+              write: bool = False) -> Task:
+        if write:
+            key = (key, next(self.counter))
+        else:
+            self.cancel(key)
+        task = Task(fn, write)
+        for signal, handler in ((task.signals.result, on_result), (task.signals.error, on_error),
+                                (task.signals.progress, on_progress)):
+            if handler is not None:
+                signal.connect(self._unless_cancelled(task, handler), Qt.QueuedConnection)
+        if on_finished is not None:
+            task.signals.finished.connect(on_finished, Qt.QueuedConnection)
+        task.signals.finished.connect(lambda: self._forget(key, task), Qt.QueuedConnection)
+        self.tasks[key] = task
+        self.alive.add(task)
+        self.pool.start(task)
+        return task
+
+    def cancel(self, key):
+        task = self.tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+            # Запись из очереди не снимается: изменение пользователя должно попасть в БД
+            if not task.write and self.pool.tryTake(task):
+                self.alive.discard(task)
+
+    def cancel_all(self):
+        for key in list(self.tasks):
+            self.cancel(key)
+
+    def is_running(self, key) -> bool:
+        return any(task_key == key or (isinstance(task_key, tuple) and task_key[:1] == (key,))
+                   for task_key in self.tasks)
+
+    @staticmethod
+    def _unless_cancelled(task, handler):
+        # Отмена могла произойти, пока сигнал ждал в очереди
+        def deliver(value):
+            if not task.cancelled:
+                handler(value)
+        return deliver
+
+    def _forget(self, key, task):
+        self.alive.discard(task)
+        if self.tasks.get(key) is task:
+            del self.tasks[key]